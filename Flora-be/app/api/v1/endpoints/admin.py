@@ -1,12 +1,18 @@
 """Admin endpoints for user management."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
 from typing import List
 from bson import ObjectId
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, invalidate_user_cache
 from app.db.mongodb import get_database
 from app.models.user import UserResponse
 from pydantic import BaseModel, EmailStr, Field
-from app.core.security import hash_password
+from app.core.security import hash_password_async
+from app.services.user_import import parse_user_file, import_users, get_hash_pool
+from app.services.admin_stats import get_global_stats, compute_user_detail
+from app.services.user_listing import SORT_FIELDS, build_filter, count_users, invalidate_user_counts, list_users, normalize_email, refresh_search_keys, search_keys
+from app.services.exports import EXPORTS, build_query, stream_export
+from app.services.dashboard_stats import invalidate_catalogue
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timezone, timedelta
 from collections import defaultdict
 import random
@@ -49,21 +55,49 @@ async def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
     return current_user
 
 
-@router.get("/users", response_model=List[UserResponse])
+@router.get("/users")
 async def get_all_users(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    search: str | None = Query(None, max_length=100),
+    role: str | None = Query(None, pattern="^(user|student|admin)$"),
+    status_filter: str | None = Query(None, alias="status", pattern="^(active|inactive)$"),
+    sort: str = Query("created_at", pattern=f"^({'|'.join(SORT_FIELDS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    fields: str | None = None,
     current_admin: dict = Depends(require_admin),
     db=Depends(get_database)
 ):
-    """Get all users (admin only)."""
-    users_collection = db.users
-    users = await users_collection.find().to_list(length=None)
+    """List users a page at a time (admin only).
+
+    Pass the returned next_cursor to get the following page; `fields` is a
+    comma-separated subset of the user fields (stats are left out by default).
+    """
+    query = build_filter(
+        search=search,
+        role=role,
+        active=None if status_filter is None else status_filter == "active"
+    )
     
-    # Convert ObjectId to string and rename _id to id for each user
-    for user in users:
-        user["id"] = str(user["_id"])
-        del user["_id"]
+    try:
+        users, next_cursor = await list_users(
+            db, query, sort=sort, descending=(order == "desc"),
+            limit=limit, cursor=cursor, fields=fields
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    return users
+    return {
+        "success": True,
+        "data": {
+            "users": users,
+            "next_cursor": next_cursor,
+            "total": await count_users(db, query)
+        }
+    }
 
 
 @router.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -83,7 +117,8 @@ async def create_user(
         )
 
     # Check if email already exists
-    if await users_collection.find_one({"email": user_in.email}):
+    email = normalize_email(user_in.email)
+    if await users_collection.find_one({"email": email}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -92,9 +127,9 @@ async def create_user(
     # Prepare user data
     user_dict = {
         "username": user_in.username,
-        "email": user_in.email,
+        "email": email,
         "full_name": user_in.fullname,
-        "password_hash": hash_password(user_in.password),
+        "password_hash": await hash_password_async(user_in.password),
         "role": user_in.role,
         "is_active": True,
         "created_at": datetime.now(timezone.utc),
@@ -105,9 +140,11 @@ async def create_user(
             "total_study_time_minutes": 0
         }
     }
+    user_dict["search_keys"] = search_keys(user_dict)
 
     # Insert user
     result = await users_collection.insert_one(user_dict)
+    invalidate_user_counts()
     
     # Return created user
     created_user = await users_collection.find_one({"_id": result.inserted_id})
@@ -116,6 +153,43 @@ async def create_user(
     return created_user
 
 
+MAX_IMPORT_FILE_SIZE = 5 * 1024 * 1024
+
+
+@router.post("/users/import")
+async def import_users_file(
+    file: UploadFile = File(...),
+    dry_run: bool = Form(False),
+    current_admin: dict = Depends(require_admin),
+    db=Depends(get_database)
+):
+    """Create many users from a CSV or JSON file (admin only).
+
+    Columns/fields: username, email, full_name (or fullname), password,
+    role (optional, defaults to "user"). Returns a status per row; with
+    dry_run nothing is written.
+    """
+    content = await file.read(MAX_IMPORT_FILE_SIZE + 1)
+    if len(content) > MAX_IMPORT_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Import file too large. Maximum size is 5 MB."
+        )
+    
+    try:
+        rows = parse_user_file(content, file.filename or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read import file: {e}"
+        )
+    
+    report = await import_users(db, rows, get_hash_pool(), dry_run=dry_run)
+    if not dry_run:
+        invalidate_user_counts()
+    return {"success": True, "data": report}
+
+
 @router.patch("/users/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: str,
@@ -151,8 +225,9 @@ async def update_user(
     
     if user_update.email is not None:
         # Check if email is already taken
+        email = normalize_email(user_update.email)
         existing_user = await users_collection.find_one({
-            "email": user_update.email,
+            "email": email,
             "_id": {"$ne": object_id}
         })
         if existing_user:
@@ -160,7 +235,7 @@ async def update_user(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
-        update_data["email"] = user_update.email
+        update_data["email"] = email
     
     if user_update.username is not None:
         # Check if username is already taken
@@ -177,7 +252,7 @@ async def update_user(
     
     if user_update.password is not None:
         # Hash the new password and use the correct field name
-        update_data["password_hash"] = hash_password(user_update.password)
+        update_data["password_hash"] = await hash_password_async(user_update.password)
     
     if user_update.role is not None:
         update_data["role"] = user_update.role
@@ -193,6 +268,10 @@ async def update_user(
         {"_id": object_id},
         {"$set": update_data}
     )
+    if {"username", "email", "full_name"} & update_data.keys():
+        await refresh_search_keys(db, {"_id": object_id})
+    invalidate_user_cache(user_id)
+    invalidate_user_counts()
     
     # Return updated user
     updated_user = await users_collection.find_one({"_id": object_id})
@@ -236,6 +315,9 @@ async def delete_user(
     
     # Delete user
     await users_collection.delete_one({"_id": object_id})
+    await db.user_dashboard_summary.delete_one({"user_id": object_id})
+    invalidate_user_cache(user_id)
+    invalidate_user_counts()
     
     return {"message": "User deleted successfully"}
 
@@ -279,6 +361,8 @@ async def toggle_admin_status(
         {"_id": object_id},
         {"$set": {"is_admin": new_admin_status, "role": "admin" if new_admin_status else "user"}}
     )
+    invalidate_user_cache(user_id)
+    invalidate_user_counts()
     
     # Return updated user
     updated_user = await users_collection.find_one({"_id": object_id})
@@ -298,115 +382,14 @@ async def get_specific_user_stats(
         user_obj_id = ObjectId(user_id)
         
         # Check if user exists
-        user = await db.users.find_one({"_id": user_obj_id})
+        user = await db.users.find_one(
+            {"_id": user_obj_id},
+            {"full_name": 1, "email": 1, "username": 1}
+        )
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Get pronunciation stats
-        pronunciation_attempts = await db.pronunciation_attempts.find({
-            "user_id": user_obj_id
-        }).to_list(length=10000)
-        
-        pron_scores = []
-        for a in pronunciation_attempts:
-            score = a.get("assessment", {}).get("total_score") if a.get("assessment") else None
-            if score is not None:
-                pron_scores.append(score)
-        
-        # Get recent attempts
-        recent_pron = sorted(pronunciation_attempts, key=lambda x: x.get("created_at", datetime.min), reverse=True)[:10]
-        recent_pron_list = []
-        for attempt in recent_pron:
-            inst_id = attempt.get("instruction_id")
-            if inst_id:
-                inst = await db.instructions.find_one({"_id": inst_id})
-                text = inst["text"] if inst else "Custom text"
-            else:
-                text = attempt.get("custom_text", "Custom text")
-            
-            recent_pron_list.append({
-                "instruction_text": text,
-                "score": attempt.get("assessment", {}).get("total_score") if attempt.get("assessment") else None,
-                "created_at": attempt.get("created_at", datetime.utcnow()).isoformat() + "Z"
-            })
-        
-        # Get situation stats
-        situation_attempts = await db.situation_attempts.find({
-            "user_id": user_obj_id
-        }).to_list(length=10000)
-        
-        situation_scores = [a.get("total_score", 0) for a in situation_attempts]
-        max_scores = [len(a.get("situations", [])) * 100 for a in situation_attempts]
-        avg_percentage = sum(s/m*100 for s,m in zip(situation_scores, max_scores) if m > 0) / len(situation_scores) if situation_scores else 0
-        
-        # Recent quizzes
-        recent_situations = sorted(situation_attempts, key=lambda x: x.get("submitted_at", datetime.min) if isinstance(x.get("submitted_at"), datetime) else datetime.min, reverse=True)[:10]
-        recent_sit_list = []
-        
-        # Distribution counts for radial charts
-        perfect_count = sum(a.get("perfect_count", 0) for a in situation_attempts)
-        acceptable_count = sum(a.get("acceptable_count", 0) for a in situation_attempts)
-        poor_count = sum(a.get("poor_count", 0) for a in situation_attempts)
-
-        for attempt in recent_situations:
-            group_id = attempt.get("group_id")
-            if group_id:
-                group = await db.groups.find_one({"_id": group_id})
-                group_name = group["name"] if group else "Unknown"
-            else:
-                group_name = "Unknown"
-            
-            max_score = len(attempt.get("situations", [])) * 100
-            percentage = (attempt.get("total_score", 0) / max_score * 100) if max_score > 0 else 0
-            
-            submitted_at = attempt.get("submitted_at")
-            if not isinstance(submitted_at, datetime):
-                submitted_at = datetime.utcnow()
-            
-            recent_sit_list.append({
-                "group_name": group_name,
-                "score": attempt.get("total_score", 0),
-                "percentage": round(percentage),
-                "submitted_at": submitted_at.isoformat() + "Z"
-            })
-        
-        # Performance Timeline (Last 30 days)
-        now_naive = datetime.utcnow()
-        user_timeline_map = {} # date -> {accuracy_sum, count}
-        for i in range(30):
-            d = (now_naive - timedelta(days=i)).date()
-            user_timeline_map[d] = {"accuracy_sum": 0, "count": 0}
-        
-        for a in pronunciation_attempts:
-            dt = a.get("created_at")
-            if isinstance(dt, str):
-                try: dt = datetime.fromisoformat(dt.replace('Z', ''))
-                except: dt = None
-            if isinstance(dt, datetime) and dt.date() in user_timeline_map:
-                score = a.get("assessment", {}).get("total_score") if a.get("assessment") else None
-                if score is not None:
-                    user_timeline_map[dt.date()]["accuracy_sum"] += score
-                    user_timeline_map[dt.date()]["count"] += 1
-
-        for a in situation_attempts:
-            dt = a.get("submitted_at")
-            if isinstance(dt, str):
-                try: dt = datetime.fromisoformat(dt.replace('Z', ''))
-                except: dt = None
-            if isinstance(dt, datetime) and dt.date() in user_timeline_map:
-                score = a.get("total_score")
-                max_score = len(a.get("situations", [])) * 100
-                if score is not None and max_score > 0:
-                    user_timeline_map[dt.date()]["accuracy_sum"] += (score / max_score) * 100
-                    user_timeline_map[dt.date()]["count"] += 1
-        
-        performance_timeline = []
-        for d in sorted(user_timeline_map.keys()):
-            stats = user_timeline_map[d]
-            performance_timeline.append({
-                "date": d.isoformat(),
-                "accuracy": round(stats["accuracy_sum"] / stats["count"], 1) if stats["count"] > 0 else 0
-            })
+        detail = await compute_user_detail(db, user_obj_id)
 
         return {
             "success": True,
@@ -416,32 +399,7 @@ async def get_specific_user_stats(
                     "email": user.get("email"),
                     "username": user.get("username")
                 },
-                "pronunciation": {
-                    "total_attempts": len(pronunciation_attempts),
-                    "average_score": round(sum(pron_scores) / len(pron_scores), 1) if pron_scores else 0,
-                    "recent_attempts": recent_pron_list
-                },
-                "situations": {
-                    "total_quizzes": len(situation_attempts),
-                    "average_score_percentage": round(avg_percentage, 1),
-                    "recent_quizzes": recent_sit_list,
-                    "score_distribution": {
-                        "perfect": perfect_count,
-                        "acceptable": acceptable_count,
-                        "poor": poor_count
-                    }
-                },
-                "performance_timeline": performance_timeline,
-                "activity": {
-                    "total_sessions": len(set([a.get("session_id") for a in pronunciation_attempts if a.get("session_id")])),
-                    "last_active": max(
-                        [a.get("created_at", datetime.min) if isinstance(a.get("created_at"), datetime) else datetime.min for a in pronunciation_attempts] +
-                        [a.get("submitted_at", datetime.min) if isinstance(a.get("submitted_at"), datetime) else datetime.min for a in situation_attempts] +
-                        [datetime.min]
-                    ).isoformat() + "Z" if (pronunciation_attempts or situation_attempts) else None,
-                    "days_active": len(set([a["created_at"].date() for a in pronunciation_attempts if isinstance(a.get("created_at"), datetime)])) +
-                                  len(set([a["submitted_at"].date() for a in situation_attempts if isinstance(a.get("submitted_at"), datetime)]))
-                }
+                **detail
             }
         }
         
@@ -459,207 +417,10 @@ async def get_global_dashboard_stats(
 ):
     """Get global platform statistics for the admin dashboard (admin only)."""
     try:
-        now = datetime.now(timezone.utc)
-        yesterday = (now - timedelta(days=1)).replace(tzinfo=None)
-        two_weeks_ago = (now - timedelta(days=14)).replace(tzinfo=None)
-
-        # 1. Total Counts (Efficient)
-        users_count = await db.users.count_documents({})
-        pronunciation_attempts_count = await db.pronunciation_attempts.count_documents({})
-        situation_attempts_count = await db.situation_attempts.count_documents({})
-        global_quiz_attempts_count = await db.quiz_attempts.count_documents({})
-        total_quizzes_count = situation_attempts_count + global_quiz_attempts_count
-        
-        # 2. Activity Today (Wait, we need to compare with UTC dates)
-        active_today = await db.pronunciation_attempts.distinct("user_id", {"created_at": {"$gte": yesterday}})
-        active_today_sit = await db.situation_attempts.distinct("user_id", {"submitted_at": {"$gte": yesterday}})
-        active_today_quiz = await db.quiz_attempts.distinct("user_id", {"submitted_at": {"$gte": yesterday}})
-        active_users_today = len(set(active_today + active_today_sit + active_today_quiz))
-
-        # 3. Activity Timeline (Aggregation)
-        timeline_pipeline = [
-            {"$match": {"created_at": {"$gte": two_weeks_ago}}},
-            {"$project": {
-                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-                "score": "$assessment.total_score"
-            }},
-            {"$group": {
-                "_id": "$date",
-                "count": {"$sum": 1},
-                "avg_score": {"$avg": "$score"}
-            }},
-            {"$project": {"_id": 1, "count": 1, "avg_score": 1}}
-        ]
-        pron_timeline = await db.pronunciation_attempts.aggregate(timeline_pipeline).to_list(None)
-        
-        sit_timeline_pipeline = [
-            {"$match": {"submitted_at": {"$gte": two_weeks_ago}}},
-            {"$project": {
-                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$submitted_at"}},
-                "total_score": "$total_score",
-                "max_score": {"$multiply": [{"$size": {"$ifNull": ["$situations", []]}}, 100]}
-            }},
-            {"$group": {
-                "_id": "$date",
-                "count": {"$sum": 1},
-                "avg_accuracy": {"$avg": {"$cond": [{"$gt": ["$max_score", 0]}, {"$divide": ["$total_score", "$max_score"]}, 0]}}
-            }},
-            {"$project": {"_id": 1, "count": 1, "avg_accuracy": 1}}
-        ]
-        sit_timeline = await db.situation_attempts.aggregate(sit_timeline_pipeline).to_list(None)
-
-        quiz_timeline_pipeline = [
-            {"$match": {"submitted_at": {"$gte": two_weeks_ago}}},
-            {"$project": {
-                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$submitted_at"}},
-                "total_score": "$total_score",
-                "max_score": {"$multiply": [{"$size": {"$ifNull": ["$results", []]}}, 100]}
-            }},
-            {"$group": {
-                "_id": "$date",
-                "count": {"$sum": 1},
-                "avg_accuracy": {"$avg": {"$cond": [{"$gt": ["$max_score", 0]}, {"$divide": ["$total_score", "$max_score"]}, 0]}}
-            }},
-            {"$project": {"_id": 1, "count": 1, "avg_accuracy": 1}}
-        ]
-        quiz_timeline = await db.quiz_attempts.aggregate(quiz_timeline_pipeline).to_list(None)
-
-        # 4. User Growth Timeline (Aggregation - Last 30 Days)
-        one_month_ago = (now - timedelta(days=30)).replace(tzinfo=None)
-        growth_pipeline = [
-            {"$match": {"created_at": {"$gte": one_month_ago}}},
-            {"$group": {
-                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"_id": 1}},
-            {"$project": {"date": "$_id", "count": 1, "_id": 0}}
-        ]
-        user_growth_timeline = await db.users.aggregate(growth_pipeline).to_list(None)
-
-        # Merge activity timelines and use standard keys
-        timeline_map = {}
-        for r in pron_timeline:
-            timeline_map[r["_id"]] = {"date": r["_id"], "pronunciation": r["count"], "quizzes": 0, "accuracy": r["avg_score"] or 0}
-        
-        for r in sit_timeline:
-            if r["_id"] not in timeline_map:
-                timeline_map[r["_id"]] = {"date": r["_id"], "pronunciation": 0, "quizzes": r["count"], "accuracy": (r["avg_accuracy"] or 0) * 100}
-            else:
-                timeline_map[r["_id"]]["quizzes"] += r["count"]
-                # Adjusted weighted average
-                timeline_map[r["_id"]]["accuracy"] = round((timeline_map[r["_id"]]["accuracy"] + (r["avg_accuracy"] or 0) * 100) / 2, 1)
-
-        for r in quiz_timeline:
-            if r["_id"] not in timeline_map:
-                timeline_map[r["_id"]] = {"date": r["_id"], "pronunciation": 0, "quizzes": r["count"], "accuracy": (r["avg_accuracy"] or 0) * 100}
-            else:
-                timeline_map[r["_id"]]["quizzes"] += r["count"]
-                timeline_map[r["_id"]]["accuracy"] = round((timeline_map[r["_id"]]["accuracy"] + (r["avg_accuracy"] or 0) * 100) / 2, 1)
-
-        activity_timeline = sorted(timeline_map.values(), key=lambda x: x["date"])
-
-        # 5. Error Distribution (Pronunciation) - Top 8
-        error_pipeline = [
-            {"$unwind": "$assessment.errors"},
-            {"$group": {"_id": "$assessment.errors.error_type", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 8},
-            {"$project": {"type": "$_id", "count": 1, "_id": 0}}
-        ]
-        error_distribution = await db.pronunciation_attempts.aggregate(error_pipeline).to_list(None)
-
-        # 6. Top Users (Engagement)
-        top_users_pipeline = [
-            {"$group": {"_id": "$user_id", "activity_count": {"$sum": 1}}},
-            {"$sort": {"activity_count": -1}},
-            {"$limit": 10},
-            {"$lookup": {"from": "users", "localField": "_id", "foreignField": "_id", "as": "user"}},
-            {"$unwind": "$user"},
-            {"$project": {
-                "id": {"$toString": "$user._id"},
-                "name": {"$ifNull": ["$user.full_name", "Unknown"]},
-                "username": "$user.username",
-                "activity_count": 1,
-                "avatar_color": {"$ifNull": ["$user.avatar_color", "#757575"]}
-            }},
-            {"$project": {"_id": 0, "id": 1, "name": 1, "username": 1, "activity_count": 1, "avatar_color": 1}}
-        ]
-        top_users = await db.pronunciation_attempts.aggregate(top_users_pipeline).to_list(None)
-
-        # 7. Group Performance (Aggregation)
-        group_perf_pipeline = [
-            {"$match": {"group_id": {"$ne": None}}},
-            {"$group": {
-                "_id": "$group_id",
-                "total_score": {"$sum": "$total_score"},
-                "max_score": {"$sum": {"$multiply": [{"$size": {"$ifNull": ["$situations", []]}}, 100]}},
-                "total_attempts": {"$sum": 1}
-            }},
-            {"$lookup": {"from": "groups", "localField": "_id", "foreignField": "_id", "as": "group"}},
-            {"$unwind": "$group"},
-            {"$project": {
-                "id": {"$toString": "$_id"},
-                "name": "$group.name",
-                "avg_score": {"$cond": [{"$gt": ["$max_score", 0]}, {"$divide": [{"$multiply": ["$total_score", 100]}, "$max_score"]}, 0]},
-                "count": "$total_attempts",
-                "_id": 0
-            }},
-            {"$sort": {"count": -1}},
-            {"$limit": 8}
-        ]
-        group_performance = await db.situation_attempts.aggregate(group_perf_pipeline).to_list(None)
-        for g in group_performance: g["avg_score"] = round(g["avg_score"], 1)
-
-        # 8. Situation Distribution (Perfect, Acceptable, Poor)
-        sit_counts_pipeline = [
-            {"$group": {
-                "_id": None,
-                "perfect": {"$sum": {"$ifNull": ["$perfect_count", 0]}},
-                "acceptable": {"$sum": {"$ifNull": ["$acceptable_count", 0]}},
-                "poor": {"$sum": {"$ifNull": ["$poor_count", 0]}},
-                "total_questions": {"$sum": {"$size": {"$ifNull": ["$situations", []]}}},
-                "total_score_sum": {"$sum": "$total_score"},
-                "max_score_sum": {"$sum": {"$multiply": [{"$size": {"$ifNull": ["$situations", []]}}, 100]}}
-            }},
-            {"$project": {"_id": 0, "perfect": 1, "acceptable": 1, "poor": 1, "total_questions": 1, "total_score_sum": 1, "max_score_sum": 1}}
-        ]
-        sit_res = await db.situation_attempts.aggregate(sit_counts_pipeline).to_list(None)
-
-        # 9. All-time global accuracy (Pronunciation)
-        overall_pron_res = await db.pronunciation_attempts.aggregate([
-            {"$group": {"_id": None, "avg_score": {"$avg": "$assessment.total_score"}}}
-        ]).to_list(None)
-        avg_pron_score = round(overall_pron_res[0]["avg_score"], 1) if overall_pron_res else 0
-
-        # Aggregated stats for frontend
+        # Daily rollups plus today live, cached briefly (app/services/admin_stats.py)
         return {
             "success": True,
-            "data": {
-                "overview": {
-                    "total_users": users_count,
-                    "total_pronunciation_attempts": pronunciation_attempts_count,
-                    "total_quizzes_completed": total_quizzes_count,
-                    "active_users_today": active_users_today
-                },
-                "activity_timeline": activity_timeline,
-                "user_growth_timeline": user_growth_timeline,
-                "group_performance": {
-                    "pronunciation_top": group_performance # Used by frontend
-                },
-                "top_users": top_users,
-                "pronunciation_metrics": {
-                    "avg_score": avg_pron_score,
-                    "error_distribution": error_distribution
-                },
-                "situation_metrics": {
-                    "avg_accuracy": round((sit_res[0]["total_score_sum"] / (sit_res[0]["max_score_sum"] or 1) * 100) if sit_res else 0, 1),
-                    "total_answered": sit_res[0]["total_questions"] if sit_res else 0,
-                    "perfect_count": sit_res[0]["perfect"] if sit_res else 0,
-                    "acceptable_count": sit_res[0]["acceptable"] if sit_res else 0,
-                    "poor_count": sit_res[0]["poor"] if sit_res else 0
-                }
-            }
+            "data": await get_global_stats(db)
         }
         
     except Exception as e:
@@ -669,6 +430,63 @@ async def get_global_dashboard_stats(
         )
 
 
+@router.get("/export/{collection}")
+async def export_attempts(
+    collection: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    group_id: str | None = None,
+    user_id: str | None = None,
+    batch_size: int = Query(500, ge=1, le=5000),
+    current_admin: dict = Depends(require_admin),
+    db=Depends(get_database)
+):
+    """Stream attempts as NDJSON or CSV (admin only).
+
+    collection: pronunciation_attempts, situation_attempts or quiz_attempts.
+    start/end bound the attempt date (UTC, end exclusive). group_id is not
+    accepted for quiz_attempts, which belong to no group.
+    """
+    if collection not in EXPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export. Choose one of: {', '.join(EXPORTS)}"
+        )
+    
+    try:
+        group_oid = ObjectId(group_id) if group_id else None
+        user_oid = ObjectId(user_id) if user_id else None
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid group or user ID"
+        )
+    
+    try:
+        query = build_query(
+            collection,
+            # Stored dates are naive UTC
+            start=start.astimezone(timezone.utc).replace(tzinfo=None) if start and start.tzinfo else start,
+            end=end.astimezone(timezone.utc).replace(tzinfo=None) if end and end.tzinfo else end,
+            group_id=group_oid,
+            user_id=user_oid
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"{collection}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream_export(db, collection, query, fmt=format, batch_size=batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 # --- Content Management System (CMS) Endpoints ---
 
 # 1. Groups Management
@@ -687,6 +505,7 @@ async def create_group(group: dict, db=Depends(get_database), current_admin: dic
     group["created_at"] = datetime.now(timezone.utc).replace(tzinfo=None)
     group["is_active"] = True
     result = await db.groups.insert_one(group)
+    invalidate_catalogue()
     return {"success": True, "id": str(result.inserted_id)}
 
 
@@ -699,6 +518,7 @@ async def update_group(group_id: str, group_update: dict, db=Depends(get_databas
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Group not found")
+    invalidate_catalogue()
     return {"success": True}
 
 
@@ -709,6 +529,7 @@ async def delete_group(group_id: str, db=Depends(get_database), current_admin: d
         {"_id": ObjectId(group_id)},
         {"$set": {"is_active": False}}
     )
+    invalidate_catalogue()
     return {"success": True}
 
 
@@ -742,13 +563,22 @@ async def update_instruction(id: str, inst_update: dict, db=Depends(get_database
     """Update instruction."""
     if "group_id" in inst_update:
         inst_update["group_id"] = ObjectId(inst_update["group_id"])
+    inst_update.pop("reference_template", None)
     
-    result = await db.instructions.update_one(
+    previous = await db.instructions.find_one_and_update(
         {"_id": ObjectId(id)},
-        {"$set": inst_update}
+        {"$set": inst_update},
+        projection={"audio_url": 1}
     )
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Instruction not found")
+    
+    if "audio_url" in inst_update and inst_update["audio_url"] != previous.get("audio_url"):
+        # New reference recording: the old template no longer applies
+        await db.instructions.update_one(
+            {"_id": ObjectId(id), "audio_url": inst_update["audio_url"]},
+            {"$unset": {"reference_template": ""}}
+        )
     return {"success": True}
 
 
@@ -842,6 +672,7 @@ async def create_quiz(quiz: dict, db=Depends(get_database), current_admin: dict
     if "is_active" not in quiz: quiz["is_active"] = True
     
     result = await db.quizzes.insert_one(quiz)
+    invalidate_catalogue()
     return {"success": True, "id": str(result.inserted_id)}
 
 
@@ -857,6 +688,7 @@ async def update_quiz(id: str, quiz_update: dict, db=Depends(get_database), curr
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Question not found")
+    invalidate_catalogue()
     return {"success": True}
 
 
@@ -867,6 +699,7 @@ async def delete_quiz(id: str, db=Depends(get_database), current_admin: dict = D
         {"_id": ObjectId(id)},
         {"$set": {"is_active": False}}
     )
+    invalidate_catalogue()
     return {"success": True}
 
 
@@ -3,10 +3,18 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.mongodb import get_database
 from app.schemas.auth import LoginRequest, TokenResponse, RefreshTokenRequest, RefreshTokenResponse, APIResponse
-from app.core.security import verify_password, create_access_token, create_refresh_token, decode_token, hash_password
+from app.core.security import (
+    verify_password_async,
+    verify_and_update_password,
+    hash_password_async,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+)
 from app.core.config import settings
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, invalidate_user_cache
 from app.models.user import UserResponse
+from app.services.user_listing import normalize_email, refresh_search_keys
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 from app.schemas.settings import (
@@ -33,8 +41,9 @@ async def login(
             detail="Invalid username or password"
         )
     
-    # Verify password
-    if not verify_password(credentials.password, user["password_hash"]):
+    # Verify password (off the event loop)
+    password_ok, new_hash = await verify_and_update_password(credentials.password, user["password_hash"])
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
@@ -58,10 +67,13 @@ async def login(
     access_token = create_access_token(token_data)
     refresh_token = create_refresh_token(token_data)
     
-    # Update last login
+    # Update last login, upgrading the hash if the bcrypt cost changed
+    login_update = {"last_login": datetime.now(timezone.utc)}
+    if new_hash:
+        login_update["password_hash"] = new_hash
     await db.users.update_one(
         {"_id": user["_id"]},
-        {"$set": {"last_login": datetime.now(timezone.utc)}}
+        {"$set": login_update}
     )
     
     # Prepare user response
@@ -163,16 +175,17 @@ async def update_profile(
         update_data["full_name"] = profile_data.full_name
     if profile_data.email:
         # Check if email is already taken by another user
+        email = normalize_email(profile_data.email)
         existing_user = await db.users.find_one({
-            "email": profile_data.email,
-            "_id": {"$ne": ObjectId(current_user["id"])}
+            "email": email,
+            "_id": {"$ne": ObjectId(current_user["_id"])}
         })
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already in use"
             )
-        update_data["email"] = profile_data.email
+        update_data["email"] = email
     
     if not update_data:
         raise HTTPException(
@@ -185,12 +198,14 @@ async def update_profile(
         {"_id": ObjectId(current_user["_id"])},
         {"$set": update_data}
     )
+    invalidate_user_cache(current_user["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Profile update failed"
         )
+    await refresh_search_keys(db, {"_id": ObjectId(current_user["_id"])})
     
     # Get updated user
     updated_user = await db.users.find_one({"_id": ObjectId(current_user["_id"])})
@@ -231,20 +246,21 @@ async def change_password(
         )
     
     # Verify current password
-    if not verify_password(password_data.current_password, user["password_hash"]):
+    if not await verify_password_async(password_data.current_password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
     # Hash new password
-    new_password_hash = hash_password(password_data.new_password)
+    new_password_hash = await hash_password_async(password_data.new_password)
     
     # Update password
     result = await db.users.update_one(
         {"_id": ObjectId(current_user["_id"])},
         {"$set": {"password_hash": new_password_hash}}
     )
+    invalidate_user_cache(current_user["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(
@@ -289,6 +305,7 @@ async def update_preferences(
             {"_id": ObjectId(current_user["_id"])},
             {"$set": {"preferences": current_preferences}}
         )
+    invalidate_user_cache(current_user["_id"])
     
     return APIResponse(
         success=True,
@@ -4,10 +4,13 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.mongodb import get_database
 from app.core.dependencies import get_current_user
 from app.schemas.auth import APIResponse
+from app.services.attempt_stats import ensure_instruction_stats
+from app.services.dashboard_stats import compute_user_stats
 from pydantic import BaseModel
 from typing import Dict, Any, List
 from bson import ObjectId
 from datetime import datetime, timedelta
+import asyncio
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
@@ -19,222 +22,25 @@ async def get_user_stats(
     """Get user's overall statistics."""
     try:
         user_id = ObjectId(current_user["_id"])
-        
-        # 1. Fetch all data in bulk to minimize round-trips
-        pron_attempts_task = db.pronunciation_attempts.find({"user_id": user_id}).to_list(length=1000)
-        sit_attempts_task = db.situation_attempts.find({"user_id": user_id}).to_list(length=1000)
-        global_quiz_attempts_task = db.quiz_attempts.find({"user_id": user_id}).to_list(length=1000)
-        groups_task = db.groups.find().sort("group_number", 1).to_list(length=100)
-        
-        # Await all primary data fetches
-        import asyncio
-        pronunciation_attempts, situation_attempts, global_quiz_attempts, groups = await asyncio.gather(
-            pron_attempts_task, sit_attempts_task, global_quiz_attempts_task, groups_task
+        user, data = await asyncio.gather(
+            db.users.find_one({"_id": user_id}, {"stats": 1}),
+            compute_user_stats(db, user_id)
         )
-        
-        # 2. Pre-process pronunciation attempts
-        pron_scores = []
-        recent_pron_attempts = sorted(pronunciation_attempts, key=lambda x: x.get("created_at", datetime.min), reverse=True)
-        
-        # Fetch instructions mapping for recent attempts if needed
-        recent_pron_instruction_ids = [a["instruction_id"] for a in recent_pron_attempts[:5] if a.get("instruction_id")]
-        instruction_map = {}
-        if recent_pron_instruction_ids:
-            instructions = await db.instructions.find({"_id": {"$in": recent_pron_instruction_ids}}).to_list(length=10)
-            instruction_map = {inst["_id"]: inst["text"] for inst in instructions}
-
-        recent_pron_list = []
-        for attempt in recent_pron_attempts[:5]:
-            score = attempt.get("assessment", {}).get("total_score")
-            if score is not None:
-                pron_scores.append(score)
-            text = instruction_map.get(attempt.get("instruction_id"), attempt.get("custom_text", "Custom text"))
-            recent_pron_list.append({
-                "instruction_text": text,
-                "score": score,
-                "created_at": attempt.get("created_at", datetime.utcnow()).isoformat() + "Z"
-            })
-            
-        # 3. Process quiz and situation attempts
-        quiz_data_points = []
-        group_sit_stats = {} # group_id -> list of attempts
-        encountered_ids = set()
-
-        for a in situation_attempts:
-            gid = str(a.get("group_id"))
-            if gid not in group_sit_stats: group_sit_stats[gid] = []
-            group_sit_stats[gid].append(a)
-            
-            sits = a.get("situations", [])
-            n_sits = len(sits)
-            if n_sits > 0:
-                score = a.get("total_score", 0)
-                if score > 100 or (score > 0 and score % 100 == 0): score /= 100
-                quiz_data_points.append({
-                    "score": score, "max_score": n_sits,
-                    "submitted_at": a.get("submitted_at") if isinstance(a.get("submitted_at"), datetime) else datetime.utcnow(),
-                    "type": "Group Quiz", "group_id": a.get("group_id")
-                })
-                for s in sits: encountered_ids.add(str(s.get("situation_id")))
-
-        for a in global_quiz_attempts:
-            results = a.get("results", [])
-            n_results = len(results)
-            if n_results > 0:
-                score = a.get("total_score", 0)
-                if score > 100 or (score > 0 and score % 100 == 0): score /= 100
-                quiz_data_points.append({
-                    "score": score, "max_score": n_results,
-                    "submitted_at": a.get("submitted_at") if isinstance(a.get("submitted_at"), datetime) else datetime.utcnow(),
-                    "type": "Global Quiz", "group_id": None
-                })
-                for r in results: encountered_ids.add(str(r.get("quiz_id")))
-
-        # 4. Map group names for recent quizzes
-        recent_attempts_sorted = sorted(quiz_data_points, key=lambda x: x["submitted_at"], reverse=True)
-        recent_quiz_list = []
-        group_name_map = {str(g["_id"]): g["name"] for g in groups}
-        for attempt in recent_attempts_sorted[:5]:
-            display_name = group_name_map.get(str(attempt["group_id"]), "Global Quiz Challenge") if attempt["group_id"] else "Global Quiz Challenge"
-            pct = (attempt["score"] / attempt["max_score"] * 100) if attempt["max_score"] > 0 else 0
-            recent_quiz_list.append({
-                "group_name": display_name,
-                "score": attempt["score"],
-                "percentage": int(round(pct)),
-                "submitted_at": attempt["submitted_at"].isoformat() + "Z"
-            })
-
-        # 5. Build group progress map efficiently
-        # Get all pronunciation attempts by group
-        pipeline = [
-            {"$match": {"user_id": user_id, "instruction_id": {"$exists": True}}},
-            {"$lookup": {"from": "instructions", "localField": "instruction_id", "foreignField": "_id", "as": "inst"}},
-            {"$unwind": "$inst"},
-            {"$project": {"group_id": "$inst.group_id", "score": "$assessment.total_score", "created_at": 1}},
-        ]
-        all_group_pron_res = await db.pronunciation_attempts.aggregate(pipeline).to_list(length=5000)
-        group_pron_map = {}
-        for r in all_group_pron_res:
-            gid = str(r["group_id"])
-            if gid not in group_pron_map: group_pron_map[gid] = []
-            group_pron_map[gid].append(r)
-
-        # Get total quizzes count for each group from the quizzes collection
-        # This is more reliable as it's where the questions actually live
-        quiz_counts_res = await db.quizzes.aggregate([
-            {"$match": {"is_active": True}},
-            {"$group": {"_id": "$group_id", "count": {"$sum": 1}}}
-        ]).to_list(None)
-        quiz_count_map = {str(r["_id"]): r["count"] for r in quiz_counts_res}
-
-        groups_progress = []
-        for g in groups:
-            gid_str = str(g["_id"])
-            
-            # Situations/Quizzes
-            total_situations = g.get("quiz_count") or quiz_count_map.get(gid_str, 0)
-            
-            g_sit_atts = group_sit_stats.get(gid_str, [])
-            avg_sit_score = 0.0
-            highest_points = 0
-            latest_points = 0
-            
-            # Calculate unique situations answered from these attempts (Số câu đã làm qua)
-            unique_sits = set()
-            for ga in g_sit_atts:
-                for sit_item in ga.get("situations", []):
-                    sid = str(sit_item.get("situation_id"))
-                    if sid: unique_sits.add(sid)
-            
-            unique_answered = len(unique_sits)
-            
-            if g_sit_atts:
-                g_sit_atts = sorted(g_sit_atts, key=lambda x: x.get("submitted_at", datetime.min), reverse=True)
-                total_pct = 0.0
-                for ga in g_sit_atts:
-                    n = len(ga.get("situations", []))
-                    if n > 0:
-                        s = ga.get("total_score", 0)
-                        if s > 100 or (s > 0 and s % 100 == 0): s /= 100
-                        p = (s / n) * 100
-                        total_pct += p
-                        if int(s) > highest_points:
-                            highest_points = int(s)
-                
-                avg_sit_score = total_pct / len(g_sit_atts)
-                
-                # Latest result
-                latest_ga = g_sit_atts[0]
-                s_latest = latest_ga.get("total_score", 0)
-                if s_latest > 100 or (s_latest > 0 and s_latest % 100 == 0): s_latest /= 100
-                latest_points = int(s_latest)
-
-            # Pronunciation attempts count for group
-            g_pron_atts = group_pron_map.get(gid_str, [])
-            avg_p_score = 0.0; latest_p_score = 0.0; highest_p_score = 0.0
-            if g_pron_atts:
-                g_pron_atts = sorted(g_pron_atts, key=lambda x: x.get("created_at", datetime.min), reverse=True)
-                avg_p_score = sum(pr.get("score", 0.0) for pr in g_pron_atts) / len(g_pron_atts)
-                latest_p_score = g_pron_atts[0].get("score", 0.0)
-                highest_p_score = max(pr.get("score", 0.0) for pr in g_pron_atts)
-
-            groups_progress.append({
-                "group_id": gid_str, "group_number": g.get("group_number"), "name": g["name"],
-                "description": g.get("description", ""), "color": g.get("color_hex", "#0052D4"),
-                "total_answers": unique_answered + len(g_pron_atts),
-                "situation_score": {
-                    "average": round(float(avg_sit_score), 1), 
-                    "highest": {"point": highest_points, "total": total_situations}, 
-                    "completed": unique_answered,
-                    "latest": {"point": latest_points, "total": total_situations}
-                },
-                "pronunciation_score": {
-                    "average": round(float(avg_p_score/10 if avg_p_score > 10 else avg_p_score), 1),
-                    "highest": round(float(highest_p_score/10 if highest_p_score > 10 else highest_p_score), 1),
-                    "latest": round(float(latest_p_score/10 if latest_p_score > 10 else latest_p_score), 1)
-                }
-            })
-
-        # 6. Final aggregated stats
-        avg_percentage = sum(p["score"] / p["max_score"] * 100 for p in quiz_data_points) / len(quiz_data_points) if quiz_data_points else 0
-        total_quizzes = len(quiz_data_points)
-        total_encountered = len(encountered_ids)
-        
-        all_activities = [p.get("created_at") for p in pronunciation_attempts if isinstance(p.get("created_at"), datetime)] + \
-                         [q["submitted_at"] for q in quiz_data_points]
-        last_active_dt = max(all_activities) if all_activities else None
-        days_active = len(set(dt.date() for dt in all_activities))
+        stats = (user or {}).get("stats", {})
 
         return APIResponse(
             success=True,
             data={
                 "learning_summary": {
-                    "total_study_time_minutes": current_user.get("stats", {}).get("total_study_time_minutes", 0),
-                    "total_cups": current_user.get("stats", {}).get("total_cups", 0),
-                    "total_tests": current_user.get("stats", {}).get("total_tests_completed", 0),
-                    "total_lessons": current_user.get("stats", {}).get("total_lessons_completed", 0)
-                },
-                "groups_progress": groups_progress,
-                "pronunciation": {
-                    "total_attempts": len(pronunciation_attempts),
-                    "average_score": round(sum(pron_scores) / len(pron_scores), 1) if pron_scores else 0,
-                    "recent_attempts": recent_pron_list
+                    "total_study_time_minutes": stats.get("total_study_time_minutes", 0),
+                    "total_cups": stats.get("total_cups", 0),
+                    "total_tests": stats.get("total_tests_completed", 0),
+                    "total_lessons": stats.get("total_lessons_completed", 0)
                 },
-                "situations": {
-                    "total_quizzes": total_quizzes,
-                    "total_encountered": total_encountered,
-                    "average_score_percentage": round(avg_percentage, 1),
-                    "recent_quizzes": recent_quiz_list
-                },
-                "activity": {
-                    "total_sessions": len(set([a.get("session_id") for a in pronunciation_attempts if a.get("session_id")])),
-                    "last_active": last_active_dt.isoformat() + "Z" if last_active_dt else None,
-                    "days_active": days_active
-                }
+                **data
             }
         )
 
-        
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -253,30 +59,61 @@ async def get_group_progress(
         user_id = ObjectId(current_user["_id"])
         group_obj_id = ObjectId(group_id)
         
-        # Get group
-        group = await db.groups.find_one({"_id": group_obj_id})
+        # Group catalogue and the user's situation tallies, fetched together
+        group, instructions, situations, situation_tallies = await asyncio.gather(
+            db.groups.find_one({"_id": group_obj_id}, {"name": 1}),
+            db.instructions.find(
+                {"group_id": group_obj_id, "is_active": True},
+                {"instruction_number": 1, "text": 1}
+            ).sort("instruction_number", 1).to_list(length=100),
+            db.situations.find(
+                {"group_id": group_obj_id, "is_active": True},
+                {"situation_number": 1, "title": 1}
+            ).sort("situation_number", 1).to_list(length=100),
+            # Answers per situation, tallied in the database
+            db.situation_attempts.aggregate([
+                {"$match": {"user_id": user_id, "group_id": group_obj_id}},
+                {"$project": {"_id": 0, "situations": 1}},
+                {"$unwind": "$situations"},
+                {"$group": {
+                    "_id": "$situations.situation_id",
+                    "total": {"$sum": 1},
+                    "correct": {"$sum": {"$cond": [
+                        {"$or": [
+                            {"$in": ["$situations.rating", ["best", "correct"]]},
+                            {"$eq": ["$situations.is_correct", True]},
+                            {"$eq": ["$situations.is_best_choice", True]},
+                        ]},
+                        1, 0
+                    ]}},
+                }},
+            ]).to_list(None),
+        )
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        # Get all instructions for this group
-        instructions = await db.instructions.find({
-            "group_id": group_obj_id,
-            "is_active": True
-        }).sort("instruction_number", 1).to_list(length=100)
+        # Attempt counts and best scores are kept in user_instruction_stats
+        instruction_stats = {}
+        if instructions:
+            await ensure_instruction_stats(db, user_id)
+            async for st in db.user_instruction_stats.find(
+                {
+                    "user_id": user_id,
+                    "instruction_id": {"$in": [inst["_id"] for inst in instructions]},
+                    "custom_text": None
+                },
+                {"instruction_id": 1, "attempts_count": 1, "best_score": 1}
+            ):
+                instruction_stats[st["instruction_id"]] = st
         
-        # Get user's attempts for each
         instruction_progress = []
         for inst in instructions:
-            attempts = await db.pronunciation_attempts.find({
-                "user_id": user_id,
-                "instruction_id": inst["_id"]
-            }).to_list(length=1000)
-            
-            scores = [a["assessment"]["total_score"] for a in attempts if a["assessment"].get("total_score") is not None]
-            best_score = max(scores) if scores else None
+            st = instruction_stats.get(inst["_id"], {})
+            attempts_count = st.get("attempts_count", 0)
+            best_score = st.get("best_score")
             
             # Determine status
-            if not attempts:
+            if not attempts_count:
                 status = "not_started"
             elif best_score and best_score >= 90:
                 status = "mastered"
@@ -286,36 +123,18 @@ async def get_group_progress(
             instruction_progress.append({
                 "instruction_number": inst["instruction_number"],
                 "text": inst["text"],
-                "attempts_count": len(attempts),
+                "attempts_count": attempts_count,
                 "best_score": best_score,
                 "status": status
             })
         
-        # Get situations for this group
-        situations = await db.situations.find({
-            "group_id": group_obj_id,
-            "is_active": True
-        }).sort("situation_number", 1).to_list(length=100)
-        
-        # Get quiz attempts
-        quiz_attempts = await db.situation_attempts.find({
-            "user_id": user_id,
-            "group_id": group_obj_id
-        }).to_list(length=1000)
-        
-        # Track which situations were encountered
         situation_stats = {}
-        for quiz in quiz_attempts:
-            for sit_answer in quiz.get("situations", []):
-                sit_id = str(sit_answer["situation_id"])
-                if sit_id not in situation_stats:
-                    situation_stats[sit_id] = {"correct": 0, "incorrect": 0, "total": 0}
-                
-                situation_stats[sit_id]["total"] += 1
-                if sit_answer.get("rating") == "best" or sit_answer.get("rating") == "correct" or sit_answer.get("is_correct") or sit_answer.get("is_best_choice"):
-                    situation_stats[sit_id]["correct"] += 1
-                else:
-                    situation_stats[sit_id]["incorrect"] += 1
+        for t in situation_tallies:
+            situation_stats[str(t["_id"])] = {
+                "correct": t["correct"],
+                "incorrect": t["total"] - t["correct"],
+                "total": t["total"]
+            }
         
         situation_progress = []
         for sit in situations:
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.mongodb import get_database
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_principal
 from app.models.group import GroupResponse
 from app.schemas.auth import APIResponse
 from typing import List, Dict, Any
@@ -12,7 +12,7 @@ router = APIRouter(prefix="/groups", tags=["groups"])
 
 @router.get("", response_model=APIResponse)
 async def get_groups(
-    current_user: Dict[str, Any] = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(get_current_principal),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get all active groups with their counts."""
@@ -52,7 +52,7 @@ async def get_groups(
 @router.get("/{group_id}", response_model=APIResponse)
 async def get_group(
     group_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(get_current_principal),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get single group with all its content."""
@@ -1,10 +1,19 @@
 """Pronunciation endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.mongodb import get_database
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, get_current_principal
 from app.schemas.auth import APIResponse
 from app.schemas.pronunciation import PronunciationAssessResponse, Assessment, PronunciationError
+from app.services.admission import AdmissionRejected, ASR_ONLY
+from app.services.audio_storage import persist_attempt_audio
+from app.services.audio_io import check_upload, decode_audio, is_raw_pcm, AudioUploadError, SAMPLE_RATE
+from app.services.reference_templates import load_reference_template, usable_template_key
+from app.services.attempt_stats import ensure_instruction_stats, record_attempt
+from app.services.dashboard_stats import record_pronunciation
+from app.core.config import settings
+from fastapi.concurrency import run_in_threadpool
+import os
 from typing import Dict, Any, Optional
 from bson import ObjectId
 from datetime import datetime, timezone, timedelta
@@ -18,7 +27,7 @@ router = APIRouter(prefix="/pronunciation", tags=["pronunciation"])
 @router.get("/instructions/{group_id}", response_model=APIResponse)
 async def get_instructions(
     group_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(get_current_principal),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get all instructions for a group with user stats."""
@@ -28,24 +37,30 @@ async def get_instructions(
             {"group_id": ObjectId(group_id), "is_active": True}
         ).sort("instruction_number", 1).to_list(length=100)
         
-        # Get user's attempt stats for each instruction
+        # Get user's stats for all instructions (maintained by /assess)
+        await ensure_instruction_stats(db, ObjectId(current_user["_id"]))
+        stats_cursor = db.user_instruction_stats.find(
+            {
+                "user_id": ObjectId(current_user["_id"]),
+                "instruction_id": {"$in": [inst["_id"] for inst in instructions]},
+                "custom_text": None
+            },
+            {"_id": 0, "instruction_id": 1, "attempts_count": 1, "best_score": 1,
+             "worst_score": 1, "last_attempt_at": 1}
+        )
+        stats_by_instruction = {doc["instruction_id"]: doc async for doc in stats_cursor}
+        
         for inst in instructions:
+            stats = stats_by_instruction.get(inst["_id"])
             inst["id"] = str(inst.pop("_id"))
             inst["group_id"] = str(inst["group_id"])
             
-            # Get user stats
-            attempts = await db.pronunciation_attempts.find({
-                "user_id": ObjectId(current_user["_id"]),
-                "instruction_id": ObjectId(inst["id"])
-            }).to_list(length=1000)
-            
-            if attempts:
-                scores = [a["assessment"]["total_score"] for a in attempts if a["assessment"].get("total_score") is not None]
+            if stats:
                 inst["user_stats"] = {
-                    "attempts_count": len(attempts),
-                    "best_score": max(scores) if scores else None,
-                    "worst_score": min(scores) if scores else None,
-                    "last_attempt_date": max(a["created_at"] for a in attempts).isoformat() + "Z"
+                    "attempts_count": stats["attempts_count"],
+                    "best_score": stats.get("best_score"),
+                    "worst_score": stats.get("worst_score"),
+                    "last_attempt_date": stats["last_attempt_at"].isoformat() + "Z"
                 }
             else:
                 inst["user_stats"] = {
@@ -77,10 +92,12 @@ import traceback
 @router.post("/assess", response_model=APIResponse)
 async def assess_pronunciation(
     request: Request,
+    background_tasks: BackgroundTasks,
     audio_file: UploadFile = File(...),
     instruction_id: Optional[str] = Form(None),
     custom_text: Optional[str] = Form(None),
     session_id: str = Form(...),
+    audio_format: Optional[str] = Form(None),
     current_user: Dict[str, Any] = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -112,57 +129,100 @@ async def assess_pronunciation(
         else:
             target_text = custom_text
             group_id = None
+            instruction = None
         
-        # Read audio file
-        audio_data = await audio_file.read()
-        
-        # Save to temporary file for Whisper and MFA processing
-        import tempfile
-        import os
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav", mode="wb") as tmp_audio:
-            tmp_audio.write(audio_data)
-            tmp_audio.flush()
-            tmp_audio_path = tmp_audio.name
-            
+        # Use Rule-based Engine (Whisper + MFA)
+        engine = getattr(request.app.state, "pronunciation_engine", None)
+        if not engine:
+            raise HTTPException(
+                status_code=503,
+                detail="Pronunciation engine is still preloading. Please wait a moment and try again."
+            )
+
+        # Precomputed reference template (scripts/build_reference_templates.py)
+        template = None
+        template_key = usable_template_key(instruction, engine.acoustic_model, target_text) \
+            if instruction and settings.REFERENCE_SCORING else None
+        if template_key:
+            try:
+                template = await run_in_threadpool(load_reference_template, template_key)
+            except Exception as e:
+                print(f"Reference template {template_key} unavailable: {e}")
+
+        # The body is already spooled; refuse oversized or non-audio
+        # payloads before decoding them
         try:
-            # Use Rule-based Engine (Whisper + MFA)
-            engine = getattr(request.app.state, "pronunciation_engine", None)
-            if not engine:
-                raise HTTPException(
-                    status_code=503,
-                    detail="Pronunciation engine is still preloading. Please wait a moment and try again."
-                )
+            audio_fmt = await check_upload(
+                audio_file,
+                max_bytes=settings.MAX_AUDIO_FILE_SIZE,
+                max_seconds=settings.MAX_AUDIO_DURATION_SECONDS,
+                raw_pcm=is_raw_pcm(audio_format, audio_file.content_type)
+            )
+        except AudioUploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-            assessment_result = await engine.assess(
-                audio_path=tmp_audio_path,
-                target_text=target_text
+        # Decode at most just past the limit so overlong recordings are cheap to refuse
+        audio = await run_in_threadpool(
+            decode_audio, audio_file.file, audio_fmt, engine.load_audio,
+            settings.MAX_AUDIO_DURATION_SECONDS + 1
+        )
+        sr = SAMPLE_RATE
+        if len(audio) / sr > settings.MAX_AUDIO_DURATION_SECONDS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Recording is too long. Maximum length is {settings.MAX_AUDIO_DURATION_SECONDS} seconds."
             )
-                
-            if assessment_result.get("total_score") == 0 and not assessment_result.get("asr_transcript"):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Could not transcribe audio. Please ensure you spoke clearly and try again."
+        audio_duration = len(audio) / sr
+
+        # Clients may announce how long they will wait for the response
+        client_timeout = request.headers.get("X-Client-Timeout")
+        try:
+            deadline = float(client_timeout) if client_timeout else None
+        except ValueError:
+            deadline = None
+
+        admission = request.app.state.assessment_admission
+        try:
+            async with admission.slot(audio_duration, len(target_text.split()), deadline) as mode:
+                assessment_result = await engine.assess(
+                    audio_path=None,
+                    target_text=target_text,
+                    audio=audio,
+                    asr_only=(mode == ASR_ONLY),
+                    template=template
                 )
-                
-        finally:
-            if os.path.exists(tmp_audio_path):
-                os.remove(tmp_audio_path)
-        
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The pronunciation engine is busy. Please try again shortly.",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            
+        if assessment_result.get("total_score") == 0 and not assessment_result.get("asr_transcript"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Could not transcribe audio. Please ensure you spoke clearly and try again."
+            )
+
         # Calculate processing time
         processing_time = int((time.time() - start_time) * 1000)
         assessment_result["processing_time_ms"] = processing_time
         
-        # Save audio file (simplified - in production use proper storage)
-        # audio_filename = f"user{current_user['_id']}_{int(time.time())}.wav"
-        # Save to disk or cloud storage
+        # Older attempts must be in the stats before this one is counted
+        await ensure_instruction_stats(db, ObjectId(current_user["_id"]))
+        created_at = datetime.now(timezone.utc)
         
-        # Count attempts for this instruction
-        attempt_count = await db.pronunciation_attempts.count_documents({
-            "user_id": ObjectId(current_user["_id"]),
-            "instruction_id": ObjectId(instruction_id) if instruction_id else None,
-            "custom_text": custom_text if custom_text else None
-        }) + 1
+        # Count the attempt in the per-instruction stats; the updated
+        # document gives this attempt's number and the new best/worst
+        stats = await record_attempt(
+            db,
+            user_id=ObjectId(current_user["_id"]),
+            instruction_id=ObjectId(instruction_id) if instruction_id else None,
+            custom_text=custom_text,
+            group_id=group_id,
+            score=assessment_result["total_score"],
+            created_at=created_at
+        )
         
         # Save attempt to database
         attempt_doc = {
@@ -170,17 +230,31 @@ async def assess_pronunciation(
             "instruction_id": ObjectId(instruction_id) if instruction_id else None,
             "custom_text": custom_text,
             "group_id": group_id,
-            "audio_file_path": "",  # Placeholder
-            "audio_duration_seconds": 0,  # Placeholder
+            "audio_file_path": "",  # Set by the background audio upload
+            "audio_duration_seconds": round(audio_duration, 2),
             "assessment": assessment_result,
-            "attempt_number": attempt_count,
-            "created_at": datetime.now(timezone.utc),
+            "engine_version": engine.version,
+            "attempt_number": stats["attempts_count"],
+            "created_at": created_at,
             "session_id": session_id
         }
         
         result = await db.pronunciation_attempts.insert_one(attempt_doc)
         attempt_id = str(result.inserted_id)
         
+        await record_pronunciation(
+            db,
+            user_id=ObjectId(current_user["_id"]),
+            group_id=group_id,
+            text=target_text,
+            score=assessment_result["total_score"],
+            session_id=session_id,
+            created_at=created_at
+        )
+        
+        # Compress and store the recording after the response has been sent
+        background_tasks.add_task(persist_attempt_audio, db, attempt_id, audio)
+        
         # Update user stats
         await db.users.update_one(
             {"_id": ObjectId(current_user["_id"])},
@@ -190,17 +264,10 @@ async def assess_pronunciation(
             }
         )
         
-        # Get updated user stats for this instruction
-        all_attempts = await db.pronunciation_attempts.find({
-            "user_id": ObjectId(current_user["_id"]),
-            "instruction_id": ObjectId(instruction_id) if instruction_id else None
-        }).to_list(length=1000)
-        
-        scores = [a["assessment"]["total_score"] for a in all_attempts if a["assessment"].get("total_score") is not None]
         user_stats = {
-            "attempts_count": len(all_attempts),
-            "best_score": max(scores) if scores else None,
-            "worst_score": min(scores) if scores else None
+            "attempts_count": stats["attempts_count"],
+            "best_score": stats.get("best_score"),
+            "worst_score": stats.get("worst_score")
         }
         
         return APIResponse(
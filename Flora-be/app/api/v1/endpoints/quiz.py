@@ -4,6 +4,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.mongodb import get_database
 from app.core.dependencies import get_current_user
 from app.schemas.auth import APIResponse
+from app.services.dashboard_stats import record_quiz
 from typing import Dict, Any, List, Optional
 from bson import ObjectId
 from datetime import datetime, timezone
@@ -89,12 +90,21 @@ async def submit_quiz(
         correct_count = 0
         incorrect_count = 0
         
-        for answer in answers:
+        # All answered questions in one query
+        question_ids = [ObjectId(answer.get("quiz_id")) for answer in answers]
+        questions = {
+            q["_id"]: q
+            async for q in db.quizzes.find(
+                {"_id": {"$in": question_ids}},
+                {"question": 1, "choices": 1, "best_choice_id": 1, "explanation": 1, "principle": 1}
+            )
+        }
+        
+        for answer, question_id in zip(answers, question_ids):
             q_id = answer.get("quiz_id")
             selected_choice_id = answer.get("selected_choice_id")
             
-            # Get quiz question
-            quiz_q = await db.quizzes.find_one({"_id": ObjectId(q_id)})
+            quiz_q = questions.get(question_id)
             if not quiz_q:
                 continue
             
@@ -153,6 +163,14 @@ async def submit_quiz(
             "results": results
         }
         await db.quiz_attempts.insert_one(attempt_doc)
+        await record_quiz(
+            db,
+            user_id=attempt_doc["user_id"],
+            group_id=None,
+            answered_ids=[r["quiz_id"] for r in results],
+            total_score=total_score,
+            submitted_at=attempt_doc["submitted_at"]
+        )
         
         # Update user stats
         await db.users.update_one(
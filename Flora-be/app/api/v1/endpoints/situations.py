@@ -4,6 +4,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.mongodb import get_database
 from app.core.dependencies import get_current_user
 from app.schemas.auth import APIResponse
+from app.services.dashboard_stats import record_quiz
 from typing import Dict, Any, List
 from bson import ObjectId
 from datetime import datetime, timezone
@@ -102,13 +103,25 @@ async def submit_quiz(
         correct_count = 0
         incorrect_count = 0
         
-        for answer in answers:
+        # All answered situations in one query
+        situation_ids = [ObjectId(answer.get("situation_id")) for answer in answers]
+        situations = {
+            s["_id"]: s
+            async for s in db.quizzes.find(
+                {"_id": {"$in": situation_ids}},
+                {
+                    "title": 1, "question": 1, "choices": 1, "best_choice_id": 1,
+                    "explanation": 1, "principle": 1, "group_id": 1
+                }
+            )
+        }
+        
+        for answer, situation_obj_id in zip(answers, situation_ids):
             situation_id = answer.get("situation_id")
             selected_choice_id = answer.get("selected_choice_id")
             time_spent = answer.get("time_spent_seconds", 0)
             
-            # Get situation
-            situation = await db.quizzes.find_one({"_id": ObjectId(situation_id)})
+            situation = situations.get(situation_obj_id)
             if not situation:
                 continue
             
@@ -159,8 +172,8 @@ async def submit_quiz(
             })
         
         # Get group_id from first situation
-        first_situation = await db.quizzes.find_one({"_id": ObjectId(answers[0]["situation_id"])})
-        group_id = first_situation["group_id"] if first_situation else None
+        first_situation = situations.get(situation_ids[0])
+        group_id = first_situation.get("group_id") if first_situation else None
         
         # Save to database
         attempt_doc = {
@@ -187,6 +200,14 @@ async def submit_quiz(
         }
         
         await db.situation_attempts.insert_one(attempt_doc)
+        await record_quiz(
+            db,
+            user_id=attempt_doc["user_id"],
+            group_id=group_id,
+            answered_ids=[s["situation_id"] for s in attempt_doc["situations"]],
+            total_score=total_score,
+            submitted_at=attempt_doc["submitted_at"]
+        )
         
         # Update user stats
         await db.users.update_one(
@@ -13,6 +13,7 @@ class Settings(BaseSettings):
     # Database
     MONGODB_URL: str
     MONGODB_DB_NAME: str = "flora_db"
+    ENSURE_INDEXES: bool = True  # create declared indexes (app/db/indexes.py) on startup
     
     # AI
     GEMINI_API_KEY: str
@@ -21,6 +22,10 @@ class Settings(BaseSettings):
     # JWT
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    USER_CACHE_TTL_SECONDS: int = 30  # authenticated user lookups cached per worker (0 = off)
+    BCRYPT_ROUNDS: int = 12  # existing hashes are upgraded on the next login
+    PASSWORD_HASH_THREADS: int = 2  # concurrent bcrypt operations per worker
+    PASSWORD_HASH_PROCESSES: int = 2  # processes hashing passwords for bulk user imports
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
@@ -28,6 +33,28 @@ class Settings(BaseSettings):
     # Storage
     AUDIO_STORAGE_PATH: str = "./app/static/audio"
     MAX_AUDIO_FILE_SIZE: int = 10485760  # 10MB
+    MAX_AUDIO_DURATION_SECONDS: int = 180
+    AUDIO_STORAGE_BACKEND: str = "local"  # local | s3
+    AUDIO_S3_BUCKET: str = ""
+    AUDIO_S3_PREFIX: str = ""
+    AUDIO_S3_ENDPOINT_URL: str = ""  # e.g. a local MinIO for development
+    AUDIO_RETENTION_DAYS: int = 180
+    
+    # Server (scripts/serve.py)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 2
+    
+    # Pronunciation engine
+    ENGINE_INFERENCE_WORKERS: int = 2
+    ENGINE_CHUNK_SECONDS: float = 20.0
+    ASSESS_DEADLINE_SECONDS: float = 20.0
+    INFERENCE_CORES: int = 0  # 0 = all CPUs available to the pod
+    CPU_AFFINITY: bool = False
+    REFERENCE_SCORING: bool = False  # score instructions against their reference template (DTW)
+    
+    # Admin
+    ADMIN_STATS_CACHE_SECONDS: int = 60  # admin dashboard stats cached per worker
     
     @property
     def cors_origins_list(self) -> List[str]:
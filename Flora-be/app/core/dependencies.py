@@ -3,18 +3,58 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.mongodb import get_database
+from app.core.config import settings
 from app.core.security import decode_token
 from bson import ObjectId
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import time
 
 security = HTTPBearer()
 
+# user_id -> (expires at, principal fields). Per process: an invalidation
+# only reaches the worker that made the change, other workers pick it up
+# within USER_CACHE_TTL_SECONDS.
+_user_cache: "OrderedDict[str, tuple]" = OrderedDict()
+USER_CACHE_MAX_SIZE = 10000
+
+# What get_current_user returns; fast-changing fields such as stats are
+# read by the endpoints that need them
+PRINCIPAL_FIELDS = ("username", "email", "role", "is_active", "full_name")
+
+
+def _cached_user(user_id: str) -> Optional[Dict[str, Any]]:
+    entry = _user_cache.get(user_id)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        _user_cache.pop(user_id, None)
+        return None
+    return dict(entry[1])
+
+
+def _cache_user(user_id: str, user: Dict[str, Any]):
+    if settings.USER_CACHE_TTL_SECONDS <= 0:
+        return
+    _user_cache[user_id] = (time.monotonic() + settings.USER_CACHE_TTL_SECONDS, user)
+    _user_cache.move_to_end(user_id)
+    while len(_user_cache) > USER_CACHE_MAX_SIZE:
+        _user_cache.popitem(last=False)
+
+
+def invalidate_user_cache(user_id: Optional[str] = None):
+    """Drop a user's cached principal (or all) after changing their account."""
+    if user_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(str(user_id), None)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ) -> Dict[str, Any]:
-    """Get current authenticated user from JWT token."""
+    """Get current authenticated user from JWT token (_id and PRINCIPAL_FIELDS)."""
     try:
         # Decode token
         payload = decode_token(credentials.credentials)
@@ -26,13 +66,22 @@ async def get_current_user(
                 detail="Invalid authentication credentials"
             )
         
-        # Get user from database
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
+        user = _cached_user(user_id)
+        if user is None:
+            # Get user from database
+            user = await db.users.find_one(
+                {"_id": ObjectId(user_id)},
+                {field: 1 for field in PRINCIPAL_FIELDS}
             )
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found"
+                )
+            
+            # Convert ObjectId to string for JSON serialization
+            user["_id"] = str(user["_id"])
+            _cache_user(user_id, user)
         
         if not user.get("is_active", True):
             raise HTTPException(
@@ -40,9 +89,7 @@ async def get_current_user(
                 detail="Inactive user"
             )
         
-        # Convert ObjectId to string for JSON serialization
-        user["_id"] = str(user["_id"])
-        return user
+        return dict(user)
         
     except ValueError as e:
         raise HTTPException(
@@ -56,6 +103,41 @@ async def get_current_user(
         )
 
 
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> Dict[str, Any]:
+    """Identity from the access token claims alone, for read-only routes.
+
+    Returns {"_id", "username", "role"} without a database lookup, so a
+    deactivated user keeps read access until the access token expires
+    (ACCESS_TOKEN_EXPIRE_MINUTES). Tokens without those claims fall back to
+    get_current_user.
+    """
+    try:
+        payload = decode_token(credentials.credentials)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+    
+    if payload.get("type") == "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials"
+        )
+    
+    if not payload.get("sub") or not payload.get("role"):
+        return await get_current_user(credentials, db)
+    
+    return {
+        "_id": payload["sub"],
+        "username": payload.get("username"),
+        "role": payload["role"]
+    }
+
+
 async def get_current_admin(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
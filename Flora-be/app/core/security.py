@@ -1,12 +1,27 @@
 """Security utilities for JWT and password hashing."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from app.core.config import settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing. Hashes made with a different cost are still accepted and
+# flagged for rehashing (see verify_and_update_password).
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt releases the GIL, so a few threads hash in parallel while the event
+# loop keeps serving; the pool size caps concurrent hashes per worker and
+# extra calls wait in its queue.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_THREADS,
+    thread_name_prefix="password-hash"
+)
 
 
 def hash_password(password: str) -> str:
@@ -19,6 +34,33 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash a batch of passwords; the unit of work sent to a process pool."""
+    return [pwd_context.hash(p) for p in passwords]
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the password-hash thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the password-hash thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; on success also return a new hash if the stored one
+    uses outdated settings (e.g. BCRYPT_ROUNDS changed), else None.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _hash_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -0,0 +1,201 @@
+"""Declared MongoDB indexes, and checks that the app's queries use them."""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# collection -> indexes the app's queries need (the _id index is implicit).
+# Names are left to pymongo's default (e.g. "user_id_1_created_at_-1").
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        # Admin user list: keyset order per sort option (also sign-up counts by date)
+        IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("username", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("email", ASCENDING), ("_id", ASCENDING)]),
+        # Admin user search by prefix (app.services.user_listing.build_filter)
+        IndexModel([("search_keys", ASCENDING)]),
+        # Admin dashboard top users
+        IndexModel([("stats.total_pronunciation_attempts", DESCENDING)]),
+    ],
+    "groups": [
+        IndexModel([("group_number", ASCENDING)]),
+    ],
+    "instructions": [
+        IndexModel([("group_id", ASCENDING), ("is_active", ASCENDING), ("instruction_number", ASCENDING)]),
+    ],
+    "situations": [
+        IndexModel([("group_id", ASCENDING), ("is_active", ASCENDING), ("situation_number", ASCENDING)]),
+    ],
+    "quizzes": [
+        IndexModel([("group_id", ASCENDING), ("is_active", ASCENDING)]),
+        IndexModel([("quiz_number", ASCENDING)]),
+    ],
+    "lessons": [
+        IndexModel([("group_id", ASCENDING), ("lesson_number", ASCENDING)]),
+    ],
+    "pronunciation_attempts": [
+        # Per-user history and per-instruction stats
+        IndexModel([("user_id", ASCENDING), ("instruction_id", ASCENDING), ("created_at", DESCENDING)]),
+        # Recent activity per user
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        # Admin timelines and "active today"
+        IndexModel([("created_at", ASCENDING)]),
+        # Audio retention clears references by key
+        IndexModel([("audio_file_path", ASCENDING)]),
+        # Admin exports of a group, in date order
+        IndexModel([("group_id", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "situation_attempts": [
+        IndexModel([("user_id", ASCENDING), ("group_id", ASCENDING), ("submitted_at", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("submitted_at", DESCENDING)]),
+        IndexModel([("submitted_at", ASCENDING)]),
+        # Per-group stats and admin exports of a group, in date order
+        IndexModel([("group_id", ASCENDING), ("submitted_at", ASCENDING)]),
+    ],
+    "quiz_attempts": [
+        IndexModel([("user_id", ASCENDING), ("submitted_at", DESCENDING)]),
+        IndexModel([("submitted_at", ASCENDING)]),
+    ],
+    "user_instruction_stats": [
+        # Upsert key of app.services.attempt_stats.record_attempt
+        IndexModel([("user_id", ASCENDING), ("instruction_id", ASCENDING), ("custom_text", ASCENDING)], unique=True),
+    ],
+    "user_dashboard_summary": [
+        # One summary per user, see app.services.dashboard_stats
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+}
+
+_SAMPLE_ID = ObjectId("000000000000000000000000")
+_SAMPLE_DATE = datetime(2024, 1, 1)
+
+# Representative queries of the hot endpoints: (name, collection, command body)
+QUERY_CHECKS = [
+    ("login", "users", {"find": "users", "filter": {"username": "someone"}}),
+    ("admin user list", "users", {
+        "find": "users",
+        "filter": {},
+        "sort": {"created_at": -1, "_id": -1},
+        "limit": 21,
+    }),
+    ("instructions of group", "instructions", {
+        "find": "instructions",
+        "filter": {"group_id": _SAMPLE_ID, "is_active": True},
+        "sort": {"instruction_number": 1},
+    }),
+    ("situations of group", "situations", {
+        "find": "situations",
+        "filter": {"group_id": _SAMPLE_ID, "is_active": True},
+        "sort": {"situation_number": 1},
+    }),
+    # Situation quizzes draw their questions from the quizzes collection
+    ("situation quiz questions of group", "quizzes", {
+        "find": "quizzes",
+        "filter": {"group_id": _SAMPLE_ID, "is_active": True},
+    }),
+    ("instruction stats", "user_instruction_stats", {
+        "find": "user_instruction_stats",
+        "filter": {"user_id": _SAMPLE_ID, "instruction_id": {"$in": [_SAMPLE_ID]}, "custom_text": None},
+    }),
+    ("user pronunciation history", "pronunciation_attempts", {
+        "find": "pronunciation_attempts",
+        "filter": {"user_id": _SAMPLE_ID},
+        "sort": {"created_at": -1},
+    }),
+    ("user attempts of instruction", "pronunciation_attempts", {
+        "find": "pronunciation_attempts",
+        "filter": {"user_id": _SAMPLE_ID, "instruction_id": _SAMPLE_ID},
+    }),
+    ("user situation attempts of group", "situation_attempts", {
+        "find": "situation_attempts",
+        "filter": {"user_id": _SAMPLE_ID, "group_id": _SAMPLE_ID},
+    }),
+    ("user quiz attempts", "quiz_attempts", {
+        "find": "quiz_attempts",
+        "filter": {"user_id": _SAMPLE_ID},
+    }),
+    ("pronunciation timeline", "pronunciation_attempts", {
+        "aggregate": "pronunciation_attempts",
+        "pipeline": [
+            {"$match": {"created_at": {"$gte": _SAMPLE_DATE}}},
+            {"$group": {"_id": None, "count": {"$sum": 1}}},
+        ],
+        "cursor": {},
+    }),
+    ("situation timeline", "situation_attempts", {
+        "aggregate": "situation_attempts",
+        "pipeline": [
+            {"$match": {"submitted_at": {"$gte": _SAMPLE_DATE}}},
+            {"$group": {"_id": None, "count": {"$sum": 1}}},
+        ],
+        "cursor": {},
+    }),
+]
+
+
+async def ensure_indexes(db, collections: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Create declared indexes (a no-op for ones that exist). Returns collection -> status."""
+    results = {}
+    for name in collections or INDEXES:
+        try:
+            await db[name].create_indexes(INDEXES[name])
+            results[name] = "ok"
+        except OperationFailure as e:
+            # e.g. duplicates blocking a unique index; keep serving, report it
+            results[name] = f"error: {e.details.get('errmsg', e) if e.details else e}"
+            print(f"⚠ Could not create indexes on {name}: {results[name]}")
+    return results
+
+
+async def index_report(db) -> Dict[str, dict]:
+    """Per collection: declared indexes that are missing, existing ones not
+    declared, and existing ones with no recorded use since the server started.
+    """
+    report = {}
+    for name, models in INDEXES.items():
+        existing = {}
+        async for idx in db[name].list_indexes():
+            existing[idx["name"]] = idx
+
+        declared = {m.document["name"] for m in models}
+
+        usage = {}
+        try:
+            async for stat in db[name].aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]["ops"]
+        except OperationFailure:
+            pass
+
+        report[name] = {
+            "missing": sorted(declared - set(existing)),
+            "undeclared": sorted(set(existing) - declared - {"_id_"}),
+            "unused": sorted(n for n, ops in usage.items() if ops == 0 and n != "_id_"),
+        }
+    return report
+
+
+def _has_collscan(plan) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(v) for k, v in plan.items() if k != "rejectedPlans")
+    if isinstance(plan, list):
+        return any(_has_collscan(v) for v in plan)
+    return False
+
+
+async def explain_checks(db) -> List[dict]:
+    """Explain each QUERY_CHECKS query; `indexed` is False for collection scans."""
+    results = []
+    for name, collection, command in QUERY_CHECKS:
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        results.append({
+            "name": name,
+            "collection": collection,
+            "indexed": not _has_collscan(explain),
+        })
+    return results
@@ -2,11 +2,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 from app.core.config import settings
-from app.db.mongodb import connect_to_mongo, close_mongo_connection
+from app.core.middleware import MaxBodySizeMiddleware
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, get_database
+from app.db.indexes import ensure_indexes
 from app.api.v1.api import api_router
 import os
+from datetime import datetime, timezone
+from app.services import pronunciation_engine
 from app.services.pronunciation_engine import PronunciationEngine
+from app.services.admission import AdmissionController
+from app.services.thread_budget import ThreadBudget
+from app.services.user_import import shutdown_hash_pool
+from app.services.user_listing import lowercase_stored_emails, refresh_search_keys
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -17,13 +26,45 @@ app = FastAPI(
 @app.on_event("startup")
 async def load_pronunciation_engine():
 
-    print("Preloading pronunciation engine...")
-
-    app.state.pronunciation_engine = PronunciationEngine()
+    # Split the inference cores between server workers and libraries before
+    # any thread pool is created; FLORA_WORKER_INDEX is set by scripts/serve.py
+    worker_index = os.environ.get("FLORA_WORKER_INDEX")
+    budget = ThreadBudget.from_settings(
+        settings,
+        worker_index=int(worker_index) if worker_index is not None else None
+    )
+    budget.apply()
+    app.state.thread_budget = budget
+
+    if pronunciation_engine.preloaded_engine is not None:
+        # Weights were loaded once by scripts/serve.py before forking this worker
+        engine = pronunciation_engine.preloaded_engine
+        engine.after_fork(cpu_threads=budget.threads_per_job)
+        app.state.pronunciation_engine = engine
+    else:
+        print("Preloading pronunciation engine...")
+
+        app.state.pronunciation_engine = PronunciationEngine(
+            inference_workers=settings.ENGINE_INFERENCE_WORKERS,
+            chunk_seconds=settings.ENGINE_CHUNK_SECONDS,
+            cpu_threads=budget.threads_per_job
+        )
+
+    app.state.assessment_admission = AdmissionController(
+        slots=settings.ENGINE_INFERENCE_WORKERS,
+        deadline_seconds=settings.ASSESS_DEADLINE_SECONDS
+    )
 
     print("Pronunciation engine ready")
     
-# CORS middleware
+# Cut off oversized audio uploads while they stream in (file + form fields)
+app.add_middleware(
+    MaxBodySizeMiddleware,
+    max_body_size=settings.MAX_AUDIO_FILE_SIZE + 64 * 1024,
+    paths=["/api/v1/pronunciation/assess"]
+)
+
+# CORS middleware; added last so it is outermost and the 413 above carries CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -42,16 +83,45 @@ async def startup_event():
     os.makedirs(f"{settings.AUDIO_STORAGE_PATH}/reference", exist_ok=True)
     os.makedirs(f"{settings.AUDIO_STORAGE_PATH}/attempts", exist_ok=True)
 
+    # Declared indexes (app/db/indexes.py); existing ones are left alone
+    if settings.ENSURE_INDEXES:
+        await ensure_indexes(get_database())
+
+    # Users stored before emails were lowercased, or before the admin
+    # search used search_keys
+    await lowercase_stored_emails(get_database())
+    await refresh_search_keys(get_database(), {"search_keys": {"$exists": False}})
+
+    # Record what each engine_version stored on attempts stands for
+    engine = getattr(app.state, "pronunciation_engine", None)
+    if engine:
+        await get_database().engine_versions.update_one(
+            {"_id": engine.version},
+            {
+                "$setOnInsert": {**engine.version_info(), "first_seen_at": datetime.now(timezone.utc)},
+                "$set": {"last_seen_at": datetime.now(timezone.utc)}
+            },
+            upsert=True
+        )
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connection on shutdown."""
     await close_mongo_connection()
 
+    engine = getattr(app.state, "pronunciation_engine", None)
+    if engine:
+        engine.close()
 
-# Mount static files
-if os.path.exists(settings.AUDIO_STORAGE_PATH):
-    app.mount("/audio", StaticFiles(directory=settings.AUDIO_STORAGE_PATH), name="audio")
+    shutdown_hash_pool()
+
+
+# Mount static files: only the reference recordings are public, attempt
+# audio and templates under the same storage root are not
+reference_audio_dir = os.path.join(settings.AUDIO_STORAGE_PATH, "reference")
+if os.path.exists(reference_audio_dir):
+    app.mount("/audio/reference", StaticFiles(directory=reference_audio_dir), name="audio")
 
 
 # Include API router
@@ -69,6 +139,26 @@ async def health_check():
     }
 
 
+# Readiness endpoint
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: engine loaded, with its CPU budget and queue state."""
+    engine = getattr(app.state, "pronunciation_engine", None)
+    admission = getattr(app.state, "assessment_admission", None)
+    budget = getattr(app.state, "thread_budget", None)
+
+    body = {
+        "status": "ready" if engine and admission else "loading",
+        "engine_version": engine.version if engine else None,
+        "thread_budget": budget.as_dict() if budget else None,
+        "admission": admission.stats() if admission else None
+    }
+
+    if not (engine and admission):
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
 # Root endpoint
 @app.get("/")
 async def root():
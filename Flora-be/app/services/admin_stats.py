@@ -0,0 +1,570 @@
+"""Admin dashboard statistics from daily rollups.
+
+Each closed UTC day has one daily_stats document (_id "YYYY-MM-DD") with
+that day's attempt counts, score sums, error-type counts and per-group
+situation totals. Rollups are written by scripts/rollup_daily_stats.py
+(run it daily, and once with --backfill after deployment). Dashboard
+requests only fill gaps in the 30-day window; the all-time figures sum
+every stored rollup and are flagged as partial (history.complete) while
+the oldest rollup is younger than the first attempt. Today is always
+computed live, and the assembled result is cached per worker for
+ADMIN_STATS_CACHE_SECONDS.
+
+compute_user_detail backs the per-user stats view with one aggregation
+per attempt collection.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.core.config import settings
+
+TIMELINE_DAYS = 14
+GROWTH_DAYS = 30
+
+_cache: Dict[str, Any] = {"at": 0.0, "data": None}
+_cache_lock = asyncio.Lock()
+
+
+def _utc_today() -> datetime:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _day_key(day: datetime) -> str:
+    return day.strftime("%Y-%m-%d")
+
+
+def _first(result: List[dict], default: Optional[dict] = None) -> dict:
+    return result[0] if result else (default or {})
+
+
+# -------------------------
+# One day
+# -------------------------
+
+def _max_score(items_field: str) -> dict:
+    return {"$multiply": [{"$size": {"$ifNull": [f"${items_field}", []]}}, 100]}
+
+
+def _accuracy(items_field: str) -> dict:
+    """Per-attempt accuracy as the admin timeline always computed it (0 for empty attempts)."""
+    return {"$cond": [
+        {"$gt": [_max_score(items_field), 0]},
+        {"$divide": ["$total_score", _max_score(items_field)]},
+        0
+    ]}
+
+
+async def compute_day(db, start: datetime, end: datetime) -> Dict[str, Any]:
+    """Rollup document for attempts and sign-ups in [start, end)."""
+    pron_task = db.pronunciation_attempts.aggregate([
+        {"$match": {"created_at": {"$gte": start, "$lt": end}}},
+        {"$project": {"_id": 0, "user_id": 1, "score": "$assessment.total_score", "errors": "$assessment.errors.error_type"}},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "score_sum": {"$sum": "$score"},
+                "score_count": {"$sum": {"$cond": [{"$isNumber": "$score"}, 1, 0]}},
+            }}],
+            "users": [{"$group": {"_id": "$user_id"}}],
+            "errors": [
+                {"$unwind": "$errors"},
+                {"$group": {"_id": "$errors", "count": {"$sum": 1}}},
+            ],
+        }},
+    ]).to_list(1)
+
+    sit_task = db.situation_attempts.aggregate([
+        {"$match": {"submitted_at": {"$gte": start, "$lt": end}}},
+        {"$project": {
+            "_id": 0,
+            "user_id": 1,
+            "group_id": 1,
+            "total_score": 1,
+            "perfect_count": 1,
+            "acceptable_count": 1,
+            "poor_count": 1,
+            "questions": {"$size": {"$ifNull": ["$situations", []]}},
+            "max_score": _max_score("situations"),
+            "accuracy": _accuracy("situations"),
+        }},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "accuracy_sum": {"$sum": "$accuracy"},
+                "total_score_sum": {"$sum": "$total_score"},
+                "max_score_sum": {"$sum": "$max_score"},
+                "questions": {"$sum": "$questions"},
+                "perfect": {"$sum": {"$ifNull": ["$perfect_count", 0]}},
+                "acceptable": {"$sum": {"$ifNull": ["$acceptable_count", 0]}},
+                "poor": {"$sum": {"$ifNull": ["$poor_count", 0]}},
+            }}],
+            "users": [{"$group": {"_id": "$user_id"}}],
+            "groups": [
+                {"$match": {"group_id": {"$ne": None}}},
+                {"$group": {
+                    "_id": "$group_id",
+                    "total_score": {"$sum": "$total_score"},
+                    "max_score": {"$sum": "$max_score"},
+                    "attempts": {"$sum": 1},
+                }},
+            ],
+        }},
+    ]).to_list(1)
+
+    quiz_task = db.quiz_attempts.aggregate([
+        {"$match": {"submitted_at": {"$gte": start, "$lt": end}}},
+        {"$project": {"_id": 0, "user_id": 1, "accuracy": _accuracy("results")}},
+        {"$facet": {
+            "totals": [{"$group": {"_id": None, "count": {"$sum": 1}, "accuracy_sum": {"$sum": "$accuracy"}}}],
+            "users": [{"$group": {"_id": "$user_id"}}],
+        }},
+    ]).to_list(1)
+
+    new_users_task = db.users.count_documents({"created_at": {"$gte": start, "$lt": end}})
+
+    pron, sit, quiz, new_users = await asyncio.gather(pron_task, sit_task, quiz_task, new_users_task)
+    pron, sit, quiz = pron[0], sit[0], quiz[0]
+
+    active = {u["_id"] for facet in (pron, sit, quiz) for u in facet["users"]}
+    pron_totals = _first(pron["totals"], {"count": 0, "score_sum": 0, "score_count": 0})
+    sit_totals = _first(sit["totals"], {
+        "count": 0, "accuracy_sum": 0, "total_score_sum": 0, "max_score_sum": 0,
+        "questions": 0, "perfect": 0, "acceptable": 0, "poor": 0,
+    })
+    quiz_totals = _first(quiz["totals"], {"count": 0, "accuracy_sum": 0})
+    for totals in (pron_totals, sit_totals, quiz_totals):
+        totals.pop("_id", None)
+
+    return {
+        "_id": _day_key(start),
+        "date": start,
+        "pronunciation": pron_totals,
+        "situations": sit_totals,
+        "quizzes": quiz_totals,
+        # Error types become field names; "." and a leading "$" are not allowed there
+        "errors": {str(e["_id"]).replace(".", "_").lstrip("$"): e["count"] for e in pron["errors"] if e["_id"]},
+        "groups": {
+            str(g["_id"]): {"total_score": g["total_score"], "max_score": g["max_score"], "attempts": g["attempts"]}
+            for g in sit["groups"]
+        },
+        "active_users": len(active),
+        "new_users": new_users,
+        "computed_at": datetime.now(timezone.utc),
+    }
+
+
+async def rollup_days(db, days: List[datetime], concurrency: int = 4) -> int:
+    """Compute and store the rollups of the given (closed) days."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def rollup(day):
+        async with semaphore:
+            doc = await compute_day(db, day, day + timedelta(days=1))
+            await db.daily_stats.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+
+    await asyncio.gather(*(rollup(day) for day in days))
+    return len(days)
+
+
+async def missing_days(db, start: datetime, end: datetime) -> List[datetime]:
+    """Closed days in [start, end) without a rollup."""
+    days = []
+    day = start
+    while day < end:
+        days.append(day)
+        day += timedelta(days=1)
+    if not days:
+        return []
+    have = {d["_id"] async for d in db.daily_stats.find(
+        {"_id": {"$in": [_day_key(d) for d in days]}}, {"_id": 1}
+    )}
+    return [d for d in days if _day_key(d) not in have]
+
+
+async def first_activity_day(db) -> Optional[datetime]:
+    """UTC day of the oldest attempt, where a backfill has to start."""
+    firsts = await asyncio.gather(
+        db.pronunciation_attempts.find({}, {"created_at": 1}).sort("created_at", 1).limit(1).to_list(1),
+        db.situation_attempts.find({}, {"submitted_at": 1}).sort("submitted_at", 1).limit(1).to_list(1),
+        db.quiz_attempts.find({}, {"submitted_at": 1}).sort("submitted_at", 1).limit(1).to_list(1),
+    )
+    dates = [doc.get("created_at") or doc.get("submitted_at") for found in firsts for doc in found]
+    dates = [d for d in dates if isinstance(d, datetime)]
+    if not dates:
+        return None
+    return min(dates).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+# -------------------------
+# Dashboard
+# -------------------------
+
+def _activity_timeline(days: List[dict]) -> List[dict]:
+    """Per-day activity, merged the way the dashboard always has."""
+    timeline = []
+    for day in days:
+        entry = None
+        pron = day["pronunciation"]
+        if pron["count"]:
+            entry = {
+                "date": day["_id"],
+                "pronunciation": pron["count"],
+                "quizzes": 0,
+                "accuracy": pron["score_sum"] / pron["score_count"] if pron["score_count"] else 0
+            }
+        for quiz in (day["situations"], day["quizzes"]):
+            if not quiz["count"]:
+                continue
+            accuracy = quiz["accuracy_sum"] / quiz["count"] * 100
+            if entry is None:
+                entry = {"date": day["_id"], "pronunciation": 0, "quizzes": quiz["count"], "accuracy": accuracy}
+            else:
+                entry["quizzes"] += quiz["count"]
+                entry["accuracy"] = round((entry["accuracy"] + accuracy) / 2, 1)
+        if entry:
+            timeline.append(entry)
+    return timeline
+
+
+async def compute_global_stats(db) -> Dict[str, Any]:
+    """The admin dashboard payload: stored rollups, today live, the rest concurrently."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    today = _utc_today()
+    window_start = today - timedelta(days=GROWTH_DAYS)
+
+    # Only the window is filled here; older days come from --backfill
+    missing = await missing_days(db, window_start, today)
+    if missing:
+        await rollup_days(db, missing)
+
+    yesterday = now - timedelta(days=1)
+    (
+        first_day, rollups, today_doc, users_count, pron_count, sit_count, quiz_count,
+        active_pron, active_sit, active_quiz, top_users,
+    ) = await asyncio.gather(
+        first_activity_day(db),
+        db.daily_stats.find({}).sort("_id", 1).to_list(None),
+        compute_day(db, today, today + timedelta(days=1)),
+        db.users.estimated_document_count(),
+        db.pronunciation_attempts.estimated_document_count(),
+        db.situation_attempts.estimated_document_count(),
+        db.quiz_attempts.estimated_document_count(),
+        db.pronunciation_attempts.distinct("user_id", {"created_at": {"$gte": yesterday}}),
+        db.situation_attempts.distinct("user_id", {"submitted_at": {"$gte": yesterday}}),
+        db.quiz_attempts.distinct("user_id", {"submitted_at": {"$gte": yesterday}}),
+        # Engagement from the per-user counter kept by /pronunciation/assess
+        db.users.find(
+            {"stats.total_pronunciation_attempts": {"$gt": 0}},
+            {"full_name": 1, "username": 1, "avatar_color": 1, "stats.total_pronunciation_attempts": 1}
+        ).sort("stats.total_pronunciation_attempts", -1).limit(10).to_list(10),
+    )
+
+    # A rollup of today may exist if the job ran early; the live one wins
+    days = [d for d in rollups if d["_id"] != today_doc["_id"]] + [today_doc]
+
+    timeline_start = _day_key(today - timedelta(days=TIMELINE_DAYS))
+    growth_start = _day_key(window_start)
+
+    # All-time figures summed over the rollups
+    errors: Dict[str, int] = {}
+    groups: Dict[str, Dict[str, float]] = {}
+    pron_score_sum = pron_score_count = 0
+    sit = {"total_score_sum": 0, "max_score_sum": 0, "questions": 0, "perfect": 0, "acceptable": 0, "poor": 0}
+    for day in days:
+        pron_score_sum += day["pronunciation"]["score_sum"]
+        pron_score_count += day["pronunciation"]["score_count"]
+        for key in sit:
+            sit[key] += day["situations"].get(key, 0)
+        for error_type, count in day.get("errors", {}).items():
+            errors[error_type] = errors.get(error_type, 0) + count
+        for gid, g in day.get("groups", {}).items():
+            total = groups.setdefault(gid, {"total_score": 0, "max_score": 0, "attempts": 0})
+            for key in total:
+                total[key] += g[key]
+
+    top_groups = sorted(groups.items(), key=lambda item: item[1]["attempts"], reverse=True)[:8]
+    group_names = {}
+    if top_groups:
+        async for g in db.groups.find({"_id": {"$in": [ObjectId(gid) for gid, _ in top_groups]}}, {"name": 1}):
+            group_names[str(g["_id"])] = g["name"]
+    group_performance = [
+        {
+            "id": gid,
+            "name": group_names[gid],
+            "avg_score": round(g["total_score"] * 100 / g["max_score"], 1) if g["max_score"] > 0 else 0,
+            "count": g["attempts"]
+        }
+        for gid, g in top_groups if gid in group_names
+    ]
+
+    return {
+        "overview": {
+            "total_users": users_count,
+            "total_pronunciation_attempts": pron_count,
+            "total_quizzes_completed": sit_count + quiz_count,
+            "active_users_today": len(set(active_pron + active_sit + active_quiz))
+        },
+        "activity_timeline": _activity_timeline([d for d in days if d["_id"] >= timeline_start]),
+        "user_growth_timeline": [
+            {"date": d["_id"], "count": d["new_users"]}
+            for d in days if d["_id"] >= growth_start and d.get("new_users")
+        ],
+        "group_performance": {
+            "pronunciation_top": group_performance  # Used by frontend
+        },
+        "top_users": [
+            {
+                "id": str(u["_id"]),
+                "name": u.get("full_name") or "Unknown",
+                "username": u.get("username"),
+                "activity_count": u["stats"]["total_pronunciation_attempts"],
+                "avatar_color": u.get("avatar_color") or "#757575"
+            }
+            for u in top_users
+        ],
+        "pronunciation_metrics": {
+            "avg_score": round(pron_score_sum / pron_score_count, 1) if pron_score_count else 0,
+            "error_distribution": [
+                {"type": error_type, "count": count}
+                for error_type, count in sorted(errors.items(), key=lambda item: item[1], reverse=True)[:8]
+            ]
+        },
+        "situation_metrics": {
+            "avg_accuracy": round(sit["total_score_sum"] / (sit["max_score_sum"] or 1) * 100, 1),
+            "total_answered": sit["questions"],
+            "perfect_count": sit["perfect"],
+            "acceptable_count": sit["acceptable"],
+            "poor_count": sit["poor"]
+        },
+        # What the all-time figures cover; incomplete until --backfill has run
+        "history": {
+            "complete": not first_day or (bool(rollups) and rollups[0]["_id"] <= _day_key(first_day)),
+            "first_activity": _day_key(first_day) if first_day else None,
+            "rollups_since": days[0]["_id"],
+        }
+    }
+
+
+async def get_global_stats(db) -> Dict[str, Any]:
+    """compute_global_stats, cached; concurrent requests share one computation."""
+    ttl = settings.ADMIN_STATS_CACHE_SECONDS
+    if _cache["data"] is not None and time.monotonic() - _cache["at"] < ttl:
+        return _cache["data"]
+
+    async with _cache_lock:
+        # Another request may have refreshed it while this one waited
+        if _cache["data"] is not None and time.monotonic() - _cache["at"] < ttl:
+            return _cache["data"]
+        data = await compute_global_stats(db)
+        _cache.update(at=time.monotonic(), data=data)
+        return data
+
+
+# -------------------------
+# One user
+# -------------------------
+
+USER_RECENT_LIMIT = 10
+USER_TIMELINE_DAYS = 30
+
+
+def _iso(dt) -> str:
+    return (dt if isinstance(dt, datetime) else datetime.utcnow()).isoformat() + "Z"
+
+
+async def compute_user_detail(db, user_id: ObjectId) -> Dict[str, Any]:
+    """Pronunciation, situation, timeline and activity sections of GET /admin/users/{id}/stats.
+
+    Two $facet pipelines; of each pronunciation assessment only total_score is read.
+    """
+    timeline_start = _utc_today() - timedelta(days=USER_TIMELINE_DAYS - 1)
+
+    pron_task = db.pronunciation_attempts.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$project": {
+            "_id": 0,
+            "instruction_id": 1,
+            "custom_text": 1,
+            "has_custom_text": {"$ne": [{"$type": "$custom_text"}, "missing"]},
+            "session_id": 1,
+            "created_at": 1,
+            "score": "$assessment.total_score",
+        }},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "score_sum": {"$sum": "$score"},
+                "score_count": {"$sum": {"$cond": [{"$isNumber": "$score"}, 1, 0]}},
+                "last_active": {"$max": "$created_at"},
+            }}],
+            "sessions": [
+                {"$match": {"session_id": {"$nin": [None, ""]}}},
+                {"$group": {"_id": "$session_id"}},
+                {"$count": "count"},
+            ],
+            "days": [
+                {"$match": {"created_at": {"$type": "date"}}},
+                {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}}},
+                {"$count": "count"},
+            ],
+            "recent": [
+                {"$sort": {"created_at": -1}},
+                {"$limit": USER_RECENT_LIMIT},
+                {"$lookup": {"from": "instructions", "localField": "instruction_id", "foreignField": "_id", "as": "instruction"}},
+                {"$project": {
+                    "instruction_id": 1,
+                    "custom_text": 1,
+                    "has_custom_text": 1,
+                    "score": 1,
+                    "created_at": 1,
+                    "instruction_text": {"$first": "$instruction.text"},
+                }},
+            ],
+            "timeline": [
+                {"$match": {"created_at": {"$gte": timeline_start}, "score": {"$ne": None}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "sum": {"$sum": "$score"},
+                    "count": {"$sum": 1},
+                }},
+            ],
+        }},
+    ]).to_list(1)
+
+    max_score = {"$multiply": [{"$size": {"$ifNull": ["$situations", []]}}, 100]}
+    sit_task = db.situation_attempts.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$project": {
+            "_id": 0,
+            "group_id": 1,
+            "submitted_at": 1,
+            "total_score": 1,
+            "perfect_count": 1,
+            "acceptable_count": 1,
+            "poor_count": 1,
+            "max_score": max_score,
+        }},
+        {"$addFields": {
+            "pct": {"$cond": [
+                {"$gt": ["$max_score", 0]},
+                {"$multiply": [{"$divide": [{"$ifNull": ["$total_score", 0]}, "$max_score"]}, 100]},
+                None
+            ]},
+        }},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "pct_sum": {"$sum": "$pct"},
+                "perfect": {"$sum": {"$ifNull": ["$perfect_count", 0]}},
+                "acceptable": {"$sum": {"$ifNull": ["$acceptable_count", 0]}},
+                "poor": {"$sum": {"$ifNull": ["$poor_count", 0]}},
+                "last_active": {"$max": "$submitted_at"},
+            }}],
+            "days": [
+                {"$match": {"submitted_at": {"$type": "date"}}},
+                {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$submitted_at"}}}},
+                {"$count": "count"},
+            ],
+            "recent": [
+                {"$sort": {"submitted_at": -1}},
+                {"$limit": USER_RECENT_LIMIT},
+                {"$lookup": {"from": "groups", "localField": "group_id", "foreignField": "_id", "as": "group"}},
+                {"$project": {
+                    "group_name": {"$first": "$group.name"},
+                    "total_score": 1,
+                    "pct": 1,
+                    "submitted_at": 1,
+                }},
+            ],
+            "timeline": [
+                {"$match": {"submitted_at": {"$gte": timeline_start}, "total_score": {"$ne": None}, "pct": {"$ne": None}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$submitted_at"}},
+                    "sum": {"$sum": "$pct"},
+                    "count": {"$sum": 1},
+                }},
+            ],
+        }},
+    ]).to_list(1)
+
+    pron, sit = await asyncio.gather(pron_task, sit_task)
+    pron, sit = pron[0], sit[0]
+
+    pron_totals = _first(pron["totals"], {"count": 0, "score_sum": 0, "score_count": 0, "last_active": None})
+    sit_totals = _first(sit["totals"], {"count": 0, "pct_sum": 0, "perfect": 0, "acceptable": 0, "poor": 0, "last_active": None})
+
+    recent_pron_list = []
+    for attempt in pron["recent"]:
+        if attempt.get("instruction_id"):
+            text = attempt.get("instruction_text") or "Custom text"
+        else:
+            text = attempt.get("custom_text") if attempt.get("has_custom_text") else "Custom text"
+        recent_pron_list.append({
+            "instruction_text": text,
+            "score": attempt.get("score"),
+            "created_at": _iso(attempt.get("created_at"))
+        })
+
+    recent_sit_list = [
+        {
+            "group_name": attempt.get("group_name") or "Unknown",
+            "score": attempt.get("total_score", 0),
+            "percentage": round(attempt.get("pct") or 0),
+            "submitted_at": _iso(attempt.get("submitted_at"))
+        }
+        for attempt in sit["recent"]
+    ]
+
+    # Performance timeline: pronunciation scores and situation percentages per day
+    buckets: Dict[str, Dict[str, float]] = {}
+    for bucket in pron["timeline"] + sit["timeline"]:
+        day = buckets.setdefault(bucket["_id"], {"sum": 0, "count": 0})
+        day["sum"] += bucket["sum"]
+        day["count"] += bucket["count"]
+    performance_timeline = []
+    for i in range(USER_TIMELINE_DAYS):
+        key = _day_key(timeline_start + timedelta(days=i))
+        day = buckets.get(key)
+        performance_timeline.append({
+            "date": key,
+            "accuracy": round(day["sum"] / day["count"], 1) if day and day["count"] else 0
+        })
+
+    last_active = None
+    if pron_totals["count"] or sit_totals["count"]:
+        dates = [t["last_active"] for t in (pron_totals, sit_totals) if isinstance(t.get("last_active"), datetime)]
+        last_active = max(dates + [datetime.min]).isoformat() + "Z"
+
+    return {
+        "pronunciation": {
+            "total_attempts": pron_totals["count"],
+            "average_score": round(pron_totals["score_sum"] / pron_totals["score_count"], 1) if pron_totals["score_count"] else 0,
+            "recent_attempts": recent_pron_list
+        },
+        "situations": {
+            "total_quizzes": sit_totals["count"],
+            "average_score_percentage": round(sit_totals["pct_sum"] / sit_totals["count"], 1) if sit_totals["count"] else 0,
+            "recent_quizzes": recent_sit_list,
+            "score_distribution": {
+                "perfect": sit_totals["perfect"],
+                "acceptable": sit_totals["acceptable"],
+                "poor": sit_totals["poor"]
+            }
+        },
+        "performance_timeline": performance_timeline,
+        "activity": {
+            "total_sessions": _first(pron["sessions"], {"count": 0})["count"],
+            "last_active": last_active,
+            # Pronunciation and situation days are counted separately, as before
+            "days_active": _first(pron["days"], {"count": 0})["count"] + _first(sit["days"], {"count": 0})["count"]
+        }
+    }
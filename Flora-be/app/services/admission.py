@@ -0,0 +1,142 @@
+"""Deadline-aware admission control for pronunciation assessments."""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+
+
+FULL = "full"
+ASR_ONLY = "asr_only"
+
+
+class AdmissionRejected(Exception):
+    """Raised when an assessment cannot finish before its deadline."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Assessment would miss its deadline, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Admits assessments into a fixed number of engine slots.
+
+    Each request's cost is estimated from audio duration and word count.
+    Waiting requests are served in order of ``arrival + estimated cost``, so
+    short clips overtake long ones without starving them forever. A request
+    whose estimated completion misses its deadline is degraded to ASR-only
+    scoring, or rejected when even that would be too late.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        deadline_seconds: float,
+        base_cost: float = 0.3,
+        cost_per_second: float = 0.25,
+        cost_per_word: float = 0.05,
+        asr_only_cost_per_second: float = 0.08,
+    ):
+        self.slots = max(1, int(slots))
+        self.deadline_seconds = deadline_seconds
+        self.base_cost = base_cost
+        self.cost_per_second = {FULL: cost_per_second, ASR_ONLY: asr_only_cost_per_second}
+        self.cost_per_word = {FULL: cost_per_word, ASR_ONLY: 0.0}
+        # Observed / estimated ratio per mode, learned from finished requests
+        self.scale = {FULL: 1.0, ASR_ONLY: 1.0}
+
+        self._running = 0
+        self._running_cost = 0.0
+        self._queue = []  # (priority, seq, cost, future)
+        self._seq = itertools.count()
+
+    def estimate(self, duration: float, words: int, mode: str = FULL) -> float:
+        """Estimated seconds of engine time for one assessment."""
+        raw = self.base_cost + self.cost_per_second[mode] * duration + self.cost_per_word[mode] * words
+        return raw * self.scale[mode]
+
+    def observe(self, duration: float, words: int, mode: str, elapsed: float):
+        """Fold a measured run time into the cost model."""
+        estimate = self.estimate(duration, words, mode) / self.scale[mode]
+        if estimate > 0:
+            ratio = min(max(elapsed / estimate, 0.1), 10.0)
+            self.scale[mode] = 0.8 * self.scale[mode] + 0.2 * ratio
+
+    def expected_wait(self, priority: float) -> float:
+        """Seconds until a request with this priority would get a slot."""
+        if self._running < self.slots and not self._queue:
+            return 0.0
+        ahead = sum(cost for p, _, cost, future in self._queue if p <= priority and not future.done())
+        return (self._running_cost + ahead) / self.slots
+
+    def stats(self) -> dict:
+        return {
+            "slots": self.slots,
+            "running": self._running,
+            "queued": len(self._queue),
+            "deadline_seconds": self.deadline_seconds,
+            "cost_scale": {k: round(v, 3) for k, v in self.scale.items()},
+        }
+
+    def _choose_mode(self, duration: float, words: int, deadline: float):
+        now = time.monotonic()
+        for mode in (FULL, ASR_ONLY):
+            cost = self.estimate(duration, words, mode)
+            priority = now + cost
+            if self.expected_wait(priority) + cost <= deadline:
+                return mode, cost, priority
+
+        cost = self.estimate(duration, words, ASR_ONLY)
+        retry_after = math.ceil(self.expected_wait(now + cost) + cost - deadline)
+        raise AdmissionRejected(max(1, retry_after))
+
+    async def _acquire(self, cost: float, priority: float):
+        # Forget waiters whose clients went away
+        self._queue = [entry for entry in self._queue if not entry[3].done()]
+        heapq.heapify(self._queue)
+
+        if self._running < self.slots and not self._queue:
+            self._running += 1
+            self._running_cost += cost
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), cost, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Slot was handed over just as the client went away: pass it on
+            if future.done() and not future.cancelled():
+                self._release(cost)
+            raise
+
+    def _release(self, cost: float):
+        self._running -= 1
+        self._running_cost = max(0.0, self._running_cost - cost)
+
+        while self._queue:
+            _, _, next_cost, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._running += 1
+            self._running_cost += next_cost
+            future.set_result(None)
+            break
+
+    @asynccontextmanager
+    async def slot(self, duration: float, words: int, deadline: float = None):
+        """Wait for an engine slot and yield the scoring mode to use.
+
+        Raises AdmissionRejected when the request cannot finish in time.
+        """
+        deadline = min(deadline or self.deadline_seconds, self.deadline_seconds)
+        mode, cost, priority = self._choose_mode(duration, words, deadline)
+
+        await self._acquire(cost, priority)
+        started = time.monotonic()
+        try:
+            yield mode
+        finally:
+            self._release(cost)
+            self.observe(duration, words, mode, time.monotonic() - started)
@@ -0,0 +1,181 @@
+"""Per-user, per-instruction attempt statistics kept up to date on write.
+
+One user_instruction_stats document per (user_id, instruction_id,
+custom_text); custom_text is None for instruction attempts and
+instruction_id is None for free text.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional, Set
+
+from bson import ObjectId
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+
+# Users known to have their stats documents, per worker
+_stats_ready: Set[ObjectId] = set()
+STATS_READY_MAX_SIZE = 100000
+
+
+async def record_attempt(
+    db,
+    user_id: ObjectId,
+    instruction_id: Optional[ObjectId],
+    custom_text: Optional[str],
+    group_id: Optional[ObjectId],
+    score: int,
+    created_at: datetime,
+) -> dict:
+    """Count a new attempt and return the updated stats document.
+
+    `attempts_count` in the result is the new attempt's attempt_number.
+    """
+    return await db.user_instruction_stats.find_one_and_update(
+        {"user_id": user_id, "instruction_id": instruction_id, "custom_text": custom_text or None},
+        {
+            "$inc": {"attempts_count": 1, "score_sum": score},
+            "$max": {"best_score": score, "last_attempt_at": created_at},
+            "$min": {"worst_score": score},
+            "$set": {"last_score": score, "group_id": group_id, "updated_at": datetime.now(timezone.utc)},
+            "$setOnInsert": {"first_attempt_at": created_at},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _stats_pipeline(match: Optional[dict]) -> list:
+    """Stats documents (keyed by _id) aggregated from pronunciation_attempts."""
+    return [
+        {"$match": match or {}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "instruction_id": {"$ifNull": ["$instruction_id", None]},
+                # "" and missing both mean "no custom text", as in record_attempt
+                "custom_text": {"$cond": [
+                    {"$eq": [{"$ifNull": ["$custom_text", ""]}, ""]}, None, "$custom_text"
+                ]},
+            },
+            "group_id": {"$last": "$group_id"},
+            "attempts_count": {"$sum": 1},
+            "score_sum": {"$sum": "$assessment.total_score"},
+            "best_score": {"$max": "$assessment.total_score"},
+            "worst_score": {"$min": "$assessment.total_score"},
+            "last_score": {"$last": "$assessment.total_score"},
+            "first_attempt_at": {"$min": "$created_at"},
+            "last_attempt_at": {"$max": "$created_at"},
+        }},
+    ]
+
+
+async def rebuild_instruction_stats(db, match: Optional[dict] = None, batch_size: int = 1000) -> int:
+    """Recompute stats documents from pronunciation_attempts (all, or those matching `match`).
+
+    Used for the initial backfill; replaces documents, so run it while no
+    assessments are coming in.
+    """
+    now = datetime.now(timezone.utc)
+    ops = []
+    written = 0
+
+    async for doc in db.pronunciation_attempts.aggregate(_stats_pipeline(match), allowDiskUse=True):
+        key = doc.pop("_id")
+        ops.append(ReplaceOne(key, {**key, **doc, "updated_at": now}, upsert=True))
+
+        if len(ops) >= batch_size:
+            await db.user_instruction_stats.bulk_write(ops, ordered=False)
+            written += len(ops)
+            ops = []
+
+    if ops:
+        await db.user_instruction_stats.bulk_write(ops, ordered=False)
+        written += len(ops)
+
+    return written
+
+
+async def refresh_instruction_scores(db, user_id: ObjectId, retries: int = 5, delay: float = 0.5) -> int:
+    """Recompute the score fields of a user's stats after their attempts were re-scored.
+
+    Counts are left alone, as re-scoring changes none. Each document is
+    only written while its attempts_count equals the number of attempts
+    aggregated for it. An attempt recorded meanwhile, including one counted
+    but not yet inserted, fails that check, and the document is retried
+    instead of losing the increment. Returns the number of documents still
+    not refreshed after `retries` passes.
+    """
+    pending = None
+    for attempt in range(retries):
+        if attempt:
+            await asyncio.sleep(delay)
+
+        missed = set()
+        async for doc in db.pronunciation_attempts.aggregate(_stats_pipeline({"user_id": user_id})):
+            key = doc.pop("_id")
+            marker = (key["instruction_id"], key["custom_text"])
+            if pending is not None and marker not in pending:
+                continue
+            result = await db.user_instruction_stats.update_one(
+                {**key, "attempts_count": doc["attempts_count"]},
+                {"$set": {
+                    "score_sum": doc["score_sum"],
+                    "best_score": doc["best_score"],
+                    "worst_score": doc["worst_score"],
+                    "last_score": doc["last_score"],
+                    "updated_at": datetime.now(timezone.utc),
+                }}
+            )
+            if not result.matched_count:
+                missed.add(marker)
+
+        pending = missed
+        if not pending:
+            return 0
+    return len(pending)
+
+
+async def _merge_instruction_stats(db, match: dict) -> int:
+    """Add aggregated attempts to the stats documents with commutative
+    operators, so attempts recorded concurrently by record_attempt are kept."""
+    ops = []
+    async for doc in db.pronunciation_attempts.aggregate(_stats_pipeline(match), allowDiskUse=True):
+        key = doc.pop("_id")
+        ops.append(UpdateOne(key, {
+            "$inc": {"attempts_count": doc["attempts_count"], "score_sum": doc["score_sum"]},
+            "$max": {"best_score": doc["best_score"], "last_attempt_at": doc["last_attempt_at"]},
+            "$min": {"worst_score": doc["worst_score"], "first_attempt_at": doc["first_attempt_at"]},
+            # A concurrently recorded attempt is newer than anything merged here
+            "$setOnInsert": {"last_score": doc["last_score"], "group_id": doc["group_id"]},
+            "$set": {"updated_at": datetime.now(timezone.utc)},
+        }, upsert=True))
+    if ops:
+        await db.user_instruction_stats.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+async def ensure_instruction_stats(db, user_id: ObjectId):
+    """Count a user's attempts that predate user_instruction_stats.
+
+    Covers deployments not backfilled with scripts/rebuild_instruction_stats.py.
+    One request per user claims the backfill (a marker on the user) and
+    merges the attempts created before the claim into the stats documents;
+    attempts after it are counted by record_attempt. Call it before
+    recording a new attempt.
+    """
+    if user_id in _stats_ready:
+        return
+
+    has_stats = await db.user_instruction_stats.find_one({"user_id": user_id}, {"_id": 1})
+    if not has_stats and await db.pronunciation_attempts.find_one({"user_id": user_id}, {"_id": 1}):
+        cutoff = datetime.now(timezone.utc)
+        claim = await db.users.update_one(
+            {"_id": user_id, "instruction_stats_backfilled_at": {"$exists": False}},
+            {"$set": {"instruction_stats_backfilled_at": cutoff}}
+        )
+        if claim.modified_count:
+            await _merge_instruction_stats(db, {"user_id": user_id, "created_at": {"$lt": cutoff}})
+
+    if len(_stats_ready) >= STATS_READY_MAX_SIZE:
+        _stats_ready.clear()
+    _stats_ready.add(user_id)
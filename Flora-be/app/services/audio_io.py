@@ -0,0 +1,200 @@
+"""Audio upload handling: format sniffing, size and duration checks, decoding.
+
+Starlette has already spooled the request body (to memory, or to disk
+past 1 MB) by the time an endpoint runs, and MaxBodySizeMiddleware caps
+what it will spool. The checks here refuse a spooled upload before it is
+decoded, and decoding reads the spooled file directly.
+"""
+import os
+import shutil
+import struct
+import tempfile
+from typing import BinaryIO, Optional
+
+import numpy as np
+from fastapi import UploadFile
+
+try:
+    import av
+except ImportError:  # pragma: no cover - optional fast decoder
+    av = None
+
+CHUNK_SIZE = 64 * 1024
+
+SAMPLE_RATE = 16000
+
+# Raw upload variant: 16 kHz mono signed 16-bit little-endian PCM, no container
+PCM_FORMAT = "pcm_s16le"
+PCM_BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+# Containers decoded in-process with PyAV (Opus/Vorbis/AAC); others go through librosa
+AV_FORMATS = {"webm", "ogg", "mp4"}
+
+# Containers librosa can read from a file object (libsndfile); the rest
+# need a named file for its audioread fallback
+SOUNDFILE_FORMATS = {"wav", "ogg", "flac", "mp3"}
+
+# Suffix used for the temporary file of a container that needs one
+SUFFIXES = {
+    "webm": ".webm",
+    "mp4": ".m4a",
+}
+
+
+class AudioUploadError(Exception):
+    """Upload rejected; carries the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def sniff_audio_format(head: bytes) -> Optional[str]:
+    """Identify the audio container from its first bytes, or None if unknown."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    return None
+
+
+def wav_duration(head: bytes) -> Optional[float]:
+    """Duration in seconds from a WAV header, if it is readable from `head`."""
+    pos = 12
+    byte_rate = None
+    while pos + 8 <= len(head):
+        chunk_id = head[pos:pos + 4]
+        size = struct.unpack("<I", head[pos + 4:pos + 8])[0]
+        if chunk_id == b"fmt " and pos + 16 <= len(head):
+            byte_rate = struct.unpack("<I", head[pos + 16:pos + 20])[0]
+        elif chunk_id == b"data":
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF
+            if byte_rate and 0 < size < 0xFFFFFFFF:
+                return size / byte_rate
+            return None
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def is_raw_pcm(audio_format: Optional[str], content_type: Optional[str]) -> bool:
+    """Whether the client declared a raw 16 kHz PCM upload."""
+    if audio_format:
+        return audio_format.lower() == PCM_FORMAT
+    return bool(content_type) and content_type.lower().startswith("audio/l16")
+
+
+async def check_upload(
+    upload: UploadFile,
+    max_bytes: int,
+    max_seconds: float,
+    raw_pcm: bool = False,
+) -> str:
+    """Validate a spooled upload and return its format.
+
+    Raises AudioUploadError for non-audio payloads, files over
+    `max_bytes`, or audio known to be longer than `max_seconds` (from the
+    WAV header, or from the byte count for raw PCM). Leaves the file
+    positioned at its start, ready for decode_audio(upload.file, ...).
+    """
+    size = upload.size
+    if size is None:
+        upload.file.seek(0, os.SEEK_END)
+        size = upload.file.tell()
+
+    await upload.seek(0)
+    head = await upload.read(CHUNK_SIZE)
+    await upload.seek(0)
+
+    if raw_pcm:
+        if size > min(max_bytes, max_seconds * PCM_BYTES_PER_SECOND):
+            raise AudioUploadError(413, f"Recording is too long. Maximum length is {int(max_seconds)} seconds.")
+        return PCM_FORMAT
+
+    if size > max_bytes:
+        raise AudioUploadError(413, f"Audio file too large. Maximum size is {max_bytes // (1024 * 1024)} MB.")
+
+    fmt = sniff_audio_format(head)
+    if fmt is None:
+        raise AudioUploadError(415, "Unsupported audio format. Please upload WAV, WebM, Ogg, FLAC, MP3 or M4A audio.")
+
+    if fmt == "wav":
+        duration = wav_duration(head)
+        if duration is not None and duration > max_seconds:
+            raise AudioUploadError(413, f"Recording is too long. Maximum length is {int(max_seconds)} seconds.")
+
+    return fmt
+
+
+def decode_pcm(source: BinaryIO, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Raw 16 kHz s16le PCM to float32, with no decoding or resampling."""
+    size = int(max_seconds * PCM_BYTES_PER_SECOND) if max_seconds else -1
+    raw = source.read(size)
+    data = np.frombuffer(raw[: len(raw) - len(raw) % 2], dtype="<i2")
+    return data.astype(np.float32) / 32768.0
+
+
+def decode_av(source: BinaryIO, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Decode WebM/Ogg/MP4 in-process straight to 16 kHz mono float32."""
+    max_samples = int(max_seconds * SAMPLE_RATE) if max_seconds else None
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+    pieces = []
+    total = 0
+
+    with av.open(source) as container:
+        stream = container.streams.audio[0]
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                pcm = out.to_ndarray().reshape(-1)
+                pieces.append(pcm)
+                total += len(pcm)
+            if max_samples and total >= max_samples:
+                break
+        else:
+            # Drain samples buffered inside the resampler
+            for out in resampler.resample(None):
+                pieces.append(out.to_ndarray().reshape(-1))
+
+    audio = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+    if max_samples:
+        audio = audio[:max_samples]
+    return audio.astype(np.float32, copy=False)
+
+
+def decode_audio(source: BinaryIO, fmt: str, fallback, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Decode an uploaded file object to 16 kHz mono float32.
+
+    `fallback(path_or_file, max_seconds)` is used for formats without a
+    fast path (e.g. the engine's librosa-based load_audio) or when PyAV is
+    missing; only containers libsndfile cannot read are copied to a named
+    temporary file for it.
+    """
+    if fmt == PCM_FORMAT:
+        return decode_pcm(source, max_seconds)
+
+    if fmt in AV_FORMATS and av is not None:
+        try:
+            return decode_av(source, max_seconds)
+        except (av.FFmpegError, IndexError):
+            source.seek(0)
+
+    if fmt in SOUNDFILE_FORMATS:
+        audio, _ = fallback(source, max_seconds)
+        return audio
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=SUFFIXES.get(fmt, ""))
+    try:
+        with tmp:
+            shutil.copyfileobj(source, tmp)
+        audio, _ = fallback(tmp.name, max_seconds)
+    finally:
+        os.remove(tmp.name)
+    return audio
@@ -0,0 +1,226 @@
+"""Content-addressed storage for pronunciation attempt audio."""
+import abc
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timezone, timedelta
+from typing import Iterator, List, Optional
+
+import numpy as np
+import soundfile as sf
+from bson import ObjectId
+from fastapi.concurrency import run_in_threadpool
+
+SAMPLE_RATE = 16000
+
+
+class AudioStorage(abc.ABC):
+    """Backend interface. Keys look like ``attempts/ab/cd/<sha256>.flac``."""
+
+    @abc.abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def put(self, key: str, data: bytes):
+        ...
+
+    @abc.abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def touch(self, key: str):
+        """Mark an object as recently used so retention keeps it."""
+
+    @abc.abstractmethod
+    def delete(self, keys: List[str]):
+        ...
+
+    @abc.abstractmethod
+    def list_older_than(self, prefix: str, cutoff: datetime) -> Iterator[str]:
+        ...
+
+
+class LocalAudioStorage(AudioStorage):
+    """Files under a root directory (AUDIO_STORAGE_PATH).
+
+    Only the root's reference/ subdirectory is served by the /audio static
+    mount; attempts/ and templates/ stay private.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never see a partial file; the
+        # temporary name is unique so concurrent puts of one key don't collide
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def touch(self, key: str):
+        os.utime(self._path(key))
+
+    def delete(self, keys: List[str]):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def list_older_than(self, prefix: str, cutoff: datetime) -> Iterator[str]:
+        base = self._path(prefix)
+        limit = cutoff.timestamp()
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, name)
+                if os.path.getmtime(path) < limit:
+                    yield os.path.relpath(path, self.root).replace(os.sep, "/")
+
+
+class S3AudioStorage(AudioStorage):
+    """S3-compatible bucket (AWS, or MinIO/localstack as a local stand-in via endpoint_url)."""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("AUDIO_STORAGE_BACKEND=s3 requires the boto3 package (see requirements.txt)")
+
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except ClientError:
+            return False
+
+    def put(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"].read()
+
+    def touch(self, key: str):
+        # Copying an object onto itself refreshes LastModified
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            CopySource={"Bucket": self.bucket, "Key": self.prefix + key},
+            MetadataDirective="REPLACE",
+        )
+
+    def delete(self, keys: List[str]):
+        for i in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self.prefix + k} for k in keys[i:i + 1000]]},
+            )
+
+    def list_older_than(self, prefix: str, cutoff: datetime) -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for obj in page.get("Contents", []):
+                if obj["LastModified"] < cutoff:
+                    yield obj["Key"][len(self.prefix):]
+
+
+_storage: Optional[AudioStorage] = None
+
+
+def get_audio_storage() -> AudioStorage:
+    """Storage backend selected by AUDIO_STORAGE_BACKEND (created once per process)."""
+    global _storage
+    if _storage is None:
+        from app.core.config import settings
+
+        if settings.AUDIO_STORAGE_BACKEND == "s3":
+            _storage = S3AudioStorage(
+                bucket=settings.AUDIO_S3_BUCKET,
+                prefix=settings.AUDIO_S3_PREFIX,
+                endpoint_url=settings.AUDIO_S3_ENDPOINT_URL,
+            )
+        else:
+            _storage = LocalAudioStorage(settings.AUDIO_STORAGE_PATH)
+    return _storage
+
+
+def encode_attempt_audio(audio: np.ndarray):
+    """16 kHz float audio -> (content key, FLAC bytes). Identical audio gives the same key."""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    digest = hashlib.sha256(pcm.tobytes()).hexdigest()
+    key = f"attempts/{digest[:2]}/{digest[2:4]}/{digest}.flac"
+
+    buf = io.BytesIO()
+    sf.write(buf, pcm, SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+    return key, buf.getvalue()
+
+
+def load_attempt_audio(storage: AudioStorage, key: str) -> np.ndarray:
+    """Stored attempt audio back as 16 kHz mono float32."""
+    audio, _ = sf.read(io.BytesIO(storage.get(key)), dtype="float32")
+    return audio
+
+
+def store_attempt_audio(storage: AudioStorage, audio: np.ndarray) -> str:
+    """Compress and store audio unless an identical recording is already stored."""
+    key, data = encode_attempt_audio(audio)
+    if storage.exists(key):
+        storage.touch(key)
+    else:
+        storage.put(key, data)
+    return key
+
+
+async def persist_attempt_audio(db, attempt_id: str, audio: np.ndarray):
+    """Background task run after /pronunciation/assess has responded."""
+    try:
+        storage = get_audio_storage()
+        key = await run_in_threadpool(store_attempt_audio, storage, audio)
+        await db.pronunciation_attempts.update_one(
+            {"_id": ObjectId(attempt_id)},
+            {"$set": {"audio_file_path": key}}
+        )
+    except Exception as e:
+        print(f"Failed to store audio for attempt {attempt_id}: {e}")
+
+
+async def prune_attempt_audio(db, storage: AudioStorage, retention_days: int) -> int:
+    """Delete stored audio not used within `retention_days` and clear references to it."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    keys = await run_in_threadpool(lambda: list(storage.list_older_than("attempts", cutoff)))
+
+    for i in range(0, len(keys), 1000):
+        batch = keys[i:i + 1000]
+        await run_in_threadpool(storage.delete, batch)
+        await db.pronunciation_attempts.update_many(
+            {"audio_file_path": {"$in": batch}},
+            {"$set": {"audio_file_path": ""}}
+        )
+
+    return len(keys)
@@ -0,0 +1,541 @@
+"""Learner dashboard statistics.
+
+Each user has one user_dashboard_summary document holding the running
+figures the dashboard needs (counts, sums for averages, per-group
+highest/latest, active days, recent-5 lists). The submit endpoints update
+it as attempts come in; build_summary recomputes it from the attempt
+collections with one $facet pipeline per collection, for backfill and for
+users who have no summary yet.
+
+Every recorded attempt bumps the summary's version; a rebuild only
+replaces the summary if the version it started from is unchanged, so
+attempts recorded while it was reading are never lost. The sessions, days
+and encountered sets keep their most recent SET_CAP entries, with the
+full sizes kept as counters.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+RECENT_LIMIT = 5
+
+# Entries kept in the sessions/days/encountered arrays; enough to de-duplicate
+# the values new attempts bring (today, the current session, the catalogue)
+SET_CAP = 1000
+
+REBUILD_RETRIES = 5
+
+# Groups and per-group active quiz counts shared by every dashboard
+CATALOGUE_CACHE_SECONDS = 60
+
+_catalogue: Optional[tuple] = None
+
+
+def normalize_score(score) -> float:
+    """Legacy attempts stored total_score x100; same rule the dashboard always applied."""
+    score = score or 0
+    if score > 100 or (score > 0 and score % 100 == 0):
+        score /= 100
+    return score
+
+
+def _normalized_score(field: str) -> dict:
+    """normalize_score as an aggregation expression."""
+    s = {"$ifNull": [field, 0]}
+    return {"$cond": [
+        {"$or": [
+            {"$gt": [s, 100]},
+            {"$and": [{"$gt": [s, 0]}, {"$eq": [{"$mod": [s, 100]}, 0]}]},
+        ]},
+        {"$divide": [s, 100]},
+        s,
+    ]}
+
+
+def _day(field: str) -> dict:
+    return {"$dateToString": {"format": "%Y-%m-%d", "date": field}}
+
+
+def _quiz_facets(items_field: str, id_field: str) -> List[dict]:
+    """Shared pipeline for situation_attempts (situations[]) and quiz_attempts (results[])."""
+    return [
+        {"$project": {
+            "_id": 0,
+            "group_id": 1,
+            "submitted_at": 1,
+            "score": _normalized_score("$total_score"),
+            "n": {"$size": {"$ifNull": [f"${items_field}", []]}},
+            "ids": f"${items_field}.{id_field}",
+        }},
+        {"$addFields": {
+            "pct": {"$cond": [{"$gt": ["$n", 0]}, {"$multiply": [{"$divide": ["$score", "$n"]}, 100]}, 0]},
+        }},
+        {"$facet": {
+            # Attempts with at least one answer count as quizzes taken
+            "totals": [
+                {"$match": {"n": {"$gt": 0}}},
+                {"$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "pct_sum": {"$sum": "$pct"},
+                    "last_active": {"$max": "$submitted_at"},
+                }},
+            ],
+            "recent": [
+                {"$match": {"n": {"$gt": 0}}},
+                {"$sort": {"submitted_at": -1}},
+                {"$limit": RECENT_LIMIT},
+                {"$project": {"group_id": 1, "score": 1, "pct": 1, "submitted_at": 1}},
+            ],
+            "encountered": [
+                {"$unwind": "$ids"},
+                {"$group": {"_id": "$ids"}},
+            ],
+            "days": [
+                {"$match": {"n": {"$gt": 0}, "submitted_at": {"$type": "date"}}},
+                {"$group": {"_id": _day("$submitted_at")}},
+            ],
+            "groups": [
+                {"$match": {"group_id": {"$ne": None}}},
+                {"$sort": {"submitted_at": -1}},
+                {"$group": {
+                    "_id": "$group_id",
+                    "attempts": {"$sum": 1},
+                    "pct_sum": {"$sum": "$pct"},
+                    "highest": {"$max": {"$cond": [{"$gt": ["$n", 0]}, {"$trunc": "$score"}, 0]}},
+                    "latest": {"$first": {"$trunc": "$score"}},
+                    "answered": {"$push": "$ids"},
+                }},
+            ],
+        }},
+    ]
+
+
+def _pronunciation_facets() -> List[dict]:
+    score = {"$ifNull": ["$score", 0]}
+    return [
+        {"$project": {
+            "_id": 0,
+            "instruction_id": 1,
+            "custom_text": 1,
+            "has_custom_text": {"$ne": [{"$type": "$custom_text"}, "missing"]},
+            "session_id": 1,
+            "created_at": 1,
+            "score": "$assessment.total_score",
+        }},
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": None, "count": {"$sum": 1}, "last_active": {"$max": "$created_at"}}},
+            ],
+            "sessions": [
+                {"$match": {"session_id": {"$nin": [None, ""]}}},
+                {"$group": {"_id": "$session_id", "last": {"$max": "$created_at"}}},
+                {"$sort": {"last": -1}},
+                {"$limit": SET_CAP},
+            ],
+            "session_count": [
+                {"$match": {"session_id": {"$nin": [None, ""]}}},
+                {"$group": {"_id": "$session_id"}},
+                {"$count": "n"},
+            ],
+            "days": [
+                {"$match": {"created_at": {"$type": "date"}}},
+                {"$group": {"_id": _day("$created_at")}},
+            ],
+            "recent": [
+                {"$sort": {"created_at": -1}},
+                {"$limit": RECENT_LIMIT},
+                {"$lookup": {
+                    "from": "instructions",
+                    "localField": "instruction_id",
+                    "foreignField": "_id",
+                    "as": "instruction",
+                }},
+                {"$project": {
+                    "score": 1,
+                    "created_at": 1,
+                    "custom_text": 1,
+                    "has_custom_text": 1,
+                    "instruction_text": {"$first": "$instruction.text"},
+                }},
+            ],
+            # Per instruction first, so the $lookup runs once per instruction
+            "groups": [
+                {"$match": {"instruction_id": {"$ne": None}}},
+                {"$sort": {"created_at": -1}},
+                {"$group": {
+                    "_id": "$instruction_id",
+                    "count": {"$sum": 1},
+                    "score_sum": {"$sum": score},
+                    "highest": {"$max": score},
+                    "latest": {"$first": score},
+                    "latest_at": {"$first": "$created_at"},
+                }},
+                {"$lookup": {
+                    "from": "instructions",
+                    "localField": "_id",
+                    "foreignField": "_id",
+                    "as": "instruction",
+                }},
+                {"$unwind": "$instruction"},
+                {"$sort": {"latest_at": -1}},
+                {"$group": {
+                    "_id": "$instruction.group_id",
+                    "count": {"$sum": "$count"},
+                    "score_sum": {"$sum": "$score_sum"},
+                    "highest": {"$max": "$highest"},
+                    "latest": {"$first": "$latest"},
+                }},
+            ],
+        }},
+    ]
+
+
+async def _facet(collection, user_id: ObjectId, pipeline: List[dict]) -> dict:
+    result = await collection.aggregate([{"$match": {"user_id": user_id}}] + pipeline).to_list(1)
+    return result[0]
+
+
+# -------------------------
+# Summary document
+# -------------------------
+
+async def build_summary(db, user_id: ObjectId) -> Dict[str, Any]:
+    """Recompute a user's summary document from the attempt collections."""
+    pron, sit, quiz = await asyncio.gather(
+        _facet(db.pronunciation_attempts, user_id, _pronunciation_facets()),
+        _facet(db.situation_attempts, user_id, _quiz_facets("situations", "situation_id")),
+        _facet(db.quiz_attempts, user_id, _quiz_facets("results", "quiz_id")),
+    )
+
+    recent_pron = []
+    for attempt in pron["recent"]:
+        text = attempt.get("instruction_text")
+        if text is None:
+            text = attempt.get("custom_text") if attempt.get("has_custom_text") else "Custom text"
+        recent_pron.append({
+            "instruction_text": text,
+            "score": attempt.get("score"),
+            "created_at": attempt.get("created_at"),
+        })
+
+    quiz_totals = [s["totals"][0] for s in (sit, quiz) if s["totals"]]
+    recent_quizzes = sorted(
+        sit["recent"] + quiz["recent"],
+        key=lambda a: a.get("submitted_at") or datetime.min,
+        reverse=True
+    )[:RECENT_LIMIT]
+
+    groups = {}
+    for r in sit["groups"]:
+        groups[str(r["_id"])] = {
+            "sit_attempts": r["attempts"],
+            "sit_pct_sum": r["pct_sum"],
+            "sit_highest": max(int(r["highest"]), 0),
+            "sit_latest": int(r["latest"]),
+            "answered": sorted({str(i) for ids in r["answered"] for i in ids}),
+        }
+    for r in pron["groups"]:
+        groups.setdefault(str(r["_id"]), {}).update({
+            "pron_count": r["count"],
+            "pron_score_sum": r["score_sum"],
+            "pron_highest": r["highest"],
+            "pron_latest": r["latest"],
+        })
+
+    last_active = [
+        t["totals"][0]["last_active"] for t in (pron, sit, quiz)
+        if t["totals"] and isinstance(t["totals"][0].get("last_active"), datetime)
+    ]
+
+    # Oldest first, as the capped arrays drop from the front
+    encountered = sorted({str(e["_id"]) for s in (sit, quiz) for e in s["encountered"]})
+    days = sorted({d["_id"] for t in (pron, sit, quiz) for d in t["days"]})
+    sessions = [s["_id"] for s in reversed(pron["sessions"])]
+
+    return {
+        "user_id": user_id,
+        "pronunciation": {
+            "count": pron["totals"][0]["count"] if pron["totals"] else 0,
+            "recent": recent_pron,
+        },
+        "quizzes": {
+            "count": sum(t["count"] for t in quiz_totals),
+            "pct_sum": sum(t["pct_sum"] for t in quiz_totals),
+            "recent": [
+                {"group_id": a.get("group_id"), "score": a["score"], "pct": a["pct"], "submitted_at": a.get("submitted_at")}
+                for a in recent_quizzes
+            ],
+        },
+        "encountered": encountered[-SET_CAP:],
+        "encountered_count": len(encountered),
+        "sessions": sessions,
+        "sessions_count": pron["session_count"][0]["n"] if pron["session_count"] else 0,
+        "days": days[-SET_CAP:],
+        "days_count": len(days),
+        "last_active": max(last_active) if last_active else None,
+        "groups": groups,
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+async def rebuild_summary(db, user_id: ObjectId) -> Dict[str, Any]:
+    """Recompute and store a user's summary.
+
+    A partial placeholder is created first for users without a summary, so
+    attempts recorded during the rebuild have a version to bump. The write
+    is retried while the version moves; if it never settles the fresh
+    summary is returned without being stored.
+    """
+    summary = None
+    for _ in range(REBUILD_RETRIES):
+        current = await db.user_dashboard_summary.find_one_and_update(
+            {"user_id": user_id},
+            {"$setOnInsert": {"version": 0, "partial": True}},
+            projection={"version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        # Summaries written before versioning have no version field
+        version = current.get("version")
+        summary = await build_summary(db, user_id)
+        summary["version"] = version or 0
+
+        result = await db.user_dashboard_summary.replace_one(
+            {"user_id": user_id, "version": version if version is not None else {"$exists": False}},
+            summary
+        )
+        if result.matched_count:
+            return summary
+
+    print(f"Dashboard summary of {user_id} kept changing during rebuild, not stored")
+    return summary
+
+
+async def get_summary(db, user_id: ObjectId) -> Dict[str, Any]:
+    """The stored summary, built on first use for users without one."""
+    summary = await db.user_dashboard_summary.find_one({"user_id": user_id})
+    if summary is None or summary.get("partial"):
+        summary = await rebuild_summary(db, user_id)
+    return summary
+
+
+def _capped_union(field: str, values: List[str]) -> Dict[str, Any]:
+    """$set expressions adding values to a capped set and counting the new ones."""
+    current = {"$ifNull": [f"${field}", []]}
+    new = {"$setDifference": [{"$literal": values}, current]}
+    return {
+        field: {"$slice": [{"$concatArrays": [current, new]}, -SET_CAP]},
+        f"{field}_count": {"$add": [{"$ifNull": [f"${field}_count", {"$size": current}]}, {"$size": new}]},
+    }
+
+
+async def _add_to_sets(db, user_id: ObjectId, **values: List[str]):
+    """Add values to the capped sets of an existing summary (idempotent)."""
+    fields: Dict[str, Any] = {}
+    for field, items in values.items():
+        if items:
+            fields.update(_capped_union(field, items))
+    if fields:
+        await db.user_dashboard_summary.update_one({"user_id": user_id}, [{"$set": fields}])
+
+
+async def record_pronunciation(
+    db,
+    user_id: ObjectId,
+    group_id: Optional[ObjectId],
+    text: str,
+    score: float,
+    session_id: Optional[str],
+    created_at: datetime,
+):
+    """Add a stored pronunciation attempt to the user's summary.
+
+    Only existing summaries are updated; a missing one is built from the
+    attempt collections on the next read, which then includes this attempt.
+    """
+    update = {
+        "$inc": {"pronunciation.count": 1, "version": 1},
+        "$max": {"last_active": created_at},
+        "$push": {"pronunciation.recent": {
+            "$each": [{"instruction_text": text, "score": score, "created_at": created_at}],
+            "$sort": {"created_at": -1},
+            "$slice": RECENT_LIMIT,
+        }},
+        "$set": {"updated_at": datetime.now(timezone.utc)},
+    }
+    if group_id:
+        g = f"groups.{group_id}"
+        update["$inc"].update({f"{g}.pron_count": 1, f"{g}.pron_score_sum": score or 0})
+        update["$max"][f"{g}.pron_highest"] = score or 0
+        update["$set"][f"{g}.pron_latest"] = score or 0
+
+    await db.user_dashboard_summary.update_one({"user_id": user_id}, update)
+    await _add_to_sets(
+        db, user_id,
+        days=[created_at.strftime("%Y-%m-%d")],
+        sessions=[session_id] if session_id else []
+    )
+
+
+async def record_quiz(
+    db,
+    user_id: ObjectId,
+    group_id: Optional[ObjectId],
+    answered_ids: Iterable,
+    total_score: float,
+    submitted_at: datetime,
+):
+    """Add a stored situation or global quiz attempt to the user's summary.
+
+    `answered_ids` are the situation or quiz ids of the stored answers;
+    group_id is None for global quizzes.
+    """
+    answered = [str(i) for i in answered_ids]
+    n = len(answered)
+    score = normalize_score(total_score)
+    pct = score / n * 100 if n else 0
+
+    update = {"$set": {"updated_at": datetime.now(timezone.utc)}, "$inc": {"version": 1}}
+    if n:
+        update["$inc"].update({"quizzes.count": 1, "quizzes.pct_sum": pct})
+        update["$max"] = {"last_active": submitted_at}
+        update["$push"] = {"quizzes.recent": {
+            "$each": [{"group_id": group_id, "score": score, "pct": pct, "submitted_at": submitted_at}],
+            "$sort": {"submitted_at": -1},
+            "$slice": RECENT_LIMIT,
+        }}
+    if group_id:
+        g = f"groups.{group_id}"
+        update["$inc"].update({f"{g}.sit_attempts": 1, f"{g}.sit_pct_sum": pct})
+        update.setdefault("$max", {})[f"{g}.sit_highest"] = int(score) if n else 0
+        update["$set"][f"{g}.sit_latest"] = int(score)
+        update["$addToSet"] = {f"{g}.answered": {"$each": answered}}
+
+    await db.user_dashboard_summary.update_one({"user_id": user_id}, update)
+    if n:
+        await _add_to_sets(db, user_id, days=[submitted_at.strftime("%Y-%m-%d")], encountered=answered)
+
+
+# -------------------------
+# Dashboard response
+# -------------------------
+
+def _iso(dt) -> str:
+    return (dt if isinstance(dt, datetime) else datetime.utcnow()).isoformat() + "Z"
+
+
+def _tenths(score) -> float:
+    """Pronunciation scores are shown on a 0-10 scale."""
+    return round(float(score / 10 if score > 10 else score), 1)
+
+
+def render_summary(summary: Dict[str, Any], groups: List[dict], quiz_count_map: Dict[str, int]) -> Dict[str, Any]:
+    """Dashboard sections (groups_progress, pronunciation, situations, activity) from a summary."""
+    pron = summary.get("pronunciation", {})
+    quizzes = summary.get("quizzes", {})
+    group_stats = summary.get("groups", {})
+
+    recent_scores = [a["score"] for a in pron.get("recent", []) if a.get("score") is not None]
+    group_name_map = {str(g["_id"]): g["name"] for g in groups}
+
+    groups_progress = []
+    for g in groups:
+        gid_str = str(g["_id"])
+        total_situations = g.get("quiz_count") or quiz_count_map.get(gid_str, 0)
+        s = group_stats.get(gid_str, {})
+
+        unique_answered = len(s.get("answered", []))
+        sit_attempts = s.get("sit_attempts", 0)
+        avg_sit_score = s.get("sit_pct_sum", 0) / sit_attempts if sit_attempts else 0.0
+        pron_count = s.get("pron_count", 0)
+        avg_p_score = s.get("pron_score_sum", 0) / pron_count if pron_count else 0.0
+
+        groups_progress.append({
+            "group_id": gid_str, "group_number": g.get("group_number"), "name": g["name"],
+            "description": g.get("description", ""), "color": g.get("color_hex", "#0052D4"),
+            "total_answers": unique_answered + pron_count,
+            "situation_score": {
+                "average": round(float(avg_sit_score), 1),
+                "highest": {"point": s.get("sit_highest", 0), "total": total_situations},
+                "completed": unique_answered,
+                "latest": {"point": s.get("sit_latest", 0), "total": total_situations}
+            },
+            "pronunciation_score": {
+                "average": _tenths(avg_p_score),
+                "highest": _tenths(s.get("pron_highest", 0.0)),
+                "latest": _tenths(s.get("pron_latest", 0.0))
+            }
+        })
+
+    quiz_count = quizzes.get("count", 0)
+    last_active = summary.get("last_active")
+
+    return {
+        "groups_progress": groups_progress,
+        "pronunciation": {
+            "total_attempts": pron.get("count", 0),
+            "average_score": round(sum(recent_scores) / len(recent_scores), 1) if recent_scores else 0,
+            "recent_attempts": [
+                {"instruction_text": a.get("instruction_text"), "score": a.get("score"), "created_at": _iso(a.get("created_at"))}
+                for a in pron.get("recent", [])
+            ]
+        },
+        "situations": {
+            "total_quizzes": quiz_count,
+            "total_encountered": summary.get("encountered_count", len(summary.get("encountered", []))),
+            "average_score_percentage": round(quizzes.get("pct_sum", 0) / quiz_count, 1) if quiz_count else 0,
+            "recent_quizzes": [
+                {
+                    "group_name": group_name_map.get(str(a["group_id"]), "Global Quiz Challenge") if a.get("group_id") else "Global Quiz Challenge",
+                    "score": a["score"],
+                    "percentage": int(round(a["pct"])),
+                    "submitted_at": _iso(a.get("submitted_at")),
+                }
+                for a in quizzes.get("recent", [])
+            ]
+        },
+        "activity": {
+            "total_sessions": summary.get("sessions_count", len(summary.get("sessions", []))),
+            "last_active": last_active.isoformat() + "Z" if isinstance(last_active, datetime) else None,
+            "days_active": summary.get("days_count", len(summary.get("days", [])))
+        }
+    }
+
+
+async def get_catalogue(db):
+    """(groups, active quiz count per group id), cached per worker."""
+    global _catalogue
+    if _catalogue and time.monotonic() - _catalogue[0] < CATALOGUE_CACHE_SECONDS:
+        return _catalogue[1], _catalogue[2]
+
+    groups, quiz_counts = await asyncio.gather(
+        db.groups.find(
+            {}, {"group_number": 1, "name": 1, "description": 1, "color_hex": 1, "quiz_count": 1}
+        ).sort("group_number", 1).to_list(length=100),
+        db.quizzes.aggregate([
+            {"$match": {"is_active": True}},
+            {"$group": {"_id": "$group_id", "count": {"$sum": 1}}}
+        ]).to_list(None),
+    )
+    _catalogue = (time.monotonic(), groups, {str(r["_id"]): r["count"] for r in quiz_counts})
+    return groups, _catalogue[2]
+
+
+def invalidate_catalogue():
+    """Called after groups or quizzes are created, changed or deleted."""
+    global _catalogue
+    _catalogue = None
+
+
+async def compute_user_stats(db, user_id: ObjectId) -> Dict[str, Any]:
+    """Dashboard sections for one user: one summary read, the catalogue is cached."""
+    summary, (groups, quiz_count_map) = await asyncio.gather(
+        get_summary(db, user_id),
+        get_catalogue(db),
+    )
+    return render_summary(summary, groups, quiz_count_map)
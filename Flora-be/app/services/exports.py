@@ -0,0 +1,123 @@
+"""Streaming exports of attempt collections as NDJSON or CSV.
+
+Documents are read from a cursor in batches and written out as they
+arrive, so memory stays flat whatever the size of the export. Reads go to
+a secondary when the deployment has one.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReadPreference
+
+# collection -> (date field, CSV columns); a column is a dotted path, or
+# "<array>#" for the length of an array
+EXPORTS: Dict[str, tuple] = {
+    "pronunciation_attempts": ("created_at", [
+        "_id", "user_id", "instruction_id", "group_id", "custom_text", "session_id",
+        "created_at", "attempt_number", "engine_version", "audio_duration_seconds",
+        "assessment.total_score", "assessment.scoring_mode", "assessment.asr_transcript",
+        "assessment.processing_time_ms",
+    ]),
+    "situation_attempts": ("submitted_at", [
+        "_id", "user_id", "group_id", "quiz_id", "submitted_at", "total_score",
+        "correct_count", "incorrect_count", "situations#", "total_time_seconds",
+    ]),
+    "quiz_attempts": ("submitted_at", [
+        "_id", "user_id", "quiz_id", "submitted_at", "total_score",
+        "correct_count", "incorrect_count", "results#",
+    ]),
+}
+
+
+def _plain(value):
+    """JSON/CSV-friendly value for BSON types."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat() + ("Z" if value.tzinfo is None else "")
+    return value
+
+
+def _json_default(value):
+    plain = _plain(value)
+    if plain is value:
+        return str(value)
+    return plain
+
+
+def _column(doc: dict, path: str):
+    if path.endswith("#"):
+        value = doc.get(path[:-1])
+        return len(value) if isinstance(value, list) else 0
+    value = doc
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return _plain(value)
+
+
+def _projection(columns: List[str]) -> Dict[str, int]:
+    return {c.rstrip("#"): 1 for c in columns}
+
+
+def build_query(
+    collection: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_id: Optional[ObjectId] = None,
+    user_id: Optional[ObjectId] = None,
+) -> dict:
+    """Filter of an export. Raises ValueError for a group filter on a
+    collection whose attempts carry no group_id (global quizzes)."""
+    date_field, columns = EXPORTS[collection]
+    query: dict = {}
+    if user_id:
+        query["user_id"] = user_id
+    if group_id:
+        if "group_id" not in columns:
+            raise ValueError(f"{collection} cannot be filtered by group")
+        query["group_id"] = group_id
+    if start or end:
+        query[date_field] = {}
+        if start:
+            query[date_field]["$gte"] = start
+        if end:
+            query[date_field]["$lt"] = end
+    return query
+
+
+async def stream_export(db, collection: str, query: dict, fmt: str = "ndjson", batch_size: int = 500) -> AsyncIterator[str]:
+    """Yield the export a batch of documents at a time."""
+    date_field, columns = EXPORTS[collection]
+    source = db.get_collection(collection, read_preference=ReadPreference.SECONDARY_PREFERRED)
+
+    cursor = source.find(query, _projection(columns) if fmt == "csv" else None)
+    cursor = cursor.sort(date_field, 1).batch_size(batch_size)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow([c.replace("#", "_count") for c in columns])
+
+    pending = 0
+    async for doc in cursor:
+        if writer:
+            writer.writerow([_column(doc, c) for c in columns])
+        else:
+            buffer.write(json.dumps(doc, default=_json_default, ensure_ascii=False))
+            buffer.write("\n")
+        pending += 1
+
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
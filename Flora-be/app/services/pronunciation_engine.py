@@ -1,11 +1,15 @@
 import os
 import time
+import json
+import hashlib
+import asyncio
 import numpy as np
 import librosa
 import torch
 import nltk
 import difflib
 
+from concurrent.futures import ThreadPoolExecutor
 from faster_whisper import WhisperModel
 from transformers import Wav2Vec2Processor, Wav2Vec2ForCTC
 from nltk.corpus import cmudict
@@ -18,50 +22,231 @@ except:
     nltk.download("cmudict")
 
 
-class PronunciationEngine:
+# Bump whenever scoring logic changes in a way SCORING does not capture
+# (e.g. the phone-to-char map or the lexicon special cases).
+SCORING_VERSION = 1
+
+# Thresholds and weights that decide scores. Part of the engine fingerprint,
+# so changing any of them marks stored attempts as stale.
+SCORING = {
+    "phone_threshold": 0.6,          # substring similarity for a correct phone
+    "phone_threshold_lenient": 0.4,  # ... when ASR heard the word well
+    "lenient_word_ratio": 0.8,
+    "trust_word_ratio": 0.9,         # ASR agreement above which faint phones count
+    "trust_phone_ratio": 0.3,
+    "phone_score_correct": 100,
+    "phone_score_wrong": 25,
+    "asr_weight": 0.3,               # word score = asr_weight * ASR + (1 - asr_weight) * phones
+    "asr_base": 70,
+    "floor_high_ratio": 0.95,        # safety net: ASR agreement -> minimum score
+    "floor_high": 85,
+    "floor_low_ratio": 0.8,
+    "floor_low": 70,
+    "asr_only_correct_ratio": 0.8,
+    "match_ratio": 0.45,             # fuzzy target/ASR word matching
+    "match_window": 5,
+    "min_word_seconds": 0.05,
+    "max_word_seconds": 1.2,
+    "min_energy": 0.0001,
+    "dtw_good_distance": 0.25,       # reference mode: cosine distance scored 100
+    "dtw_bad_distance": 0.75,        # ... and scored 0
+}
+
+# wav2vec2-base emits one frame per 320 input samples (20 ms at 16 kHz)
+FRAME_HOP = 320
 
-    def __init__(self):
 
-        print("Loading faster-whisper...")
+class PronunciationEngine:
 
-        self.asr = WhisperModel(
-            "tiny.en",
-            device="cpu",
-            compute_type="int8"
-        )
+    def __init__(
+        self,
+        inference_workers=2,
+        chunk_seconds=20.0,
+        cpu_threads=0,
+        preload=False,
+        asr_model="tiny.en",
+        compute_type="int8",
+        acoustic_model="facebook/wav2vec2-base-960h",
+    ):
+
+        # Model choices; all of them are part of the version fingerprint.
+        self.asr_model = asr_model
+        self.compute_type = compute_type
+        self.acoustic_model = acoustic_model
+        self.alignment = "char-fuzzy"
+        self._version = None
+        self._lexicon_hash = None
+
+        # Number of chunks / requests that can run model inference at once.
+        self.inference_workers = max(1, int(inference_workers))
+        # Recordings longer than this are split at silences and processed in parallel.
+        self.chunk_seconds = chunk_seconds
+        # Threads each concurrent job may use in torch and CTranslate2 (0 = library default).
+        self.cpu_threads = cpu_threads
+
+        self.asr = None
+        self.executor = None
+
+        if preload:
+            # Loading in a parent process that will fork workers: keep torch
+            # single-threaded so no OpenMP pool exists at fork time, and leave
+            # thread-owning runtimes to after_fork().
+            torch.set_num_threads(1)
+        else:
+            self.set_torch_threads()
+            self.load_asr()
 
         print("Loading wav2vec2 stable character model...")
 
         self.processor = Wav2Vec2Processor.from_pretrained(
-            "facebook/wav2vec2-base-960h"
+            self.acoustic_model
         )
 
         self.wav2vec = Wav2Vec2ForCTC.from_pretrained(
-            "facebook/wav2vec2-base-960h"
+            self.acoustic_model
         )
+        self.wav2vec.eval()
 
         print("Loading CMU dictionary...")
 
         self.cmu = cmudict.dict()
 
+        # Hash the lexicon now so no request pays for it
+        print(f"Pronunciation engine version {self.version}")
+
+        if not preload:
+            self.start_executor()
+
+    def load_asr(self):
+
+        print("Loading faster-whisper...")
+
+        # CTranslate2 owns native thread pools that do not survive fork(),
+        # so the ASR model is always created in the serving process.
+        self.asr = WhisperModel(
+            self.asr_model,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+            num_workers=self.inference_workers
+        )
+
+    def start_executor(self):
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.inference_workers,
+            thread_name_prefix="pronunciation-inference"
+        )
+
+    def set_torch_threads(self):
+
+        if self.cpu_threads:
+            torch.set_num_threads(self.cpu_threads)
+
+    def after_fork(self, cpu_threads=None):
+        # Called in a worker forked from a process that built this engine with
+        # preload=True. The wav2vec2 weights and lexicon stay shared
+        # copy-on-write with the parent; thread pools are created fresh here.
+
+        if cpu_threads is not None:
+            self.cpu_threads = cpu_threads
+
+        if self.cpu_threads:
+            self.set_torch_threads()
+        else:
+            torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.inference_workers))
+
+        if self.asr is None:
+            self.load_asr()
+
+        self.start_executor()
+
+    def version_info(self):
+        # Everything that can change a score for the same audio and text
+
+        if self._lexicon_hash is None:
+            self._lexicon_hash = hashlib.sha256(
+                json.dumps(self.cmu, sort_keys=True).encode()
+            ).hexdigest()[:16]
+
+        return {
+            "scoring_version": SCORING_VERSION,
+            "asr_model": self.asr_model,
+            "compute_type": self.compute_type,
+            "acoustic_model": self.acoustic_model,
+            "alignment": self.alignment,
+            "lexicon": f"cmudict:{self._lexicon_hash}",
+            "scoring": SCORING,
+        }
+
+    @property
+    def version(self):
+        # Deterministic fingerprint stored on attempts as engine_version
+
+        if self._version is None:
+            digest = hashlib.sha256(
+                json.dumps(self.version_info(), sort_keys=True).encode()
+            ).hexdigest()[:12]
+            self._version = f"v{SCORING_VERSION}-{digest}"
+
+        return self._version
+
+    def close(self):
+
+        if self.executor:
+            self.executor.shutdown(wait=False)
+
     # -------------------------
     # audio
     # -------------------------
 
-    def load_audio(self, path):
+    def load_audio(self, path, max_seconds=None):
+        # max_seconds: stop decoding after this much audio
 
-        audio, sr = librosa.load(path, sr=16000, mono=True)
+        audio, sr = librosa.load(path, sr=16000, mono=True, duration=max_seconds)
 
         return audio, sr
 
+    def split_chunks(self, audio, sr):
+        # Returns (start, end) sample ranges no longer than chunk_seconds,
+        # cut in the middle of silent gaps so no word is split in two.
+
+        max_len = int(self.chunk_seconds * sr)
+
+        if max_len <= 0 or len(audio) <= max_len:
+            return [(0, len(audio))]
+
+        voiced = librosa.effects.split(audio, top_db=30)
+        cuts = [
+            (voiced[i - 1][1] + voiced[i][0]) // 2
+            for i in range(1, len(voiced))
+        ]
+
+        bounds = []
+        start = 0
+
+        while len(audio) - start > max_len:
+            limit = start + max_len
+            # Prefer the latest silence in the window, but avoid tiny chunks
+            candidates = [c for c in cuts if start + max_len // 2 <= c <= limit]
+            end = candidates[-1] if candidates else limit
+            bounds.append((start, end))
+            start = end
+
+        bounds.append((start, len(audio)))
+
+        return bounds
+
     # -------------------------
     # ASR
     # -------------------------
 
-    def transcribe(self, path):
+    def transcribe(self, audio, offset=0.0):
+        # audio: file path or 16 kHz mono float32 array.
+        # offset: seconds added to word timestamps when audio is a chunk.
 
         segments, _ = self.asr.transcribe(
-            path,
+            audio,
             word_timestamps=True
         )
 
@@ -77,8 +262,8 @@ class PronunciationEngine:
 
                     words.append({
                         "word": w.word.lower().strip(".,!?"),
-                        "start": w.start,
-                        "end": w.end
+                        "start": w.start + offset,
+                        "end": w.end + offset
                     })
 
         return text.strip(), words
@@ -142,6 +327,28 @@ class PronunciationEngine:
 
         return logits
 
+    def frame_features(self, audio, sr):
+        # Per-frame last hidden states and CTC log-probabilities, as float32
+        # arrays of shape (frames, 768) and (frames, vocab).
+
+        inputs = self.processor(
+            audio,
+            sampling_rate=sr,
+            return_tensors="pt"
+        )
+
+        with torch.no_grad():
+
+            out = self.wav2vec(
+                inputs.input_values,
+                output_hidden_states=True
+            )
+
+        embeddings = out.hidden_states[-1][0].numpy()
+        log_probs = torch.log_softmax(out.logits[0], dim=-1).numpy()
+
+        return embeddings, log_probs
+
     # -------------------------
     # phoneme alignment
     # -------------------------
@@ -163,7 +370,10 @@ class PronunciationEngine:
         phones = []
         
         # If the word match is perfect, we can be much more lenient on the phoneme level
-        min_threshold = 0.6 if word_match_ratio < 0.8 else 0.4
+        if word_match_ratio < SCORING["lenient_word_ratio"]:
+            min_threshold = SCORING["phone_threshold"]
+        else:
+            min_threshold = SCORING["phone_threshold_lenient"]
         
         for p in target_phones:
             char_rep = phone_to_char.get(p, p).upper()
@@ -180,13 +390,13 @@ class PronunciationEngine:
             # If Whisper heard the word clearly, and we find even a faint trace of the phonemes, we mark it green
             is_correct = best_sub_ratio > min_threshold
             # Special case: if word match is very high (>0.9), assume phonemes are mostly correct
-            if word_match_ratio > 0.9 and best_sub_ratio > 0.3:
+            if word_match_ratio > SCORING["trust_word_ratio"] and best_sub_ratio > SCORING["trust_phone_ratio"]:
                 is_correct = True
                 
             phones.append({
                 "phone": p, 
                 "correct": is_correct, 
-                "score": 100 if is_correct else 25
+                "score": SCORING["phone_score_correct"] if is_correct else SCORING["phone_score_wrong"]
             })
                     
         return phones
@@ -220,16 +430,16 @@ class PronunciationEngine:
     def vowel_length(self, audio):
         dur=len(audio)/16000
         # A word segment should be at least 0.05s and less than 1.5s for modern flow
-        if dur < 0.05:
+        if dur < SCORING["min_word_seconds"]:
             return "vowel too short"
-        if dur > 1.2:
+        if dur > SCORING["max_word_seconds"]:
             return "vowel too long"
         return None
 
     def stress_detector(self, audio):
         energy=np.mean(audio**2)
         # Highly sensitive to detect even whispered voices
-        if energy < 0.0001:
+        if energy < SCORING["min_energy"]:
             return "weak stress"
         return None
 
@@ -237,7 +447,7 @@ class PronunciationEngine:
     # score word
     # -------------------------
 
-    def score_word(self, word, audio, sr, asr_word=None):
+    def score_word(self, word, audio, sr, asr_word=None, asr_only=False):
         target=self.phonemes(word)
 
         if not target or audio is None or len(audio) < 100:
@@ -251,7 +461,10 @@ class PronunciationEngine:
             asr_clean = asr_word.lower().replace("’", "'").strip(".,!?\"'()[]:;")
             match_ratio = difflib.SequenceMatcher(None, w_clean, asr_clean).ratio()
         
-        base_score = 70 * match_ratio
+        base_score = SCORING["asr_base"] * match_ratio
+
+        if asr_only:
+            return self.score_word_asr_only(word, target, audio, match_ratio)
 
         # 2. Character-to-Phoneme accuracy
         logits=self.wav2vec_logits(audio,sr)
@@ -266,13 +479,10 @@ class PronunciationEngine:
 
         # Weighted final score: prioritizing phoneme accuracy but with a Whisper safety net
         # 30% from Whisper word detection, 70% from phoneme-level check
-        total = (0.3 * base_score) + (0.7 * phone_avg)
+        total = (SCORING["asr_weight"] * base_score) + ((1 - SCORING["asr_weight"]) * phone_avg)
         
         # Safety net: If Whisper is 100% sure it's the right word, don't let the score drop too low
-        if match_ratio > 0.95:
-            total = max(total, 85)
-        elif match_ratio > 0.8:
-            total = max(total, 70)
+        total = self.score_floor(total, match_ratio)
 
         detectors=[]
         detectors+=self.rl_detector(aligned)
@@ -291,24 +501,52 @@ class PronunciationEngine:
             "issues":detectors
         }
 
-    # -------------------------
-    # main
-    # -------------------------
+    def score_floor(self, total, match_ratio):
 
-    async def assess(self, audio_path, target_text):
+        if match_ratio > SCORING["floor_high_ratio"]:
+            return max(total, SCORING["floor_high"])
+        if match_ratio > SCORING["floor_low_ratio"]:
+            return max(total, SCORING["floor_low"])
+        return total
 
-        start=time.time()
+    def score_word_asr_only(self, word, target, audio, match_ratio):
+        # Degraded scoring used under load: skips wav2vec2 and lets every
+        # phone inherit the word-level agreement between target and ASR.
 
-        audio,sr=self.load_audio(audio_path)
+        is_correct = match_ratio > SCORING["asr_only_correct_ratio"]
+        score = SCORING["phone_score_correct"] if is_correct else SCORING["phone_score_wrong"]
+        aligned = [
+            {"phone": p, "correct": is_correct, "score": score}
+            for p in target
+        ]
 
-        transcript,words_ts=self.transcribe(audio_path)
+        total = self.score_floor(100 * match_ratio, match_ratio)
 
-        words=target_text.lower().split()
+        detectors=[]
+
+        v=self.vowel_length(audio)
+        if v: detectors.append(v)
+
+        s=self.stress_detector(audio)
+        if s: detectors.append(s)
 
-        results=[]
-        total=0
+        return{
+            "word":word,
+            "score":min(100, round(total)),
+            "phones":aligned,
+            "issues":detectors
+        }
+
+    # -------------------------
+    # word matching
+    # -------------------------
+
+    def match_words(self, words, words_ts):
+        # Map target words to ASR transcript words using fuzzy matching.
+        # Returns one ASR word (or None) per target word.
+
+        matches = []
 
-        # Map target words to ASR transcript words using fuzzy matching
         for i, w in enumerate(words):
             target_clean = w.lower().strip(".,!?\"'()[]:;")
             
@@ -317,26 +555,253 @@ class PronunciationEngine:
             best_ratio = 0
             
             # Increase window to 5 and relax ratio to 0.5
-            window = 5
+            window = SCORING["match_window"]
             start_search = max(0, i - window)
             end_search = min(len(words_ts), i + window + 1)
             
             for j in range(start_search, end_search):
                 asr_w = words_ts[j]["word"].replace("’", "'").strip(".,!?\"'()[]:;")
                 ratio = difflib.SequenceMatcher(None, target_clean, asr_w).ratio()
-                if ratio > 0.45 and ratio > best_ratio:
+                if ratio > SCORING["match_ratio"] and ratio > best_ratio:
                     best_ratio = ratio
                     found_seg = words_ts[j]
 
+            matches.append(found_seg)
+
+        return matches
+
+    def score_chunk(self, audio, sr, items, asr_only=False):
+        # items: list of (index, target word, matched ASR word) in one audio chunk
+
+        results = []
+
+        for i, w, found_seg in items:
+            target_clean = w.lower().strip(".,!?\"'()[]:;")
+
             if found_seg:
                 seg = self.segment(audio, sr, found_seg["start"], found_seg["end"])
                 # Pass the detected word from ASR to help with base scoring
-                r = self.score_word(target_clean, seg, sr, asr_word=found_seg["word"])
+                r = self.score_word(target_clean, seg, sr, asr_word=found_seg["word"], asr_only=asr_only)
+                r["start"] = round(found_seg["start"], 2)
+                r["end"] = round(found_seg["end"], 2)
             else:
                 r={"word":w,"score":0,"phones":[],"issues":["Word not detected in audio"]}
 
+            r["index"] = i
             results.append(r)
-            total+=r["score"]
+
+        return results
+
+    # -------------------------
+    # reference templates
+    # -------------------------
+
+    def build_template(self, audio, sr, text):
+        # Offline: everything about a reference recording that scoring needs,
+        # so attempts never reprocess the reference. Word spans come from the
+        # ASR timestamps; phones split each word span evenly.
+
+        embeddings, log_probs = [], []
+        for s, e in self.split_chunks(audio, sr):
+            emb, lp = self.frame_features(audio[s:e], sr)
+            embeddings.append(emb)
+            log_probs.append(lp)
+        embeddings = np.concatenate(embeddings)
+        log_probs = np.concatenate(log_probs)
+
+        frames = len(embeddings)
+        frame_rate = sr / FRAME_HOP
+
+        _, words_ts = self.transcribe(audio)
+        words = text.lower().split()
+        matches = self.match_words(words, words_ts)
+
+        spans = [
+            (int(m["start"] * frame_rate), max(int(m["start"] * frame_rate) + 1, int(m["end"] * frame_rate)))
+            if m else None
+            for m in matches
+        ]
+
+        # Words the ASR missed share the gap between their matched neighbours
+        i = 0
+        while i < len(spans):
+            if spans[i] is not None:
+                i += 1
+                continue
+            j = i
+            while j < len(spans) and spans[j] is None:
+                j += 1
+            gap_start = spans[i - 1][1] if i > 0 else 0
+            gap_end = spans[j][0] if j < len(spans) else frames
+            step = max(1, (gap_end - gap_start) // (j - i))
+            for k in range(i, j):
+                a = min(gap_start + (k - i) * step, frames - 1)
+                spans[k] = (a, max(a + 1, min(a + step, frames)))
+            i = j
+
+        phones, phone_spans, phone_word = [], [], []
+        for k, (w, (a, b)) in enumerate(zip(words, spans)):
+            target = self.phonemes(w)
+            for n, p in enumerate(target):
+                phones.append(p)
+                phone_spans.append((
+                    a + (b - a) * n // len(target),
+                    max(a + (b - a) * n // len(target) + 1, a + (b - a) * (n + 1) // len(target))
+                ))
+                phone_word.append(k)
+
+        return {
+            "text": text,
+            "acoustic_model": self.acoustic_model,
+            "frame_rate": frame_rate,
+            "embeddings": embeddings.astype(np.float16),
+            "log_probs": log_probs.astype(np.float16),
+            "words": np.array(words, dtype=str),
+            "word_spans": np.array(spans, dtype=np.int32).reshape(-1, 2),
+            "phones": np.array(phones, dtype=str),
+            "phone_spans": np.array(phone_spans, dtype=np.int32).reshape(-1, 2),
+            "phone_word": np.array(phone_word, dtype=np.int32),
+        }
+
+    def dtw_score(self, distance):
+
+        good = SCORING["dtw_good_distance"]
+        bad = SCORING["dtw_bad_distance"]
+
+        return float(np.clip((bad - distance) / (bad - good), 0, 1) * 100)
+
+    def score_template(self, audio, sr, template, embeddings, matches):
+        # Align learner frames to the cached reference frames with DTW and
+        # score each reference word / phone span by its mean cosine distance.
+
+        ref = template["embeddings"].astype(np.float32)
+        ref = ref / (np.linalg.norm(ref, axis=1, keepdims=True) + 1e-8)
+        hyp = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8)
+
+        _, path = librosa.sequence.dtw(X=ref.T, Y=hyp.T, metric="cosine")
+        path = path[::-1]
+        dist = 1.0 - np.sum(ref[path[:, 0]] * hyp[path[:, 1]], axis=1)
+
+        def span_distance(a, b):
+            on = (path[:, 0] >= a) & (path[:, 0] < b)
+            return dist[on].mean() if on.any() else 1.0, path[on, 1]
+
+        frame_rate = template["frame_rate"]
+        phone_word = template["phone_word"]
+        results = []
+
+        for i, (w, found_seg) in enumerate(zip(template["words"], matches)):
+            a, b = template["word_spans"][i]
+            d, hyp_frames = span_distance(a, b)
+
+            aligned = []
+            for k in np.nonzero(phone_word == i)[0]:
+                pd, _ = span_distance(*template["phone_spans"][k])
+                ps = self.dtw_score(pd)
+                is_correct = ps >= 50
+                aligned.append({
+                    "phone": str(template["phones"][k]),
+                    "correct": bool(is_correct),
+                    "score": SCORING["phone_score_correct"] if is_correct else SCORING["phone_score_wrong"]
+                })
+
+            match_ratio = 0
+            if found_seg:
+                match_ratio = difflib.SequenceMatcher(None, str(w), found_seg["word"]).ratio()
+            total = self.score_floor(self.dtw_score(d), match_ratio)
+
+            start = float(hyp_frames.min() / frame_rate) if len(hyp_frames) else 0.0
+            end = float((hyp_frames.max() + 1) / frame_rate) if len(hyp_frames) else 0.0
+            seg = self.segment(audio, sr, start, end)
+
+            detectors = []
+            v = self.vowel_length(seg)
+            if v: detectors.append(v)
+            s = self.stress_detector(seg)
+            if s: detectors.append(s)
+
+            results.append({
+                "word": str(w),
+                "score": min(100, round(total)),
+                "phones": aligned,
+                "issues": detectors,
+                "start": round(start, 2),
+                "end": round(end, 2),
+                "index": i
+            })
+
+        return results
+
+    # -------------------------
+    # main
+    # -------------------------
+
+    async def assess(self, audio_path, target_text, audio=None, asr_only=False, template=None):
+        # audio: optional pre-decoded 16 kHz mono array (audio_path is then ignored)
+        # asr_only: skip wav2vec2 and score from the ASR transcript alone
+        # template: cached reference template (build_template) to score against with DTW
+
+        start=time.time()
+
+        loop = asyncio.get_running_loop()
+
+        if audio is None:
+            audio,sr = await loop.run_in_executor(self.executor, self.load_audio, audio_path)
+        else:
+            sr = 16000
+
+        # Long recordings are transcribed chunk by chunk across the inference workers
+        chunks = self.split_chunks(audio, sr)
+
+        use_template = template is not None and not asr_only
+
+        parts, features = await asyncio.gather(
+            asyncio.gather(*[
+                loop.run_in_executor(self.executor, self.transcribe, audio[s:e], s / sr)
+                for s, e in chunks
+            ]),
+            asyncio.gather(*[
+                loop.run_in_executor(self.executor, self.frame_features, audio[s:e], sr)
+                for s, e in (chunks if use_template else [])
+            ])
+        )
+
+        transcript = " ".join(t for t, _ in parts if t)
+        words_ts = [w for _, ws in parts for w in ws]
+
+        words=target_text.lower().split()
+
+        matches = self.match_words(words, words_ts)
+
+        if use_template:
+            embeddings = np.concatenate([emb for emb, _ in features])
+            results = await loop.run_in_executor(
+                self.executor, self.score_template, audio, sr, template, embeddings, matches
+            )
+            return self.summarize(results, words, transcript, "reference_dtw", start)
+
+        # Score each target word in the chunk its ASR match falls into
+        chunk_items = [[] for _ in chunks]
+        for i, (w, found_seg) in enumerate(zip(words, matches)):
+            k = 0
+            if found_seg:
+                pos = found_seg["start"] * sr
+                while k < len(chunks) - 1 and pos >= chunks[k][1]:
+                    k += 1
+            chunk_items[k].append((i, w, found_seg))
+
+        scored = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self.score_chunk, audio, sr, items, asr_only)
+            for items in chunk_items if items
+        ])
+
+        results = sorted((r for part in scored for r in part), key=lambda r: r["index"])
+
+        return self.summarize(results, words, transcript, "asr_only" if asr_only else "full", start)
+
+    def summarize(self, results, words, transcript, mode, start):
+
+        total = sum(r["score"] for r in results)
 
         avg=total/len(words) if words else 0
 
@@ -345,5 +810,11 @@ class PronunciationEngine:
             "total_score":round(avg),
             "asr_transcript":transcript,
             "words":results,
+            "scoring_mode":mode,
             "processing_time":round(time.time()-start,2)
         }
+
+
+# Engine built by the pre-forking launcher (scripts/serve.py) before workers
+# are forked; picked up by the app's startup hook instead of loading again.
+preloaded_engine = None
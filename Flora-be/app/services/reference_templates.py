@@ -0,0 +1,69 @@
+"""Precomputed reference-audio templates for instructions."""
+import hashlib
+import io
+import os
+import urllib.request
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from app.services.audio_storage import get_audio_storage
+
+# Scalar fields stored as 0-d arrays in the .npz
+SCALARS = ("text", "acoustic_model", "frame_rate")
+
+
+def template_key(instruction_id: str, audio_bytes: bytes, acoustic_model: str, text: str) -> str:
+    """Storage key; changes with the reference audio, the text or the acoustic model."""
+    digest = hashlib.sha256(audio_bytes + acoustic_model.encode() + text.encode()).hexdigest()
+    return f"templates/{instruction_id}/{digest[:16]}.npz"
+
+
+def encode_template(template: dict) -> bytes:
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **template)
+    return buf.getvalue()
+
+
+def decode_template(data: bytes) -> dict:
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        template = {name: npz[name] for name in npz.files}
+    for name in SCALARS:
+        template[name] = template[name].item()
+    return template
+
+
+@lru_cache(maxsize=128)
+def load_reference_template(key: str) -> dict:
+    """Template by storage key, kept in memory after first use."""
+    return decode_template(get_audio_storage().get(key))
+
+
+def usable_template_key(instruction: dict, acoustic_model: str, target_text: str) -> Optional[str]:
+    """Key of the instruction's template if it matches the running engine and text."""
+    ref = instruction.get("reference_template")
+    if not ref:
+        return None
+    if ref.get("acoustic_model") != acoustic_model or ref.get("text") != target_text:
+        return None
+    return ref["key"]
+
+
+def read_reference_audio(audio_url: str, storage_path: str) -> bytes:
+    """Bytes of an instruction's reference recording.
+
+    Accepts http(s) URLs, paths under the /audio static mount, and paths
+    relative to the reference directory.
+    """
+    if audio_url.startswith(("http://", "https://")):
+        with urllib.request.urlopen(audio_url, timeout=30) as resp:
+            return resp.read()
+
+    if audio_url.startswith("/audio/"):
+        path = os.path.join(storage_path, audio_url[len("/audio/"):])
+    else:
+        path = os.path.join(storage_path, "reference", audio_url.lstrip("/"))
+
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,84 @@
+"""CPU thread budget shared by server workers and inference libraries."""
+import os
+from typing import Dict, Any, List, Optional
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on (respects cgroup/taskset restrictions)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class ThreadBudget:
+    """Splits a fixed number of inference cores between processes and threads.
+
+    ``total_cores`` are divided evenly among ``workers`` server processes.
+    Inside a process, up to ``inference_workers`` jobs run concurrently, so
+    each job gets ``cores_per_worker // inference_workers`` threads for torch
+    and for CTranslate2 (faster-whisper). With ``pin`` set, each process is
+    restricted to its own slice of CPUs.
+    """
+
+    def __init__(
+        self,
+        total_cores: int,
+        workers: int,
+        inference_workers: int,
+        pin: bool = False,
+        worker_index: int = 0,
+    ):
+        cpus = available_cpus()
+        self.total_cores = min(total_cores, len(cpus)) if total_cores > 0 else len(cpus)
+        self.workers = max(1, workers)
+        self.inference_workers = max(1, inference_workers)
+        self.worker_index = worker_index
+        self.pin = pin
+
+        self.cores_per_worker = max(1, self.total_cores // self.workers)
+        self.threads_per_job = max(1, self.cores_per_worker // self.inference_workers)
+
+        self.cpu_set: Optional[List[int]] = None
+        if pin:
+            first = (worker_index * self.cores_per_worker) % len(cpus)
+            self.cpu_set = [cpus[(first + i) % len(cpus)] for i in range(self.cores_per_worker)]
+
+    @classmethod
+    def from_settings(cls, settings, worker_index: Optional[int] = None) -> "ThreadBudget":
+        """Budget for this process.
+
+        ``worker_index`` is set only by scripts/serve.py, which starts exactly
+        SERVER_WORKERS processes. Under any other launcher the worker count
+        is an assumption, so CPUs are not pinned (every worker would take
+        slice 0) and a warning is printed.
+        """
+        verified = worker_index is not None
+        if not verified and (settings.SERVER_WORKERS > 1 or settings.CPU_AFFINITY):
+            print(
+                f"Warning: not started by scripts/serve.py, assuming SERVER_WORKERS={settings.SERVER_WORKERS} "
+                f"for the CPU thread budget" + (" and ignoring CPU_AFFINITY" if settings.CPU_AFFINITY else "")
+            )
+
+        return cls(
+            total_cores=settings.INFERENCE_CORES,
+            workers=settings.SERVER_WORKERS,
+            inference_workers=settings.ENGINE_INFERENCE_WORKERS,
+            pin=settings.CPU_AFFINITY and verified,
+            worker_index=worker_index or 0,
+        )
+
+    def apply(self):
+        """Pin the current process to its CPU slice, if pinning is enabled."""
+        if self.cpu_set and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.cpu_set)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_cores": self.total_cores,
+            "workers": self.workers,
+            "worker_index": self.worker_index,
+            "cores_per_worker": self.cores_per_worker,
+            "inference_workers": self.inference_workers,
+            "threads_per_job": self.threads_per_job,
+            "cpu_affinity": self.cpu_set,
+        }
@@ -0,0 +1,190 @@
+"""Bulk user provisioning from CSV or JSON."""
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, EmailStr, Field, ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.core.security import hash_passwords
+from app.services.user_listing import normalize_email, search_keys
+
+HASH_CHUNK_SIZE = 25
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class UserImportRow(BaseModel):
+    """One row of an import file; same rules as POST /admin/users."""
+    username: str = Field(..., min_length=3, max_length=50)
+    email: EmailStr
+    full_name: str = Field(..., min_length=1, max_length=100)
+    password: str = Field(..., min_length=5)
+    role: str = Field("user", pattern="^(user|student|admin)$")
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """Process pool for bulk bcrypt work, created on first use.
+
+    Uses spawn so children do not inherit the server's event loop and threads.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_hash_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def parse_user_file(content: bytes, filename: str = "") -> List[dict]:
+    """Rows from a JSON array (or {"users": [...]}) or a CSV with a header row."""
+    text = content.decode("utf-8-sig")
+
+    if filename.lower().endswith(".json") or text.lstrip().startswith(("[", "{")):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("users", [])
+        if not isinstance(data, list):
+            raise ValueError("JSON import must be a list of users")
+        return data
+
+    reader = csv.DictReader(io.StringIO(text))
+    return [{k.strip().lower(): (v or "").strip() for k, v in row.items() if k} for row in reader]
+
+
+async def import_users(db, rows: List[dict], pool: ProcessPoolExecutor, dry_run: bool = False) -> Dict:
+    """Validate, de-duplicate, hash and insert users. Returns a per-row report.
+
+    Row statuses: created (or valid on a dry run), invalid, duplicate (repeated
+    within the file), exists (username or email already registered), error.
+    """
+    report = [{"row": i + 1, "username": (r or {}).get("username") if isinstance(r, dict) else None}
+              for i, r in enumerate(rows)]
+    candidates = []  # (report index, validated row)
+    seen_usernames, seen_emails = set(), set()
+
+    for i, raw in enumerate(rows):
+        if not isinstance(raw, dict):
+            report[i].update(status="invalid", detail="Row must be an object")
+            continue
+        raw = dict(raw)
+        # Accept the admin form's field name too
+        if "fullname" in raw and "full_name" not in raw:
+            raw["full_name"] = raw.pop("fullname")
+        if not raw.get("role"):
+            raw.pop("role", None)
+        try:
+            row = UserImportRow(**raw)
+        except ValidationError as e:
+            report[i].update(status="invalid", detail="; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+
+        row.email = normalize_email(row.email)
+        if row.username in seen_usernames or row.email in seen_emails:
+            report[i].update(status="duplicate", detail="Username or email repeated in file")
+            continue
+        seen_usernames.add(row.username)
+        seen_emails.add(row.email)
+        candidates.append((i, row))
+
+    # One query for every username and email already taken
+    taken_usernames, taken_emails = set(), set()
+    if candidates:
+        async for user in db.users.find(
+            {"$or": [
+                {"username": {"$in": [row.username for _, row in candidates]}},
+                {"email": {"$in": [row.email for _, row in candidates]}},
+            ]},
+            {"username": 1, "email": 1}
+        ):
+            taken_usernames.add(user.get("username"))
+            taken_emails.add(normalize_email(user.get("email") or ""))
+
+    new_rows = []
+    for i, row in candidates:
+        if row.username in taken_usernames:
+            report[i].update(status="exists", detail="Username already exists")
+        elif row.email in taken_emails:
+            report[i].update(status="exists", detail="Email already registered")
+        else:
+            new_rows.append((i, row))
+
+    if dry_run:
+        for i, _ in new_rows:
+            report[i]["status"] = "valid"
+        return _summary(report)
+
+    # Hash across the process pool in chunks
+    loop = asyncio.get_running_loop()
+    chunks = [new_rows[k:k + HASH_CHUNK_SIZE] for k in range(0, len(new_rows), HASH_CHUNK_SIZE)]
+    hashed = await asyncio.gather(*[
+        loop.run_in_executor(pool, hash_passwords, [row.password for _, row in chunk])
+        for chunk in chunks
+    ])
+    hashes = [h for chunk in hashed for h in chunk]
+
+    now = datetime.now(timezone.utc)
+    docs = [
+        {
+            "username": row.username,
+            "email": row.email,
+            "full_name": row.full_name,
+            "password_hash": password_hash,
+            "role": row.role,
+            "is_active": True,
+            "created_at": now,
+            "stats": {
+                "total_pronunciation_attempts": 0,
+                "total_situation_attempts": 0,
+                "average_pronunciation_score": 0,
+                "total_study_time_minutes": 0
+            }
+        }
+        for (_, row), password_hash in zip(new_rows, hashes)
+    ]
+    for doc in docs:
+        doc["search_keys"] = search_keys(doc)
+
+    failed = {}
+    if docs:
+        try:
+            await db.users.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed[err["index"]] = err
+
+    for k, ((i, _), doc) in enumerate(zip(new_rows, docs)):
+        if k in failed:
+            # A concurrent create can still hit the unique indexes
+            duplicate = failed[k].get("code") == 11000
+            report[i].update(
+                status="exists" if duplicate else "error",
+                detail="Username or email already exists" if duplicate else failed[k].get("errmsg")
+            )
+        else:
+            report[i].update(status="created", id=str(doc["_id"]))
+
+    return _summary(report)
+
+
+def _summary(report: List[dict]) -> Dict:
+    counts = {}
+    for entry in report:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return {"total": len(report), "counts": counts, "rows": report}
@@ -0,0 +1,179 @@
+"""Keyset pagination, search and cached counts for the admin user list."""
+import base64
+import json
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+# Sort fields present on every user, each backed by a (field, _id) index
+SORT_FIELDS = ("created_at", "username", "email")
+
+# Fields a listing may ask for; id is always returned
+LIST_FIELDS = ("username", "email", "full_name", "role", "is_active", "created_at", "last_login", "stats")
+DEFAULT_FIELDS = ("username", "email", "full_name", "role", "is_active", "created_at", "last_login")
+
+# Search matches prefixes of these, lowercased into each user's search_keys
+SEARCH_FIELDS = ("username", "email", "full_name")
+
+# Pipeline stage recomputing search_keys from the stored fields
+SEARCH_KEYS_STAGE = {"$set": {"search_keys": [
+    {"$toLower": {"$ifNull": [f"${field}", ""]}} for field in SEARCH_FIELDS
+]}}
+
+COUNT_CACHE_SECONDS = 60
+
+_count_cache: Dict[str, Tuple[float, int]] = {}
+
+
+def normalize_email(email: str) -> str:
+    """Emails are stored and looked up lowercased (the email index is case-sensitive)."""
+    return email.strip().lower()
+
+
+async def lowercase_stored_emails(db) -> int:
+    """Lowercase emails stored before normalize_email was applied on every write.
+
+    An address whose lowercase form already belongs to another account is
+    left as is and reported; lookups by normalize_email find that account.
+    """
+    fixed = 0
+    async for user in db.users.find({"email": {"$regex": "[A-Z]"}}, {"email": 1}):
+        try:
+            await db.users.update_one(
+                {"_id": user["_id"]},
+                {"$set": {"email": normalize_email(user["email"])}, "$unset": {"search_keys": ""}}
+            )
+            fixed += 1
+        except DuplicateKeyError:
+            print(f"⚠ {user['email']} ({user['_id']}) differs only in case from another account's email")
+    return fixed
+
+
+def search_keys(user: dict) -> List[str]:
+    """search_keys of a user document about to be inserted."""
+    return [str(user.get(field) or "").lower() for field in SEARCH_FIELDS]
+
+
+async def refresh_search_keys(db, query: dict) -> int:
+    """Recompute search_keys of the matching users, after a username, email
+    or name change, or for users stored before search_keys existed."""
+    result = await db.users.update_many(query, [SEARCH_KEYS_STAGE])
+    return result.modified_count
+
+
+def build_filter(search: Optional[str] = None, role: Optional[str] = None, active: Optional[bool] = None) -> dict:
+    """Mongo filter for the list.
+
+    Search is a case-insensitive prefix match on username, email or full
+    name: the lowercased search text is matched, case-sensitively and
+    anchored, against the lowercased search_keys, so it is answered from
+    bounds on the search_keys index.
+    """
+    query: Dict[str, Any] = {}
+    if search:
+        query["search_keys"] = {"$regex": "^" + re.escape(search.strip().lower())}
+    if role:
+        query["role"] = role
+    if active is not None:
+        query["is_active"] = active
+    return query
+
+
+def encode_cursor(user: dict, sort: str) -> str:
+    value = user.get(sort)
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps({"v": value, "id": str(user["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    """(sort value, _id) of the last row of the previous page. Raises ValueError."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = data["v"]
+        if isinstance(value, dict) and "$date" in value:
+            value = datetime.fromisoformat(value["$date"])
+        return value, ObjectId(data["id"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_filter(sort: str, descending: bool, cursor: str) -> dict:
+    """Rows strictly after the cursor in (sort, _id) order.
+
+    Users without the sort field (or with null) sort before every value,
+    i.e. first ascending and last descending, and $gt/$lt never match them.
+    """
+    value, last_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    # {sort: None} matches both null and a missing field
+    same_value = {sort: value, "_id": {op: last_id}}
+
+    if value is None:
+        if descending:
+            return same_value
+        return {"$or": [{sort: {"$ne": None}}, same_value]}
+
+    branches = [{sort: {op: value}}, same_value]
+    if descending:
+        branches.append({sort: None})
+    return {"$or": branches}
+
+
+def projection(fields: Optional[str]) -> Dict[str, int]:
+    """Mongo projection from a comma-separated field list (unknown names are ignored)."""
+    wanted = [f.strip() for f in fields.split(",")] if fields else list(DEFAULT_FIELDS)
+    return {f: 1 for f in wanted if f in LIST_FIELDS} or {f: 1 for f in DEFAULT_FIELDS}
+
+
+async def list_users(
+    db,
+    query: dict,
+    sort: str = "created_at",
+    descending: bool = True,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of users and the cursor of the next page (None on the last page)."""
+    page_query = query
+    if cursor:
+        page_query = {"$and": [query, keyset_filter(sort, descending, cursor)]} if query else keyset_filter(sort, descending, cursor)
+
+    direction = -1 if descending else 1
+    proj = projection(fields)
+    # The sort key is needed for the next cursor even when not requested
+    users = await db.users.find(page_query, {**proj, sort: 1}).sort(
+        [(sort, direction), ("_id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = encode_cursor(users[limit - 1], sort) if len(users) > limit else None
+    users = users[:limit]
+
+    for user in users:
+        if sort not in proj:
+            user.pop(sort, None)
+        user["id"] = str(user.pop("_id"))
+    return users, next_cursor
+
+
+async def count_users(db, query: dict) -> int:
+    """Total for a filter, cached per worker; the unfiltered total is the collection estimate."""
+    key = json.dumps(query, sort_keys=True, default=str)
+    cached = _count_cache.get(key)
+    if cached and time.monotonic() - cached[0] < COUNT_CACHE_SECONDS:
+        return cached[1]
+
+    total = await db.users.count_documents(query) if query else await db.users.estimated_document_count()
+    _count_cache[key] = (time.monotonic(), total)
+    return total
+
+
+def invalidate_user_counts():
+    """Called after users are created, deleted or changed."""
+    _count_cache.clear()
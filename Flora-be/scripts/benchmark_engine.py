@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for PronunciationEngine.
+
+Times load_audio, transcribe, wav2vec_logits, align, phonemes and the full
+assess on deterministically generated clips of several lengths, records
+per stage the peak Python heap (tracemalloc) and how far the resident set
+grew while it ran (sampled from a thread, so torch/CTranslate2 native
+buffers count), and optionally compares against a stored baseline.
+
+Usage:
+    python scripts/benchmark_engine.py
+    python scripts/benchmark_engine.py --save-baseline bench_baseline.json
+    python scripts/benchmark_engine.py --compare bench_baseline.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - /proc is read instead
+    psutil = None
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.pronunciation_engine import PronunciationEngine
+
+SR = 16000
+
+# name -> (seconds, number of target words)
+CLIPS = {
+    "short_2s": (2.0, 4),
+    "instruction_5s": (5.0, 10),
+    "paragraph_15s": (15.0, 30),
+    "passage_45s": (45.0, 90),
+}
+
+WORDS = (
+    "please check the patient chart before you start the morning round "
+    "wash your hands and explain the procedure clearly to the family"
+).split()
+
+
+def synth_clip(seconds, seed):
+    """Deterministic speech-like signal: voiced bursts separated by pauses."""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * SR), dtype=np.float32)
+    pos = int(0.2 * SR)
+
+    while pos < len(audio):
+        length = int(rng.uniform(0.15, 0.45) * SR)
+        t = np.arange(length) / SR
+        f0 = rng.uniform(100, 220)
+        # Harmonics with a couple of formant-like bumps and a smooth envelope
+        burst = sum(
+            np.sin(2 * np.pi * f0 * h * t) / h * (1.5 if h in (3, 7) else 1.0)
+            for h in range(1, 10)
+        )
+        burst *= np.hanning(length) * 0.2
+        end = min(pos + length, len(audio))
+        audio[pos:end] += burst[: end - pos].astype(np.float32)
+        # Occasional longer pause, like a sentence boundary
+        pos = end + int(rng.uniform(0.05, 0.15 if rng.random() > 0.15 else 0.6) * SR)
+
+    audio += rng.normal(0, 0.002, len(audio)).astype(np.float32)
+    return audio
+
+
+def target_text(n_words):
+    return " ".join(WORDS[i % len(WORDS)] for i in range(n_words))
+
+
+def current_rss():
+    """Resident set size of this process in bytes."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class RssSampler:
+    """Peak RSS while a block runs, polled from a background thread.
+
+    ru_maxrss is the high-water mark of the whole process, so after the
+    first large stage every later stage would report the same figure;
+    the growth over the RSS at the start of the block is per stage.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def measure(fn, repeat):
+    """Median/min wall times over `repeat` runs, then one sampled run for RSS
+    and one traced run for the Python heap (tracemalloc's own overhead
+    would otherwise show up in the RSS)."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    with RssSampler() as rss:
+        fn()
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_s": round(statistics.median(times), 4),
+        "min_s": round(min(times), 4),
+        "peak_python_mb": round(peak / 1e6, 2),
+        "rss_mb": round(rss.start / 1e6, 1),
+        "peak_rss_growth_mb": round((rss.peak - rss.start) / 1e6, 1),
+    }
+
+
+def run_benchmarks(engine, repeat, clips):
+    results = {}
+    tmpdir = Path(tempfile.mkdtemp(prefix="flora-bench-"))
+
+    for seed, name in enumerate(clips):
+        seconds, n_words = CLIPS[name]
+        audio = synth_clip(seconds, seed)
+        text = target_text(n_words)
+        path = tmpdir / f"{name}.wav"
+        sf.write(path, audio, SR)
+
+        word_audio = audio[: SR]
+        phones = engine.phonemes("check")
+
+        stages = {
+            "load_audio": lambda: engine.load_audio(str(path)),
+            "transcribe": lambda: engine.transcribe(audio),
+            "wav2vec_logits": lambda: engine.wav2vec_logits(word_audio, SR),
+            "align": lambda: engine.align(phones, "CHEK", word_match_ratio=0.5),
+            "phonemes": lambda: [engine.phonemes(w) for w in text.split()],
+            "assess": lambda: asyncio.run(engine.assess(str(path), text)),
+        }
+
+        results[name] = {}
+        for stage, fn in stages.items():
+            print(f"  {name:16s} {stage:16s}", end="", flush=True)
+            results[name][stage] = measure(fn, repeat)
+            print(f"{results[name][stage]['median_s']:.4f}s")
+
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Print a side-by-side table; return the list of regressed stages."""
+    regressions = []
+    print(f"\n{'clip':16s} {'stage':16s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+
+    for clip, stages in current.items():
+        for stage, stats in stages.items():
+            old = baseline.get(clip, {}).get(stage)
+            if not old:
+                continue
+            change = (stats["median_s"] - old["median_s"]) / old["median_s"] if old["median_s"] else 0.0
+            flag = "  <-- REGRESSION" if change > threshold else ""
+            print(f"{clip:16s} {stage:16s} {old['median_s']:10.4f} {stats['median_s']:10.4f} {change:+7.1%}{flag}")
+            if flag:
+                regressions.append((clip, stage, change))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pronunciation engine")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--clips", nargs="*", choices=list(CLIPS), default=list(CLIPS))
+    parser.add_argument("--inference-workers", type=int, default=2)
+    parser.add_argument("--chunk-seconds", type=float, default=20.0)
+    parser.add_argument("--cpu-threads", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Relative slowdown of the median that counts as a regression")
+    args = parser.parse_args()
+
+    engine = PronunciationEngine(
+        inference_workers=args.inference_workers,
+        chunk_seconds=args.chunk_seconds,
+        cpu_threads=args.cpu_threads
+    )
+
+    print("\n⏱  Running engine benchmarks")
+    print("=" * 50)
+    results = run_benchmarks(engine, args.repeat, args.clips)
+    engine.close()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "engine_version": engine.version,
+        "config": {
+            "inference_workers": args.inference_workers,
+            "chunk_seconds": args.chunk_seconds,
+            "cpu_threads": args.cpu_threads,
+        },
+        "results": results,
+    }
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"\n✓ Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
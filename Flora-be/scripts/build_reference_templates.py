@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Precompute reference templates for instructions with reference audio.
+
+For every instruction with an audio_url, runs the reference recording
+through wav2vec2 once and stores its frame embeddings, CTC log-probs and
+word/phone spans as a template in audio storage. The instruction gets a
+reference_template field pointing at it; with REFERENCE_SCORING enabled,
+attempts are scored against the template by DTW.
+
+Templates are rebuilt only when the reference audio, the instruction
+text or the acoustic model changes (or with --force).
+
+Usage:
+    python scripts/build_reference_templates.py
+    python scripts/build_reference_templates.py --group <group_id> --force
+"""
+import argparse
+import asyncio
+import io
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.services.audio_io import decode_audio, sniff_audio_format
+from app.services.audio_storage import get_audio_storage
+from app.services.pronunciation_engine import PronunciationEngine
+from app.services.reference_templates import encode_template, read_reference_audio, template_key
+
+
+def decode_reference(data, engine):
+    fmt = sniff_audio_format(data[:64]) or "wav"
+    return decode_audio(io.BytesIO(data), fmt, engine.load_audio)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Build reference templates for instructions")
+    parser.add_argument("--group", help="Only instructions of this group")
+    parser.add_argument("--force", action="store_true", help="Rebuild templates that are up to date")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+    storage = get_audio_storage()
+
+    query = {"audio_url": {"$nin": ["", None]}}
+    if args.group:
+        query["group_id"] = ObjectId(args.group)
+
+    instructions = await db.instructions.find(
+        query, {"text": 1, "audio_url": 1, "reference_template": 1}
+    ).to_list(None)
+
+    print(f"\n🎯 Building reference templates for {len(instructions)} instructions")
+    engine = PronunciationEngine(inference_workers=1)
+
+    built = skipped = failed = 0
+    for inst in instructions:
+        inst_id = str(inst["_id"])
+        try:
+            data = read_reference_audio(inst["audio_url"], settings.AUDIO_STORAGE_PATH)
+            key = template_key(inst_id, data, engine.acoustic_model, inst["text"])
+
+            current = inst.get("reference_template") or {}
+            if not args.force and current.get("key") == key:
+                skipped += 1
+                continue
+
+            audio = decode_reference(data, engine)
+            template = engine.build_template(audio, 16000, inst["text"])
+            storage.put(key, encode_template(template))
+
+            await db.instructions.update_one(
+                {"_id": inst["_id"]},
+                {"$set": {"reference_template": {
+                    "key": key,
+                    "text": inst["text"],
+                    "acoustic_model": engine.acoustic_model,
+                    "frames": int(len(template["embeddings"])),
+                    "created_at": datetime.now(timezone.utc),
+                }}}
+            )
+            built += 1
+            print(f"   ✓ {inst_id}: {len(template['embeddings'])} frames, {len(template['phones'])} phones")
+        except Exception as e:
+            failed += 1
+            print(f"   ✗ {inst_id}: {e}")
+
+    engine.close()
+    client.close()
+
+    print(f"\n✅ Built {built}, up to date {skipped}, failed {failed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
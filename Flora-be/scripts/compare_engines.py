@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Compare two PronunciationEngine configurations on the same recordings.
+
+Replays a fixture set through engine A and engine B (each in its own
+process, so peak memory is measured separately) and prints per-fixture
+score deltas and latency side by side, plus a summary. Use it before
+switching models, quantisation or thresholds in production to see how
+far learner scores would move.
+
+Fixtures are either a directory of <name>.wav files with a <name>.txt
+holding the target text, or (by default) the synthetic benchmark clips.
+
+Usage:
+    python scripts/compare_engines.py --b compute_type=float32
+    python scripts/compare_engines.py --fixtures fixtures/ --a asr_model=tiny.en --b asr_model=base.en
+    python scripts/compare_engines.py --b compute_type=int8_float32 --max-delta 3 --json report.json
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.pronunciation_engine import PronunciationEngine
+
+
+def parse_config(pairs):
+    """["compute_type=float32", "chunk_seconds=10"] -> engine kwargs"""
+    config = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        for cast in (int, float):
+            try:
+                value = cast(value)
+                break
+            except ValueError:
+                pass
+        config[key] = value
+    return config
+
+
+def load_fixtures(directory):
+    """[(name, audio, target text)] from a directory, or the benchmark clips."""
+    import librosa
+
+    if directory:
+        fixtures = []
+        for wav in sorted(Path(directory).glob("*.wav")):
+            txt = wav.with_suffix(".txt")
+            if not txt.exists():
+                print(f"   ⚠ Skipping {wav.name}: no {txt.name}")
+                continue
+            audio, _ = librosa.load(wav, sr=16000, mono=True)
+            fixtures.append((wav.stem, audio, txt.read_text().strip()))
+        return fixtures
+
+    from benchmark_engine import CLIPS, synth_clip, target_text
+
+    return [
+        (name, synth_clip(seconds, seed), target_text(n_words))
+        for seed, (name, (seconds, n_words)) in enumerate(CLIPS.items())
+    ]
+
+
+def run_config(config, fixtures, repeat):
+    """Body of the child process for one configuration."""
+    engine = PronunciationEngine(**config)
+    results = {}
+
+    try:
+        # Warm-up so the first fixture does not pay for lazy initialisation
+        name, audio, text = fixtures[0]
+        asyncio.run(engine.assess(None, text, audio=audio))
+
+        for name, audio, text in fixtures:
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                assessment = asyncio.run(engine.assess(None, text, audio=audio))
+                times.append(time.perf_counter() - t0)
+
+            results[name] = {
+                "total_score": assessment["total_score"],
+                "word_scores": [w["score"] for w in assessment["words"]],
+                "median_s": round(statistics.median(times), 4),
+            }
+    finally:
+        engine.close()
+
+    return {
+        "version": engine.version,
+        "version_info": engine.version_info(),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+
+
+def run_isolated(config, fixtures, repeat):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(run_config, config, fixtures, repeat).result()
+
+
+def report(a, b):
+    """Print the side-by-side table; return summary numbers."""
+    print(f"\n{'fixture':20s} {'score A':>8s} {'score B':>8s} {'delta':>6s} {'words Δ':>8s} "
+          f"{'time A':>8s} {'time B':>8s}")
+
+    deltas = []
+    word_deltas = []
+    for name, ra in a["results"].items():
+        rb = b["results"][name]
+        delta = rb["total_score"] - ra["total_score"]
+        changed = [y - x for x, y in zip(ra["word_scores"], rb["word_scores"]) if y != x]
+        deltas.append(delta)
+        word_deltas.extend(abs(d) for d in changed)
+        print(f"{name:20s} {ra['total_score']:8d} {rb['total_score']:8d} {delta:+6d} "
+              f"{len(changed):4d}/{len(ra['word_scores']):<3d} {ra['median_s']:8.3f} {rb['median_s']:8.3f}")
+
+    time_a = sum(r["median_s"] for r in a["results"].values())
+    time_b = sum(r["median_s"] for r in b["results"].values())
+
+    summary = {
+        "mean_abs_delta": round(statistics.mean(abs(d) for d in deltas), 2) if deltas else 0,
+        "max_abs_delta": max((abs(d) for d in deltas), default=0),
+        "words_changed": len(word_deltas),
+        "max_word_delta": max(word_deltas, default=0),
+        "speedup": round(time_a / time_b, 2) if time_b else None,
+        "rss_mb": [a["max_rss_mb"], b["max_rss_mb"]],
+    }
+
+    print(f"\nA: {a['version']}   B: {b['version']}")
+    print(f"Mean |Δ score| {summary['mean_abs_delta']}, max {summary['max_abs_delta']}; "
+          f"{summary['words_changed']} word scores changed (max {summary['max_word_delta']})")
+    print(f"Total time A {time_a:.3f}s, B {time_b:.3f}s (B is {summary['speedup']}x A)")
+    print(f"Peak RSS A {a['max_rss_mb']} MB, B {b['max_rss_mb']} MB")
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scores and cost of two engine configurations")
+    parser.add_argument("--a", nargs="*", metavar="KEY=VALUE", help="Engine A kwargs (default: production)")
+    parser.add_argument("--b", nargs="*", metavar="KEY=VALUE", help="Engine B kwargs")
+    parser.add_argument("--fixtures", metavar="DIR", help="Directory of <name>.wav + <name>.txt pairs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", metavar="PATH", help="Also write the full report as JSON")
+    parser.add_argument("--max-delta", type=int, default=None,
+                        help="Exit non-zero if any total score moves by more than this")
+    args = parser.parse_args()
+
+    config_a = parse_config(args.a)
+    config_b = parse_config(args.b)
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print("❌ No fixtures found")
+        sys.exit(1)
+
+    print(f"\n⚖  Comparing engines on {len(fixtures)} fixtures")
+    print("=" * 50)
+    print(f"   A: {config_a or 'defaults'}")
+    a = run_isolated(config_a, fixtures, args.repeat)
+    print(f"   B: {config_b or 'defaults'}")
+    b = run_isolated(config_b, fixtures, args.repeat)
+
+    summary = report(a, b)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "a": {"config": config_a, **a},
+            "b": {"config": config_b, **b},
+            "summary": summary,
+        }, indent=2))
+        print(f"\n✓ Report saved to {args.json}")
+
+    if args.max_delta is not None and summary["max_abs_delta"] > args.max_delta:
+        print(f"\n❌ Scores moved by up to {summary['max_abs_delta']} points (limit {args.max_delta})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
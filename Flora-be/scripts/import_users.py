@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Bulk-create users from a CSV or JSON file.
+
+Same rules and report as POST /admin/users/import: one uniqueness query,
+passwords hashed across a process pool, unordered insert. Columns:
+username, email, full_name, password, role (optional).
+
+Usage: python import_users.py users.csv [--dry-run] [--processes N] [--report report.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.services.user_import import parse_user_file, import_users
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk-create users")
+    parser.add_argument("file")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, write nothing")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--report", metavar="PATH", help="Write the per-row report as JSON")
+    args = parser.parse_args()
+
+    path = Path(args.file)
+    rows = parse_user_file(path.read_bytes(), path.name)
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    print(f"\n👥 Importing {len(rows)} users from {path.name}{' (dry run)' if args.dry_run else ''}")
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        result = await import_users(db, rows, pool, dry_run=args.dry_run)
+
+    client.close()
+
+    for entry in result["rows"]:
+        if entry["status"] not in ("created", "valid"):
+            print(f"   ✗ row {entry['row']} ({entry.get('username')}): {entry['status']} - {entry.get('detail')}")
+    for status, count in sorted(result["counts"].items()):
+        print(f"   {status}: {count}")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(result, indent=2))
+        print(f"\n✓ Report saved to {args.report}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Manage the MongoDB indexes declared in app/db/indexes.py.
+
+    ensure   create missing declared indexes (the app also does this on startup)
+    report   list declared indexes that are missing, undeclared ones, and
+             indexes with no recorded use since the server last restarted
+    explain  explain the app's main queries and fail if any is a collection scan
+
+Usage: python manage_indexes.py {ensure|report|explain}
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.db.indexes import ensure_indexes, explain_checks, index_report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Manage MongoDB indexes")
+    parser.add_argument("command", choices=["ensure", "report", "explain"])
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+    failed = False
+
+    if args.command == "ensure":
+        print("\n🔄 Ensuring indexes...")
+        for name, result in (await ensure_indexes(db)).items():
+            print(f"   {'✓' if result == 'ok' else '✗'} {name}: {result}")
+            failed |= result != "ok"
+
+    elif args.command == "report":
+        print("\n📋 Index report")
+        for name, entry in (await index_report(db)).items():
+            print(f"\n   {name}")
+            for key in ("missing", "undeclared", "unused"):
+                for index in entry[key]:
+                    print(f"      {key:10s} {index}")
+            if not any(entry.values()):
+                print("      ✓ as declared")
+            failed |= bool(entry["missing"])
+
+    else:
+        print("\n🔍 Explaining main queries")
+        for check in await explain_checks(db):
+            mark = "✓" if check["indexed"] else "✗ COLLSCAN"
+            print(f"   {mark} {check['name']} ({check['collection']})")
+            failed |= not check["indexed"]
+
+    client.close()
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Apply the attempt audio retention policy.
+Deletes stored recordings not used for AUDIO_RETENTION_DAYS and clears
+the audio_file_path of the attempts that referenced them.
+Usage: python prune_attempt_audio.py [--days N]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.services.audio_storage import get_audio_storage, prune_attempt_audio
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Prune stored attempt audio")
+    parser.add_argument("--days", type=int, default=settings.AUDIO_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    if args.days <= 0:
+        print("Retention disabled (AUDIO_RETENTION_DAYS <= 0), nothing to do")
+        return
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    print(f"\n🧹 Pruning attempt audio older than {args.days} days...")
+    removed = await prune_attempt_audio(db, get_audio_storage(), args.days)
+    print(f"   ✓ Removed {removed} recordings")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Rebuild user_dashboard_summary documents from the attempt collections.
+
+The submit endpoints keep each user's summary up to date, and a user
+without one gets it built on their next dashboard visit; run this to
+backfill everyone at once, or after attempts were changed outside the API.
+Attempts submitted while a summary is rebuilt make it start over, so this
+is safe to run on a live deployment.
+
+Usage: python rebuild_dashboard_summaries.py [--user USER_ID] [--concurrency N]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.db.indexes import ensure_indexes
+from app.services.dashboard_stats import rebuild_summary
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild learner dashboard summaries")
+    parser.add_argument("--user", help="Only rebuild this user's summary")
+    parser.add_argument("--concurrency", type=int, default=8, help="Users rebuilt at the same time")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    await ensure_indexes(db, ["user_dashboard_summary"])
+
+    if args.user:
+        user_ids = [ObjectId(args.user)]
+    else:
+        user_ids = [u["_id"] async for u in db.users.find({}, {"_id": 1})]
+
+    print(f"\n🔄 Rebuilding dashboard summaries for {len(user_ids)} users...")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    failed = 0
+
+    async def rebuild(user_id):
+        nonlocal failed
+        async with semaphore:
+            try:
+                await rebuild_summary(db, user_id)
+            except Exception as e:
+                failed += 1
+                print(f"   ✗ {user_id}: {e}")
+
+    await asyncio.gather(*(rebuild(user_id) for user_id in user_ids))
+    print(f"   ✓ {len(user_ids) - failed} summaries written, {failed} failed")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Rebuild user_instruction_stats from pronunciation_attempts.
+
+/pronunciation/assess keeps these documents up to date as attempts come
+in; run this once to backfill existing attempts, or after attempts were
+changed outside the API. Best run while no assessments are being
+submitted, as concurrent increments may be overwritten.
+
+Usage: python rebuild_instruction_stats.py [--user USER_ID]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.db.indexes import ensure_indexes
+from app.services.attempt_stats import rebuild_instruction_stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild per-user, per-instruction attempt stats")
+    parser.add_argument("--user", help="Only rebuild this user's stats")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    await ensure_indexes(db, ["user_instruction_stats"])
+
+    match = {"user_id": ObjectId(args.user)} if args.user else None
+
+    print("\n🔄 Rebuilding user_instruction_stats...")
+    written = await rebuild_instruction_stats(db, match)
+    print(f"   ✓ {written} stats documents written")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,6 +8,7 @@ import sys
 import os
 import json
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Add parent directory to Python path
@@ -15,7 +16,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
-from app.core.security import hash_password
+from app.core.security import hash_passwords
+from app.services.user_listing import normalize_email, search_keys
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -69,11 +71,17 @@ async def reload_database():
     # 1. Create Users
     print("\n📝 Creating users...")
     users = []
-    for user_data in data.get('users', []):
+    users_data = data.get('users', [])
+    # bcrypt is slow by design; hash across all cores
+    passwords = [u["password"] for u in users_data]
+    with ProcessPoolExecutor() as pool:
+        chunks = pool.map(hash_passwords, [passwords[i:i + 25] for i in range(0, len(passwords), 25)])
+        password_hashes = [h for chunk in chunks for h in chunk]
+    for user_data, password_hash in zip(users_data, password_hashes):
         users.append({
             "username": user_data["username"],
-            "email": user_data["email"],
-            "password_hash": hash_password(user_data["password"]),
+            "email": normalize_email(user_data["email"]),
+            "password_hash": password_hash,
             "full_name": user_data["full_name"],
             "role": user_data["role"],
             "is_active": True,
@@ -87,6 +95,8 @@ async def reload_database():
         })
     
     if users:
+        for user in users:
+            user["search_keys"] = search_keys(user)
         await db.users.insert_many(users)
         print(f"   ✓ Created {len(users)} users")
     
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Re-score stored pronunciation attempts with the current engine.
+
+Streams attempts that still have their recording in audio storage, runs
+them through PronunciationEngine in a pool of worker processes and
+writes the new assessment back together with the engine version.
+Attempts already scored by the current engine version are skipped, and the
+last written _id is checkpointed so an interrupted run picks up where it
+stopped. Attempts scored against a reference template are re-scored
+against it again.
+
+Afterwards the derived statistics of what was re-scored are recomputed:
+the score fields of the affected users' per-instruction stats and their
+dashboard summaries (both retried when an attempt comes in meanwhile, so
+it is safe on a live deployment), and the daily rollups of the affected
+days.
+
+Usage:
+    python scripts/rescore_attempts.py
+    python scripts/rescore_attempts.py --processes 4 --batch-size 32
+    python scripts/rescore_attempts.py --checkpoint rescore.json --restart
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.services.admin_stats import rollup_days
+from app.services.attempt_stats import refresh_instruction_scores
+from app.services.audio_storage import get_audio_storage, load_attempt_audio
+from app.services.dashboard_stats import rebuild_summary
+from app.services.pronunciation_engine import PronunciationEngine
+from app.services.reference_templates import load_reference_template, usable_template_key
+
+# -------------------------
+# Worker process
+# -------------------------
+
+_engine = None
+_loop = None
+
+
+def init_worker(cpu_threads):
+    """Load the models once per process."""
+    global _engine, _loop
+    _engine = PronunciationEngine(inference_workers=1, cpu_threads=cpu_threads)
+    _engine.set_torch_threads()
+    _loop = asyncio.new_event_loop()
+
+
+def worker_version():
+    return _engine.version
+
+
+def rescore_batch(batch):
+    """[(attempt_id, audio_key, target_text, asr_only, reference_template)]
+    -> [(attempt_id, assessment or None, error)]
+
+    reference_template is the instruction's reference_template field for
+    attempts that were scored against it, else None.
+    """
+    storage = get_audio_storage()
+    results = []
+
+    for attempt_id, key, text, asr_only, reference in batch:
+        try:
+            audio = load_attempt_audio(storage, key)
+            template = None
+            if reference:
+                template_key = usable_template_key({"reference_template": reference}, _engine.acoustic_model, text)
+                if template_key is None:
+                    raise ValueError("reference template is out of date, rebuild it first")
+                template = load_reference_template(template_key)
+            assessment = _loop.run_until_complete(
+                _engine.assess(None, text, audio=audio, asr_only=asr_only, template=template)
+            )
+            results.append((attempt_id, assessment, None))
+        except Exception as e:
+            results.append((attempt_id, None, str(e)))
+
+    return results
+
+
+# -------------------------
+# Checkpoint
+# -------------------------
+
+def new_state():
+    # users/days: what the derived statistics must be recomputed for
+    return {"last_id": None, "rescored": 0, "failed": 0, "users": [], "days": []}
+
+
+def read_checkpoint(path):
+    if not path.exists():
+        return new_state()
+    return {**new_state(), **json.loads(path.read_text())}
+
+
+def write_checkpoint(path, state):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, path)
+
+
+# -------------------------
+# Main
+# -------------------------
+
+async def iter_batches(db, query, batch_size, instructions, keep_mode):
+    """Yields (batch for rescore_batch, [(user_id, created_at)] of the same attempts)."""
+    cursor = db.pronunciation_attempts.find(
+        query,
+        {
+            "audio_file_path": 1, "instruction_id": 1, "custom_text": 1,
+            "assessment.scoring_mode": 1, "user_id": 1, "created_at": 1
+        }
+    ).sort("_id", 1).batch_size(batch_size * 4)
+
+    batch, meta = [], []
+    async for doc in cursor:
+        instruction = instructions.get(doc.get("instruction_id")) or {}
+        text = instruction.get("text") if doc.get("instruction_id") else doc.get("custom_text")
+        if not text:
+            continue
+
+        mode = (doc.get("assessment") or {}).get("scoring_mode")
+        asr_only = keep_mode and mode == "asr_only"
+        reference = instruction.get("reference_template") if mode == "reference_dtw" else None
+        batch.append((str(doc["_id"]), doc["audio_file_path"], text, asr_only, reference))
+        meta.append((doc.get("user_id"), doc.get("created_at")))
+        if len(batch) >= batch_size:
+            yield batch, meta
+            batch, meta = [], []
+
+    if batch:
+        yield batch, meta
+
+
+async def refresh_derived_stats(db, state):
+    """Recompute the statistics derived from the scores just replaced,
+    only for the users and days that had attempts re-scored."""
+    user_ids = [ObjectId(u) for u in state["users"]]
+
+    print(f"\n🔄 Refreshing per-instruction scores of {len(user_ids)} users...")
+    unsettled = []
+    for user_id in user_ids:
+        if await refresh_instruction_scores(db, user_id):
+            unsettled.append(user_id)
+    print(f"   ✓ {len(user_ids) - len(unsettled)} users")
+    for user_id in unsettled:
+        # Kept changing under new attempts; the counts are intact, only scores are stale
+        print(f"   ✗ {user_id}: re-run with rebuild_instruction_stats.py --user {user_id} in a quiet period")
+
+    print("🔄 Rebuilding their dashboard summaries...")
+    for user_id in user_ids:
+        await rebuild_summary(db, user_id)
+    print(f"   ✓ {len(user_ids)} summaries")
+
+    # Today has no rollup yet; the dashboard computes it live
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    days = [datetime.strptime(d, "%Y-%m-%d") for d in state["days"] if d < today]
+    print(f"🔄 Rolling up {len(days)} affected days...")
+    written = await rollup_days(db, days)
+    print(f"   ✓ {written} daily rollups")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Re-score stored pronunciation attempts")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--cpu-threads", type=int, default=2,
+                        help="Inference threads per process (processes x threads ~ cores)")
+    parser.add_argument("--batch-size", type=int, default=16,
+                        help="Attempts per task sent to a worker and per bulk write")
+    parser.add_argument("--checkpoint", default="rescore_checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many attempts")
+    parser.add_argument("--keep-mode", action="store_true",
+                        help="Re-score attempts that were shed to ASR-only in the same mode")
+    args = parser.parse_args()
+
+    checkpoint = Path(args.checkpoint)
+    state = new_state() if args.restart else read_checkpoint(checkpoint)
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    instructions = {
+        doc["_id"]: doc
+        async for doc in db.instructions.find({}, {"text": 1, "reference_template": 1})
+    }
+
+    loop = asyncio.get_running_loop()
+    executor = ProcessPoolExecutor(
+        max_workers=args.processes,
+        initializer=init_worker,
+        initargs=(args.cpu_threads,)
+    )
+
+    # Fingerprint of the engine the workers load (model names, lexicon, thresholds)
+    version = await loop.run_in_executor(executor, worker_version)
+
+    query = {
+        "audio_file_path": {"$nin": ["", None]},
+        "engine_version": {"$ne": version},
+    }
+    if state["last_id"]:
+        query["_id"] = {"$gt": ObjectId(state["last_id"])}
+
+    total = await db.pronunciation_attempts.count_documents(query)
+    if args.limit:
+        total = min(total, args.limit)
+
+    print(f"\n🔄 Re-scoring {total} attempts with engine {version}")
+    print(f"   {args.processes} processes x {args.cpu_threads} threads, batches of {args.batch_size}")
+    if state["last_id"]:
+        print(f"   Resuming after {state['last_id']}")
+
+    started = time.time()
+    done = 0
+    # Batches finish out of order; they are written back in submission
+    # order so the checkpoint never skips past an unwritten attempt
+    pending = deque()
+
+    async def drain_one():
+        nonlocal done
+        batch, meta, future = pending.popleft()
+        results = await future
+        now = datetime.now(timezone.utc)
+
+        ops = [
+            UpdateOne(
+                {"_id": ObjectId(attempt_id)},
+                {"$set": {"assessment": assessment, "engine_version": version, "rescored_at": now}}
+            )
+            for attempt_id, assessment, error in results
+            if assessment is not None
+        ]
+        if ops:
+            await db.pronunciation_attempts.bulk_write(ops, ordered=False)
+
+        for attempt_id, _, error in results:
+            if error:
+                print(f"   ✗ {attempt_id}: {error}")
+
+        users, days = set(state["users"]), set(state["days"])
+        for (_, assessment, _), (user_id, created_at) in zip(results, meta):
+            if assessment is not None:
+                if user_id:
+                    users.add(str(user_id))
+                if isinstance(created_at, datetime):
+                    days.add(created_at.strftime("%Y-%m-%d"))
+        state["users"], state["days"] = sorted(users), sorted(days)
+
+        failed = sum(1 for _, assessment, _ in results if assessment is None)
+        state["rescored"] += len(results) - failed
+        state["failed"] += failed
+        state["last_id"] = batch[-1][0]
+        write_checkpoint(checkpoint, state)
+
+        done += len(results)
+        rate = done / max(time.time() - started, 1e-6)
+        print(f"   ✓ {done}/{total}  ({rate:.1f} attempts/s)")
+
+    try:
+        submitted = 0
+        async for batch, meta in iter_batches(db, query, args.batch_size, instructions, args.keep_mode):
+            if args.limit:
+                batch = batch[: args.limit - submitted]
+                meta = meta[: len(batch)]
+            pending.append((batch, meta, loop.run_in_executor(executor, rescore_batch, batch)))
+            submitted += len(batch)
+
+            # Keep every process busy without reading the whole collection ahead
+            while len(pending) >= args.processes * 2:
+                await drain_one()
+
+            if args.limit and submitted >= args.limit:
+                break
+
+        while pending:
+            await drain_one()
+        if state["users"]:
+            await refresh_derived_stats(db, state)
+    finally:
+        executor.shutdown(cancel_futures=True)
+        client.close()
+
+    print(f"\n✅ Done: {state['rescored']} re-scored, {state['failed']} failed in total")
+    print(f"   Checkpoint: {checkpoint}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Write the daily_stats rollups read by the admin dashboard.
+
+Run daily (e.g. from cron shortly after midnight UTC) to roll up the days
+that closed since the last run; --backfill rolls up every day since the
+first attempt, which the all-time dashboard figures need once after
+deployment (the dashboard flags them as partial until then). --force
+recomputes days that already have a rollup.
+
+Usage: python rollup_daily_stats.py [--days N] [--backfill] [--force]
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.services.admin_stats import first_activity_day, missing_days, rollup_days
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Roll up daily admin statistics")
+    parser.add_argument("--days", type=int, default=7, help="Closed days to check, counting back from yesterday")
+    parser.add_argument("--backfill", action="store_true", help="Check every day since the first attempt")
+    parser.add_argument("--force", action="store_true", help="Recompute days that already have a rollup")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    today = datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=args.days)
+    if args.backfill:
+        start = await first_activity_day(db) or today
+
+    if args.force:
+        days = [start + timedelta(days=i) for i in range((today - start).days)]
+    else:
+        days = await missing_days(db, start, today)
+
+    print(f"\n🔄 Rolling up {len(days)} days from {start.date()} to {(today - timedelta(days=1)).date()}...")
+    written = await rollup_days(db, days)
+    print(f"   ✓ {written} rollups written")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Pre-forking server launcher.
+
+Loads the wav2vec2 weights and the CMU lexicon once in a master process,
+then forks uvicorn workers that share those pages copy-on-write instead
+of each loading their own copy.
+
+The number of workers is SERVER_WORKERS, which is also what the CPU
+thread budget (INFERENCE_CORES) is divided by.
+
+Usage: python scripts/serve.py [--host HOST] [--port PORT]
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import uvicorn
+
+from app.core.config import settings
+from app.services import pronunciation_engine
+from app.services.pronunciation_engine import PronunciationEngine
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run Flora with a preloaded pronunciation engine")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    return parser.parse_args()
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock, index):
+    """Body of a forked worker process. Never returns."""
+    # Default signal handling; uvicorn installs its own for graceful shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # Picked up by the startup hook to choose this worker's CPU slice; the
+    # hook also calls engine.after_fork() with the worker's thread budget
+    os.environ["FLORA_WORKER_INDEX"] = str(index)
+
+    config = uvicorn.Config("app.main:app", log_level="info")
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    os._exit(0)
+
+
+def main():
+    args = parse_args()
+
+    workers = settings.SERVER_WORKERS
+
+    print(f"Preloading pronunciation engine for {workers} workers...")
+    engine = PronunciationEngine(
+        inference_workers=settings.ENGINE_INFERENCE_WORKERS,
+        chunk_seconds=settings.ENGINE_CHUNK_SECONDS,
+        preload=True
+    )
+    pronunciation_engine.preloaded_engine = engine
+
+    # Move everything loaded so far out of the GC's tracked generations so
+    # collections in the workers do not write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    print(f"Listening on http://{args.host}:{args.port}")
+
+    children = {}  # pid -> (worker index, start time)
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(sock, index)
+        children[pid] = (index, time.time())
+        print(f"Started worker {index} (pid {pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, exit_status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        child = children.pop(pid, None)
+        if stopping or child is None:
+            continue
+
+        index, started = child
+        print(f"Worker {index} (pid {pid}) exited with status {exit_status}, restarting")
+        # Avoid a tight crash loop if workers die right after starting
+        if time.time() - started < 1:
+            time.sleep(1)
+        spawn(index)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
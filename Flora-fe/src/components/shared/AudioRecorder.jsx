@@ -40,7 +40,10 @@ export default function AudioRecorder({
       };
 
       mediaRecorderRef.current.onstop = () => {
-        const blob = new Blob(chunksRef.current, { type: "audio/wav" });
+        // Keep the recorder's real container type (usually WebM/Opus)
+        const blob = new Blob(chunksRef.current, {
+          type: mediaRecorderRef.current.mimeType || "audio/webm",
+        });
         const url = URL.createObjectURL(blob);
         setAudioURL(url);
         setAudioBlob(blob);
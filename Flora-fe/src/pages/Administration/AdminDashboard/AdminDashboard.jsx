@@ -405,7 +405,8 @@ const AdminDashboard = () => {
     group_performance,
     top_users,
     pronunciation_metrics,
-    situation_metrics
+    situation_metrics,
+    history
   } = dashboardData || {};
 
   return (
@@ -420,12 +421,25 @@ const AdminDashboard = () => {
             Real-time platform performance and user engagement metrics.
           </Typography>
         </motion.div>
-        <Chip
-          icon={<TimelineIcon />}
-          label={`Last Updated: ${new Date().toLocaleTimeString()}`}
-          variant="outlined"
-          sx={{ borderRadius: 2, px: 1 }}
-        />
+        <Box sx={{ display: "flex", gap: 1, flexWrap: "wrap" }}>
+          {history && !history.complete && (
+            <Tooltip title={`All-time figures only cover activity since ${history.rollups_since}; first activity was ${history.first_activity}. Run scripts/rollup_daily_stats.py --backfill.`}>
+              <Chip
+                icon={<ErrorIcon />}
+                label="All-time figures partial"
+                color="warning"
+                variant="outlined"
+                sx={{ borderRadius: 2, px: 1 }}
+              />
+            </Tooltip>
+          )}
+          <Chip
+            icon={<TimelineIcon />}
+            label={`Last Updated: ${new Date().toLocaleTimeString()}`}
+            variant="outlined"
+            sx={{ borderRadius: 2, px: 1 }}
+          />
+        </Box>
       </Box>
 
       <Grid container spacing={3} sx={{ mb: 6 }}>
@@ -26,7 +26,6 @@ import {
   MenuItem,
   FormControl,
   InputLabel,
-  Pagination,
   TableSortLabel,
   Tooltip,
 } from "@mui/material";
@@ -40,6 +39,8 @@ import {
   Close,
   Search,
   Add,
+  ChevronLeft,
+  ChevronRight,
 } from "@mui/icons-material";
 import userService from "~/services/userService";
 import { useNotification } from "~/contexts/NotificationContext";
@@ -47,6 +48,7 @@ import { formatLocalDate, getRelativeTime } from "~/utils/timeUtils";
 
 const STATS_DRAWER_WIDTH = 600;
 const ROWS_PER_PAGE = 10;
+const SEARCH_DEBOUNCE_MS = 300;
 
 // Helper function to get initials from name
 const getInitials = (name) => {
@@ -77,11 +79,16 @@ export default function UserManagement() {
   const { showNotification } = useNotification();
   const [loading, setLoading] = useState(false);
   const [users, setUsers] = useState([]);
-  const [filteredUsers, setFilteredUsers] = useState([]);
+  const [totalUsers, setTotalUsers] = useState(0);
+  // Keyset pagination: cursors[i] fetches page i + 1 (page 1 has none)
+  const [cursors, setCursors] = useState([null]);
   const [page, setPage] = useState(1);
   const [searchQuery, setSearchQuery] = useState("");
+  const [debouncedSearch, setDebouncedSearch] = useState("");
   const [roleFilter, setRoleFilter] = useState("");
   const [statusFilter, setStatusFilter] = useState("");
+  const [sortBy, setSortBy] = useState("created_at");
+  const [sortOrder, setSortOrder] = useState("desc");
 
   const [editDialogOpen, setEditDialogOpen] = useState(false);
   const [deleteDialogOpen, setDeleteDialogOpen] = useState(false);
@@ -105,56 +112,64 @@ export default function UserManagement() {
     role: "user",
   });
 
-  const fetchUsers = useCallback(async () => {
-    try {
-      setLoading(true);
-      const data = await userService.getAllUsers();
-      setUsers(data);
-      setFilteredUsers(data);
-    } catch (error) {
-      showNotification(
-        error.response?.data?.detail || "Failed to fetch users",
-        "error"
-      );
-    } finally {
-      setLoading(false);
-    }
-  }, [showNotification]);
-
+  // Wait for typing to pause before searching on the server
   useEffect(() => {
-    fetchUsers();
-  }, [fetchUsers]);
+    const timer = setTimeout(
+      () => setDebouncedSearch(searchQuery.trim()),
+      SEARCH_DEBOUNCE_MS
+    );
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+
+  const fetchUsers = useCallback(
+    async (pageNumber, cursor) => {
+      try {
+        setLoading(true);
+        const response = await userService.getUsers({
+          limit: ROWS_PER_PAGE,
+          cursor: cursor || undefined,
+          search: debouncedSearch || undefined,
+          role: roleFilter || undefined,
+          status: statusFilter || undefined,
+          sort: sortBy,
+          order: sortOrder,
+        });
+        const { users: pageUsers, next_cursor, total } = response.data;
+        setUsers(pageUsers);
+        setTotalUsers(total);
+        setPage(pageNumber);
+        setCursors((prev) => {
+          const next = prev.slice(0, pageNumber);
+          if (next_cursor) next.push(next_cursor);
+          return next;
+        });
+      } catch (error) {
+        showNotification(
+          error.response?.data?.detail || "Failed to fetch users",
+          "error"
+        );
+      } finally {
+        setLoading(false);
+      }
+    },
+    [showNotification, debouncedSearch, roleFilter, statusFilter, sortBy, sortOrder]
+  );
 
-  // Apply filters
+  // Back to the first page whenever the filters or sort change
   useEffect(() => {
-    let result = [...users];
-
-    // Search filter
-    if (searchQuery) {
-      const query = searchQuery.toLowerCase();
-      result = result.filter(
-        (user) =>
-          user.full_name?.toLowerCase().includes(query) ||
-          user.email?.toLowerCase().includes(query) ||
-          user.username?.toLowerCase().includes(query)
-      );
-    }
+    fetchUsers(1, null);
+  }, [fetchUsers]);
 
-    // Role filter
-    if (roleFilter) {
-      result = result.filter((user) => user.role === roleFilter);
-    }
+  const refreshPage = () => fetchUsers(page, cursors[page - 1]);
 
-    // Status filter
-    if (statusFilter) {
-      result = result.filter((user) =>
-        statusFilter === "active" ? user.is_active : !user.is_active
-      );
+  const handleSort = (field) => {
+    if (sortBy === field) {
+      setSortOrder(sortOrder === "asc" ? "desc" : "asc");
+    } else {
+      setSortBy(field);
+      setSortOrder(field === "created_at" ? "desc" : "asc");
     }
-
-    setFilteredUsers(result);
-    setPage(1); // Reset to first page when filters change
-  }, [searchQuery, roleFilter, statusFilter, users]);
+  };
 
   const handleEditOpen = (user) => {
     setSelectedUser(user);
@@ -213,7 +228,7 @@ export default function UserManagement() {
       await userService.updateUser(selectedUser.id, updateData);
       showNotification("User updated successfully", "success");
       handleEditClose();
-      fetchUsers();
+      refreshPage();
     } catch (error) {
       showNotification(
         error.response?.data?.detail || "Failed to update user",
@@ -237,7 +252,7 @@ export default function UserManagement() {
       await userService.deleteUser(selectedUser.id);
       showNotification("User deleted successfully", "success");
       handleDeleteClose();
-      fetchUsers();
+      refreshPage();
     } catch (error) {
       showNotification(
         error.response?.data?.detail || "Failed to delete user",
@@ -279,7 +294,7 @@ export default function UserManagement() {
       });
       showNotification("User created successfully", "success");
       handleCreateClose();
-      fetchUsers();
+      refreshPage();
     } catch (error) {
       showNotification(
         error.response?.data?.detail || "Failed to create user",
@@ -296,11 +311,8 @@ export default function UserManagement() {
   };
 
   // Pagination
-  const paginatedUsers = filteredUsers.slice(
-    (page - 1) * ROWS_PER_PAGE,
-    page * ROWS_PER_PAGE
-  );
-  const pageCount = Math.ceil(filteredUsers.length / ROWS_PER_PAGE);
+  const pageCount = Math.max(1, Math.ceil(totalUsers / ROWS_PER_PAGE));
+  const hasNextPage = cursors.length > page;
 
   const getStatusChip = (isActive) => {
     if (isActive) {
@@ -440,11 +452,35 @@ export default function UserManagement() {
               <TableHead>
                 <TableRow sx={{ bgcolor: "#F8FAFC" }}>
                   <TableCell sx={{ fontWeight: 700 }}>Full Name</TableCell>
-                  <TableCell sx={{ fontWeight: 700 }}>Email</TableCell>
-                  <TableCell sx={{ fontWeight: 700 }}>Username</TableCell>
+                  <TableCell sx={{ fontWeight: 700 }}>
+                    <TableSortLabel
+                      active={sortBy === "email"}
+                      direction={sortBy === "email" ? sortOrder : "asc"}
+                      onClick={() => handleSort("email")}
+                    >
+                      Email
+                    </TableSortLabel>
+                  </TableCell>
+                  <TableCell sx={{ fontWeight: 700 }}>
+                    <TableSortLabel
+                      active={sortBy === "username"}
+                      direction={sortBy === "username" ? sortOrder : "asc"}
+                      onClick={() => handleSort("username")}
+                    >
+                      Username
+                    </TableSortLabel>
+                  </TableCell>
                   <TableCell sx={{ fontWeight: 700 }}>Status</TableCell>
                   <TableCell sx={{ fontWeight: 700 }}>Role</TableCell>
-                  <TableCell sx={{ fontWeight: 700 }}>Joined Date</TableCell>
+                  <TableCell sx={{ fontWeight: 700 }}>
+                    <TableSortLabel
+                      active={sortBy === "created_at"}
+                      direction={sortBy === "created_at" ? sortOrder : "desc"}
+                      onClick={() => handleSort("created_at")}
+                    >
+                      Joined Date
+                    </TableSortLabel>
+                  </TableCell>
                   <TableCell sx={{ fontWeight: 700 }}>Last Active</TableCell>
                   <TableCell align="center" sx={{ fontWeight: 700 }}>
                     Actions
@@ -452,7 +488,7 @@ export default function UserManagement() {
                 </TableRow>
               </TableHead>
               <TableBody>
-                {paginatedUsers.map((user) => (
+                {users.map((user) => (
                   <TableRow
                     key={user.id}
                     sx={{
@@ -534,15 +570,26 @@ export default function UserManagement() {
               display: "flex",
               justifyContent: "center",
               alignItems: "center",
+              gap: 2,
             }}
           >
-            <Pagination
-              count={pageCount}
-              page={page}
-              onChange={(e, value) => setPage(value)}
-              color="primary"
-              shape="rounded"
-            />
+            <IconButton
+              size="small"
+              disabled={page <= 1}
+              onClick={() => fetchUsers(page - 1, cursors[page - 2])}
+            >
+              <ChevronLeft />
+            </IconButton>
+            <Typography variant="body2" color="text.secondary">
+              Page {page} of {pageCount} · {totalUsers} users
+            </Typography>
+            <IconButton
+              size="small"
+              disabled={!hasNextPage}
+              onClick={() => fetchUsers(page + 1, cursors[page])}
+            >
+              <ChevronRight />
+            </IconButton>
           </Box>
         </>
       )}
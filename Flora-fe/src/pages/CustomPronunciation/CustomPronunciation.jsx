@@ -42,6 +42,7 @@ import {
   hoverScale,
   tapScale
 } from "~/utils/animations";
+import { extensionForMimeType } from "~/utils/audioEncoding";
 
 export default function CustomPronunciation() {
   const { showNotification } = useNotification();
@@ -111,9 +112,11 @@ export default function CustomPronunciation() {
 
     try {
       // Convert blob to File object with proper filename and MIME type
-      const audioFile = new File([recordedAudio], "recording.wav", {
-        type: "audio/wav",
-      });
+      const audioFile = new File(
+        [recordedAudio],
+        `recording.${extensionForMimeType(recordedAudio.type)}`,
+        { type: recordedAudio.type }
+      );
 
       const sessionId = `custom_${Date.now()}`;
 
@@ -42,6 +42,7 @@ import { useSidebar } from "~/contexts/SidebarContext";
 import Appbar from "~/components/Appbar/Appbar";
 import Sidebar from "~/components/Sidebar/Sidebar";
 import Footer from "~/components/Footer/Footer";
+import { extensionForMimeType } from "~/utils/audioEncoding";
 
 const PANEL_WIDTH_EXPANDED = 360;
 const PANEL_WIDTH_COLLAPSED = 80;
@@ -126,9 +127,11 @@ export default function PronunciationPractice() {
 
     setSubmitting(true);
     try {
-      const audioFile = new File([recordedAudio], "recording.wav", {
-        type: "audio/wav",
-      });
+      const audioFile = new File(
+        [recordedAudio],
+        `recording.${extensionForMimeType(recordedAudio.type)}`,
+        { type: recordedAudio.type }
+      );
 
       const response = await pronunciationService.assessPronunciation(
         audioFile,
@@ -23,6 +23,7 @@ import {
 import AudioRecorder from "~/components/shared/AudioRecorder";
 import { pronunciationService } from "~/services/pronunciationService";
 import PhonemeTimeline from "~/components/PhonemeTimeline/PhonemeTimeline";
+import { extensionForMimeType } from "~/utils/audioEncoding";
 
 
 /* ------------------------------------------------ */
@@ -206,7 +207,7 @@ export default function Pronunciation({ text }) {
 
     try {
 
-      const file = new File([recordedAudio], "recording.wav", { type: "audio/wav" })
+      const file = new File([recordedAudio], `recording.${extensionForMimeType(recordedAudio.type)}`, { type: recordedAudio.type })
 
       const res = await pronunciationService.assessPronunciation(
         file,
@@ -1,4 +1,6 @@
 import api from "./api";
+import { AUDIO_CONSTRAINTS } from "~/utils/constants";
+import { toPcm16k, extensionForMimeType } from "~/utils/audioEncoding";
 
 export const pronunciationService = {
   /**
@@ -19,7 +21,22 @@ export const pronunciationService = {
     sessionId
   ) => {
     const formData = new FormData();
-    formData.append("audio_file", audioFile);
+    let upload = audioFile;
+    if (AUDIO_CONSTRAINTS.UPLOAD_FORMAT === "pcm" && audioFile instanceof Blob) {
+      try {
+        upload = await toPcm16k(audioFile);
+        formData.append("audio_format", "pcm_s16le");
+      } catch (err) {
+        // Fall back to the recorder's own format if the browser cannot decode it
+        console.error("PCM conversion failed, uploading original audio:", err);
+        upload = audioFile;
+      }
+    }
+    formData.append(
+      "audio_file",
+      upload,
+      upload.name || `recording.${extensionForMimeType(upload.type)}`
+    );
     formData.append("session_id", sessionId);
 
     if (instructionId) {
@@ -5,10 +5,13 @@ import { API_BASE_URL } from "../utils/constants";
 
 
 const userService = {
-  // Get all users (admin only)
-  getAllUsers: async () => {
+  // List users a page at a time (admin only)
+  // params: { limit, cursor, search, role, status, sort, order, fields }
+  // Resolves to { success, data: { users, next_cursor, total } }
+  getUsers: async (params = {}) => {
     const token = localStorage.getItem("access_token");
     const response = await axios.get(`${API_BASE_URL}/admin/users`, {
+      params,
       headers: { Authorization: `Bearer ${token}` },
     });
     return response.data;
@@ -0,0 +1,53 @@
+/**
+ * Client-side audio conversion for pronunciation uploads.
+ */
+
+const PCM_SAMPLE_RATE = 16000;
+
+/**
+ * Decodes a recorded blob (WebM/Opus, Ogg, ...) and converts it to raw
+ * 16 kHz mono signed 16-bit little-endian PCM, the format the backend can
+ * score without decoding or resampling.
+ * @param {Blob} blob - Recording from MediaRecorder
+ * @returns {Promise<Blob>} - Raw PCM blob with type "audio/L16;rate=16000"
+ */
+export const toPcm16k = async (blob) => {
+  const AudioCtx = window.AudioContext || window.webkitAudioContext;
+  const ctx = new AudioCtx();
+  try {
+    const decoded = await ctx.decodeAudioData(await blob.arrayBuffer());
+
+    // Downmix and resample in one pass with an offline context
+    const length = Math.ceil(decoded.duration * PCM_SAMPLE_RATE);
+    const offline = new OfflineAudioContext(1, length, PCM_SAMPLE_RATE);
+    const source = offline.createBufferSource();
+    source.buffer = decoded;
+    source.connect(offline.destination);
+    source.start();
+    const rendered = await offline.startRendering();
+
+    const samples = rendered.getChannelData(0);
+    const view = new DataView(new ArrayBuffer(samples.length * 2));
+    for (let i = 0; i < samples.length; i++) {
+      const s = Math.max(-1, Math.min(1, samples[i]));
+      view.setInt16(i * 2, s < 0 ? s * 0x8000 : s * 0x7fff, true);
+    }
+    return new Blob([view.buffer], { type: `audio/L16;rate=${PCM_SAMPLE_RATE}` });
+  } finally {
+    ctx.close();
+  }
+};
+
+/**
+ * File extension matching a recorder MIME type.
+ * @param {string} mimeType
+ * @returns {string}
+ */
+export const extensionForMimeType = (mimeType = "") => {
+  if (mimeType.includes("webm")) return "webm";
+  if (mimeType.includes("ogg")) return "ogg";
+  if (mimeType.includes("mp4")) return "m4a";
+  if (mimeType.includes("wav")) return "wav";
+  if (mimeType.toLowerCase().includes("l16")) return "pcm";
+  return "audio";
+};
@@ -19,6 +19,9 @@ export const USER_ROLES = {
 export const AUDIO_CONSTRAINTS = {
   MAX_DURATION: 30, // seconds
   MAX_FILE_SIZE: 10 * 1024 * 1024, // 10MB
+  // "pcm" converts recordings to raw 16 kHz PCM before upload so the server
+  // skips decoding; "native" uploads the recorder's own WebM/Opus output
+  UPLOAD_FORMAT: import.meta.env.VITE_AUDIO_UPLOAD_FORMAT || "native",
 };
 
 // Quiz settings